@@ -1,15 +1,17 @@
 import os
 import time
-import pdfplumber
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
+from llm_gateway import get_llm_gateway
+from bill_extraction import relatorio_combinado, render_report, extrair_dados_lote, cabe_no_lote, limite_lote
+from text_cache import extract_text, extract_texts_parallel
+from config import LLMConfig
+from pipeline_manifest import get_pipeline_manifest, localizar, PipelineStage
 
 load_dotenv()
 
-def generate_report(pdf_path, txt_dir, report_dir):
+def generate_report(pdf_path, txt_dir, report_dir, text_data=None):
     pdf_name = Path(pdf_path).stem
 
     txt_path = Path(txt_dir) / f"{pdf_name}.txt"
@@ -18,18 +20,12 @@ def generate_report(pdf_path, txt_dir, report_dir):
     os.makedirs(txt_dir, exist_ok=True)
     os.makedirs(report_dir, exist_ok=True)
 
-    with pdfplumber.open(pdf_path) as pdf, open(txt_path, 'w', encoding='utf-8') as f:
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text:
-                f.write(text + '\n')
+    if text_data is None:
+        text_data = extract_text(pdf_path)
+    with open(txt_path, 'w', encoding='utf-8') as f:
+        f.write(text_data)
     print(f"Texto extraído salvo em: {txt_path}")
 
-    with open(txt_path, 'r', encoding='utf-8') as f:
-        text_data = f.read()
-
-    llm = ChatGoogleGenerativeAI(model='gemini-2.0-flash-lite', temperature=0.1)
-
     template = """
     Tarefa: Gere o RELATÓRIO DE ANÁLISE HÍDRICA – COPASA exclusivamente a partir do arquivo .txt fornecido (fatura COPASA). 
     ⚠️ Importante: Não use conhecimento externo, não invente valores, não use "estimado" ou "aprox.". Apenas o que consta no arquivo.
@@ -111,19 +107,62 @@ def generate_report(pdf_path, txt_dir, report_dir):
     {text}
     """
 
-    prompt = PromptTemplate(input_variables=['text'], template=template)
-    chain = prompt | llm | StrOutputParser()
-
-    time.sleep(4)
     print(f"Gerando relatório para: {pdf_name}")
-    relatorio = chain.invoke({'text': text_data})
+    relatorio = relatorio_combinado(text_data) if LLMConfig.COMBINED_MODE else None
+    if relatorio is None:
+        relatorio = get_llm_gateway().invoke(template, {'text': text_data}, temperature=0.1)
 
     with open(report_path, 'w', encoding='utf-8') as f:
         f.write(relatorio)
 
     print(f"Relatório salvo em: {report_path}")
+    _marcar_relatorio(pdf_path, report_path)
     return str(report_path)
 
+def _marcar_relatorio(pdf_path, report_path):
+    manifesto = get_pipeline_manifest()
+    registro = manifesto.por_caminho(pdf_path)
+    if registro:
+        manifesto.avancar(registro['hash'], PipelineStage.REPORTED, relatorio=str(report_path))
+
+def generate_reports_batch(lote, txt_dir, report_dir):
+    """
+    Gera os relatórios de várias faturas [(pdf_path, text_data), ...] numa só
+    requisição. Faturas sem resposta válida no lote são refeitas uma a uma.
+    Retorna quantos relatórios foram salvos.
+    """
+    os.makedirs(txt_dir, exist_ok=True)
+    os.makedirs(report_dir, exist_ok=True)
+
+    print(f"Gerando relatórios em lote: {len(lote)} faturas")
+    try:
+        dados = extrair_dados_lote(lote)
+    except Exception as e:
+        print(f"[ERRO no lote] {e}")
+        dados = {}
+
+    salvos = 0
+    for pdf_path, text_data in lote:
+        pdf_name = Path(pdf_path).stem
+        if pdf_path not in dados:
+            print(f"[LOTE] {pdf_name} sem resposta válida, refazendo individualmente")
+            try:
+                generate_report(pdf_path, txt_dir, report_dir, text_data)
+                salvos += 1
+            except Exception as e:
+                print(f"[ERRO no relatório] {pdf_name}: {e}")
+            continue
+
+        with open(Path(txt_dir) / f"{pdf_name}.txt", 'w', encoding='utf-8') as f:
+            f.write(text_data)
+        report_path = Path(report_dir) / f"{pdf_name}_relatorio.txt"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(render_report(dados[pdf_path]))
+        print(f"Relatório salvo em: {report_path}")
+        _marcar_relatorio(pdf_path, report_path)
+        salvos += 1
+    return salvos
+
 def generate_reports_from_folder(pasta_pdfs, pasta_txts, pasta_relat):
     """
     Gera relatórios apenas para PDFs que ainda não possuem relatório correspondente.
@@ -131,33 +170,71 @@ def generate_reports_from_folder(pasta_pdfs, pasta_txts, pasta_relat):
     os.makedirs(pasta_txts, exist_ok=True)
     os.makedirs(pasta_relat, exist_ok=True)
 
-    existing_reports = set()
-    if os.path.exists(pasta_relat):
-        for arquivo in os.listdir(pasta_relat):
-            if arquivo.endswith('_relatorio.txt'):
-                pdf_base_name = arquivo.replace('_relatorio.txt', '')
-                existing_reports.add(pdf_base_name)
-    
-    print(f"📊 Relatórios já existentes: {len(existing_reports)}")
+    # O manifesto diz o que já tem relatório; só PDFs desconhecidos são lidos
+    manifesto = get_pipeline_manifest()
+    conhecidos = manifesto.conhecidos(pasta_pdfs)
+    print(f"📊 PDFs já no manifesto: {len(conhecidos)}")
     
     pdfs_processados = 0
     pdfs_pulados = 0
+    pdfs_novos = []
     
     for nome in os.listdir(pasta_pdfs):
         if nome.lower().endswith(".pdf"):
-            pdf_name = Path(nome).stem
+            caminho = os.path.join(pasta_pdfs, nome)
+            registro = conhecidos.get(os.path.abspath(caminho))
+            
+            if registro is None:
+                digest, registro = localizar(caminho)
+                # Relatório gerado antes de o manifesto existir
+                relatorio_antigo = Path(pasta_relat) / f"{Path(nome).stem}_relatorio.txt"
+                if relatorio_antigo.exists():
+                    manifesto.avancar(digest, PipelineStage.REPORTED, relatorio=str(relatorio_antigo))
+                    registro['etapa'] = PipelineStage.REPORTED
             
-            if pdf_name in existing_reports:
+            if registro['etapa'] >= PipelineStage.REPORTED:
                 print(f"⏭️  Pulando {nome} - relatório já existe")
                 pdfs_pulados += 1
                 continue
             
-            caminho = os.path.join(pasta_pdfs, nome)
+            pdfs_novos.append(caminho)
+    
+    # A extração roda em vários processos; cada texto segue para o relatório assim que fica pronto,
+    # e os relatórios rodam em paralelo até o limite do gateway do LLM
+    modo_lote = LLMConfig.COMBINED_MODE and limite_lote() > 1
+    inicio = time.time()
+    extraidos = 0
+    relatorios = {}
+    lote = []
+    with ThreadPoolExecutor(max_workers=LLMConfig.CONCURRENCY) as executor:
+        for caminho, text_data, erro in extract_texts_parallel(pdfs_novos):
+            nome = os.path.basename(caminho)
+            if erro:
+                print(f"[ERRO na extração] {nome}: {erro}")
+                continue
+            extraidos += 1
+            print(f"🆕 Processando novo PDF: {nome}")
+            if not modo_lote:
+                relatorios[executor.submit(generate_report, caminho, pasta_txts, pasta_relat, text_data)] = nome
+                continue
+            if not cabe_no_lote(lote, text_data):
+                relatorios[executor.submit(generate_reports_batch, lote, pasta_txts, pasta_relat)] = f"lote de {len(lote)}"
+                lote = []
+            lote.append((caminho, text_data))
+        if lote:
+            relatorios[executor.submit(generate_reports_batch, lote, pasta_txts, pasta_relat)] = f"lote de {len(lote)}"
+
+        for future in as_completed(relatorios):
             try:
-                print(f"🆕 Processando novo PDF: {nome}")
-                generate_report(caminho, pasta_txts, pasta_relat)
-                pdfs_processados += 1
+                resultado = future.result()
+                pdfs_processados += resultado if isinstance(resultado, int) else 1
             except Exception as e:
-                print(f"[ERRO no relatório] {nome}: {e}")
+                print(f"[ERRO no relatório] {relatorios[future]}: {e}")
     
+    duracao = time.time() - inicio
+    if extraidos:
+        modo = f"lote de até {limite_lote()}" if modo_lote else "uma fatura por requisição"
+        print(f"⚡ {extraidos} PDFs em {duracao:.1f}s ({extraidos / duracao:.2f} PDFs/s)")
+        print(f"📈 {pdfs_processados / duracao * 60:.1f} faturas/min ({modo})")
+        print(get_llm_gateway().resumo())
     print(f"✅ Resumo: {pdfs_processados} novos relatórios gerados, {pdfs_pulados} PDFs pulados (já tinham relatório)")
\ No newline at end of file
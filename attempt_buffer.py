@@ -0,0 +1,217 @@
+import os
+import json
+import uuid
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import DatabaseConfig
+
+logger = logging.getLogger(__name__)
+
+# SQLSTATE de erros que se repetem a cada reenvio: dado inválido (22),
+# violação de restrição (23) e coluna/tabela inexistente (42)
+_CLASSES_PERMANENTES = ('22', '23', '42')
+
+def erro_permanente(e: Exception) -> bool:
+    """
+    True quando reenviar o mesmo registro não adianta. Erros de rede, timeout
+    e 5xx (sem 'code' do Postgres ou com código de conexão) são transitórios.
+    """
+    if isinstance(e, (TypeError, ValueError)):
+        # Registro que nem serializa em JSON
+        return True
+    code = getattr(e, 'code', None)
+    if not isinstance(code, str):
+        return False
+    # PGRST1xx/PGRST2xx: requisição ou schema rejeitados pelo PostgREST; PGRST0xx é conexão
+    return code[:2] in _CLASSES_PERMANENTES or code.startswith(('PGRST1', 'PGRST2'))
+
+class AttemptWriteBuffer:
+    """
+    Buffer write-behind para a tabela tentativas_download.
+
+    Cada tentativa é gravada primeiro no journal local (JSON lines) e só depois
+    enviada ao Supabase em inserts em lote, numa thread de fundo. Registros
+    confirmados recebem uma linha de ack; o que ficar sem ack é reenviado no
+    próximo start. Um lote recusado por erro permanente é reenviado registro
+    a registro e o registro recusado vai para o arquivo de rejeitados (e
+    recebe ack), para não travar a fila.
+    """
+
+    def __init__(self, supabase, journal_path: str = None, batch_size: int = None, flush_interval: float = None,
+                 dead_letter_path: str = None):
+        self.supabase = supabase
+        self.journal_path = journal_path or DatabaseConfig.ATTEMPTS_JOURNAL
+        self.dead_letter_path = dead_letter_path or DatabaseConfig.ATTEMPTS_DEAD_LETTER
+        self.batch_size = batch_size or DatabaseConfig.WRITE_BEHIND_BATCH_SIZE
+        self.flush_interval = flush_interval or DatabaseConfig.WRITE_BEHIND_FLUSH_INTERVAL
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._pending: List[Dict] = []
+        self._journal = None
+        self._thread: Optional[threading.Thread] = None
+        self.enviados = 0
+        self.falhas_envio = 0
+        self.rejeitados = 0
+
+    def start(self):
+        with self._lock:
+            replayed = self._replay_journal()
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        if replayed:
+            logger.info(f"📒 Journal de tentativas: {replayed} registros pendentes reenfileirados")
+
+        self._thread = threading.Thread(target=self._run, name="tentativas-write-behind", daemon=True)
+        self._thread.start()
+        return self
+
+    def _replay_journal(self) -> int:
+        if not os.path.exists(self.journal_path):
+            return 0
+
+        registros = {}
+        with open(self.journal_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Última linha truncada por um crash no meio da escrita
+                    continue
+                if 'ack' in entry:
+                    for record_id in entry['ack']:
+                        registros.pop(record_id, None)
+                else:
+                    registros[entry['id']] = entry
+
+        self._pending = list(registros.values())
+        self._rewrite_journal(self._pending)
+        return len(self._pending)
+
+    def _rewrite_journal(self, registros: List[Dict]):
+        tmp_path = f"{self.journal_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for registro in registros:
+                f.write(json.dumps(registro, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _append(self, entry: Dict):
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def registrar(self, data: Dict):
+        registro = {'id': uuid.uuid4().hex, 'data': data}
+        with self._lock:
+            self._append(registro)
+            self._pending.append(registro)
+            cheio = len(self._pending) >= self.batch_size
+        if cheio:
+            self._wakeup.set()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _inserir(self, lote: List[Dict]):
+        self.supabase.table('tentativas_download').insert([r['data'] for r in lote]).execute()
+
+    def _ack(self, lote: List[Dict]):
+        # O lote é sempre a cabeça de _pending (só o flush, sob _flush_lock, remove)
+        with self._lock:
+            del self._pending[:len(lote)]
+            self._append({'ack': [r['id'] for r in lote]})
+            if not self._pending:
+                self._journal.close()
+                self._rewrite_journal([])
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _rejeitar(self, registro: Dict, erro: Exception):
+        entry = dict(registro, erro=str(erro), rejeitado_em=datetime.now().isoformat())
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self.rejeitados += 1
+        logger.error(f"❌ Tentativa {registro['id']} recusada pelo banco ({erro}); movida para {self.dead_letter_path}")
+
+    def _enviar_um_a_um(self, lote: List[Dict]) -> bool:
+        """Isola o registro que derrubou o lote; False se um erro transitório interromper."""
+        for registro in lote:
+            try:
+                self._inserir([registro])
+            except Exception as e:
+                if not erro_permanente(e):
+                    self.falhas_envio += 1
+                    logger.warning(f"⚠️ Falha ao enviar tentativas (mantidas no journal): {e}")
+                    return False
+                self._rejeitar(registro, e)
+            else:
+                self.enviados += 1
+            self._ack([registro])
+        return True
+
+    def flush(self) -> bool:
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    lote = self._pending[:self.batch_size]
+                if not lote:
+                    return True
+
+                try:
+                    self._inserir(lote)
+                except Exception as e:
+                    if erro_permanente(e):
+                        logger.warning(f"⚠️ Lote de {len(lote)} tentativas recusado ({e}); reenviando um a um")
+                        if self._enviar_um_a_um(lote):
+                            continue
+                        return False
+                    self.falhas_envio += 1
+                    logger.warning(f"⚠️ Falha ao enviar {len(lote)} tentativas (mantidas no journal): {e}")
+                    return False
+
+                self._ack(lote)
+                self.enviados += len(lote)
+
+    def close(self):
+        self._stopping.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+        with self._lock:
+            if self._journal and not self._journal.closed:
+                self._journal.close()
+        if self._pending:
+            logger.warning(f"⚠️ {len(self._pending)} tentativas não enviadas ficaram no journal {self.journal_path}")
+
+_buffer: Optional[AttemptWriteBuffer] = None
+_buffer_lock = threading.Lock()
+
+def get_attempt_buffer(supabase) -> AttemptWriteBuffer:
+    """Um único buffer por processo, compartilhado por todos os DatabaseManager."""
+    global _buffer
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = AttemptWriteBuffer(supabase).start()
+            atexit.register(_buffer.close)
+        return _buffer
+
+def montar_tentativa(matricula: str, sucesso: bool, erro: str = None) -> Dict:
+    return {
+        'matricula_numero': matricula,
+        'sucesso': sucesso,
+        'erro': erro,
+        # Data fixada no registro: um replay no dia seguinte não pode mudar o dia da tentativa
+        'data_tentativa': datetime.now().date().isoformat()
+    }
@@ -0,0 +1,56 @@
+"""
+Benchmark: varredura da pasta de downloads no clean_download_folder.
+
+Compara o percurso antigo (glob('**/*') + is_file() + dois stat() por
+arquivo) com a passada única de os.scandir usada agora (bill_archive.varrer).
+Sem pasta informada, gera uma árvore temporária com N arquivos vazios.
+
+Uso: python benchmarks/bench_clean_scan.py [pasta | N_arquivos]
+"""
+import os
+import sys
+import time
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bill_archive import varrer
+
+def _glob(pasta):
+    total = 0
+    for file_path in Path(pasta).glob('**/*'):
+        if file_path.is_file():
+            file_path.stat().st_mtime
+            total += file_path.stat().st_size
+    return total
+
+def _scandir(pasta):
+    return sum(st.st_size for _, st in varrer(pasta))
+
+def _gerar(pasta, n):
+    for sub in ('', 'contas_txt', 'relatorios'):
+        os.makedirs(os.path.join(pasta, sub), exist_ok=True)
+    for i in range(n):
+        sub = ('', 'contas_txt', 'relatorios')[i % 3]
+        with open(os.path.join(pasta, sub, f"fatura_{i}.pdf"), 'wb'):
+            pass
+
+def _medir(pasta):
+    for nome, funcao in (("glob + 2x stat", _glob), ("os.scandir", _scandir)):
+        inicio = time.perf_counter()
+        funcao(pasta)
+        print(f"{nome:<16} {time.perf_counter() - inicio:8.3f}s")
+
+def main():
+    arg = sys.argv[1] if len(sys.argv) > 1 else "30000"
+    if os.path.isdir(arg):
+        _medir(arg)
+        return
+    with tempfile.TemporaryDirectory() as pasta:
+        _gerar(pasta, int(arg))
+        print(f"Arquivos: {arg}")
+        _medir(pasta)
+
+if __name__ == "__main__":
+    main()
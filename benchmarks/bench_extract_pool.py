@@ -0,0 +1,52 @@
+"""
+Benchmark: vazão da extração de texto (PDFs/s) por número de processos.
+
+Usa o backend configurado (PDF_TEXT_BACKEND) direto, sem o cache em disco, para medir só a
+escalabilidade do pool de extract_texts_parallel.
+
+Uso: python benchmarks/bench_extract_pool.py <pasta_com_pdfs> [workers ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_text import extract as extract_sem_cache
+from text_cache import extract_texts_parallel
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python benchmarks/bench_extract_pool.py <pasta_com_pdfs> [workers ...]")
+        sys.exit(1)
+
+    pasta = sys.argv[1]
+    pdfs = sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if nome.lower().endswith(".pdf")
+    )
+    if not pdfs:
+        print(f"Nenhum PDF em {pasta}")
+        sys.exit(1)
+
+    cpus = os.cpu_count() or 1
+    if len(sys.argv) > 2:
+        niveis = [int(w) for w in sys.argv[2:]]
+    else:
+        niveis = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+    print(f"PDFs: {len(pdfs)}  CPUs: {cpus}")
+    base = None
+    for workers in niveis:
+        inicio = time.perf_counter()
+        erros = sum(
+            1 for _, _, erro in extract_texts_parallel(pdfs, workers=workers, extrator=extract_sem_cache)
+            if erro
+        )
+        duracao = time.perf_counter() - inicio
+        vazao = len(pdfs) / duracao
+        base = base or vazao
+        print(f"workers={workers:<3} {duracao:7.2f}s  {vazao:7.2f} PDFs/s  {vazao / base:4.2f}x  erros={erros}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: LogAnalyzer na janela da última hora, leitura antiga x log_reader.
+
+Gera um log sintético (formato do LoggingConfig) cobrindo vários dias, com
+um segmento rotacionado em .gz, e compara o tempo e o pico de memória do
+readlines() + strptime em todas as linhas com ler_janela().
+
+Uso: python benchmarks/bench_log_reader.py [linhas] [--memoria]
+     --memoria mede o pico com tracemalloc (deixa a leitura antiga bem mais lenta)
+"""
+import os
+import sys
+import gzip
+import time
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from log_reader import ler_janela
+
+def _gerar(caminho, linhas):
+    agora = datetime.now()
+    inicio = agora - timedelta(days=7)
+    passo = (agora - inicio) / linhas
+    metade = linhas // 2
+    with gzip.open(f"{caminho}.1.gz", 'wt', encoding='utf-8') as antigo, open(caminho, 'w', encoding='utf-8') as atual:
+        for i in range(linhas):
+            momento = inicio + passo * i
+            nivel = 'ERROR' if i % 50 == 0 else 'INFO'
+            destino = antigo if i < metade else atual
+            destino.write(f"{momento.strftime('%Y-%m-%d %H:%M:%S')},{momento.microsecond // 1000:03d} - {nivel} - "
+                          f"CPF 123 matrícula {i} processada\n")
+    antigo_mtime = (inicio + passo * metade).timestamp()
+    os.utime(f"{caminho}.1.gz", (antigo_mtime, antigo_mtime))
+
+def _antigo(caminho, corte):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    total = 0
+    for line in lines:
+        try:
+            if datetime.strptime(line.split(' - ')[0], '%Y-%m-%d %H:%M:%S,%f') >= corte:
+                total += 1
+        except (ValueError, IndexError):
+            continue
+    return total
+
+def _novo(caminho, corte):
+    return sum(1 for _ in ler_janela(caminho, corte))
+
+def _medir(nome, funcao, *args, memoria=False):
+    inicio = time.perf_counter()
+    total = funcao(*args)
+    duracao = time.perf_counter() - inicio
+    pico = ""
+    if memoria:
+        tracemalloc.start()
+        funcao(*args)
+        pico = f"  pico {tracemalloc.get_traced_memory()[1] / 1024 / 1024:8.1f} MB"
+        tracemalloc.stop()
+    print(f"{nome:<22} {duracao:8.3f}s{pico}  {total} linhas")
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    linhas = int(args[0]) if args else 1_000_000
+    memoria = '--memoria' in sys.argv
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, 'download_bills.log')
+        _gerar(caminho, linhas)
+        print(f"Linhas: {linhas}  arquivo atual: {os.path.getsize(caminho) / 1024 / 1024:.0f} MB")
+        corte = datetime.now() - timedelta(hours=1)
+        _medir("readlines + strptime", _antigo, caminho, corte, memoria=memoria)
+        _medir("log_reader", _novo, caminho, corte, memoria=memoria)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark: custo do logging por fatura na thread que dirige o Selenium.
+
+Emite, por fatura, o mesmo volume de registros do download_bills (tentativa,
+estado, download e resultado com cpf/matricula/phase/duration_ms) com:
+  antes  - logging.basicConfig com FileHandler + StreamHandler síncronos
+  depois - logging_setup.configurar_logging (QueueHandler/QueueListener, JSON, rotação)
+Cada modo roda num subprocesso (a configuração de logging é global).
+Entre uma fatura e outra a thread espera ESPERA_NAVEGADOR, como espera o
+Selenium; só o tempo das chamadas de log entra na conta. O console vai para
+os.devnull, ou para um console lento (--console-lento, ~0,5 ms por escrita,
+como o console do Windows sob carga).
+
+Uso: python benchmarks/bench_logging.py [faturas] [--console-lento]
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+REGISTROS_POR_FATURA = 6
+ESPERA_NAVEGADOR = 0.005
+
+class _ConsoleLento:
+    def write(self, texto):
+        time.sleep(0.0005)
+        return len(texto)
+
+    def flush(self):
+        pass
+
+def _emitir(faturas):
+    logger = logging.getLogger("download_bills")
+    gasto = 0.0
+    for i in range(faturas):
+        time.sleep(ESPERA_NAVEGADOR)
+        inicio = time.perf_counter()
+        matricula = f"{i:08d}"
+        logger.info(f"Processando matrícula {matricula}")
+        logger.info("Sistema saudável")
+        logger.info(f"⬇️ Download iniciado: {matricula}")
+        logger.info(f"📄 Arquivo recebido: fatura_{matricula}.pdf")
+        logger.info(f"✅ {matricula}: Download concluído", extra={'phase': 'download', 'duration_ms': 1234})
+        logger.info("↩️ Voltando para a lista")
+        gasto += time.perf_counter() - inicio
+    return gasto
+
+def _rodar(modo, faturas, log_file, console_lento):
+    sys.stderr = _ConsoleLento() if console_lento else open(os.devnull, 'w')
+    if modo == 'antes':
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler()]
+        )
+        chamador = _emitir(faturas)
+        total = chamador + faturas * ESPERA_NAVEGADOR
+    else:
+        from logging_setup import configurar_logging, definir_contexto
+        listener = configurar_logging(log_file)
+        definir_contexto(cpf="00000000000")
+        inicio = time.perf_counter()
+        chamador = _emitir(faturas)
+        listener.stop()
+        total = time.perf_counter() - inicio
+    print(f"{chamador} {total}")
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] in ('antes', 'depois'):
+        _rodar(sys.argv[1], int(sys.argv[2]), sys.argv[3], '--console-lento' in sys.argv)
+        return
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    faturas = int(args[0]) if args else 1000
+    extra = ['--console-lento'] if '--console-lento' in sys.argv else []
+    print(f"Faturas: {faturas}  registros por fatura: {REGISTROS_POR_FATURA}")
+    with tempfile.TemporaryDirectory() as pasta:
+        for modo in ('antes', 'depois'):
+            log_file = os.path.join(pasta, f"{modo}.log")
+            saida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), modo, str(faturas), log_file] + extra,
+                capture_output=True, text=True, check=True, cwd=RAIZ
+            ).stdout.splitlines()[-1].split()
+            chamador, total = float(saida[0]), float(saida[1])
+            print(f"{modo:<7} {chamador / faturas * 1e6:8.1f} µs/fatura na thread do Selenium  "
+                  f"(execução: {total:.2f}s)")
+
+if __name__ == "__main__":
+    main()
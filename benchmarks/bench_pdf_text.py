@@ -0,0 +1,84 @@
+"""
+Benchmark: velocidade e equivalência dos backends de extração de texto.
+
+Para cada backend instalado mede ms/PDF e compara a saída com a do
+pdfplumber (referência atual): texto idêntico após normalizar espaços,
+similaridade média e se o bill_parser chega ao mesmo nome de arquivo.
+
+Uso: python benchmarks/bench_pdf_text.py <pasta_com_pdfs> [paginas] [regioes]
+     paginas: "1" ou "1,2"; regioes: "x0,y0,x1,y1;..." em frações da página
+"""
+import os
+import re
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_text
+from bill_parser import parse_bill_name
+
+def _normalizar(texto: str) -> str:
+    return re.sub(r'\s+', ' ', texto or '').strip()
+
+def _nome(texto: str):
+    parsed = parse_bill_name(texto)
+    return parsed['arquivo'] if parsed else None
+
+def _rodar(backend, pdfs, paginas, regioes):
+    textos, erros = {}, 0
+    inicio = time.perf_counter()
+    for pdf in pdfs:
+        try:
+            textos[pdf] = pdf_text.extract(pdf, backend, paginas, regioes)
+        except Exception:
+            erros += 1
+    return textos, time.perf_counter() - inicio, erros
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python benchmarks/bench_pdf_text.py <pasta_com_pdfs> [paginas] [regioes]")
+        sys.exit(1)
+
+    pasta = sys.argv[1]
+    paginas = pdf_text.parse_paginas(sys.argv[2]) if len(sys.argv) > 2 else []
+    regioes = pdf_text.parse_regioes(sys.argv[3]) if len(sys.argv) > 3 else []
+    pdfs = sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if nome.lower().endswith(".pdf")
+    )
+    if not pdfs:
+        print(f"Nenhum PDF em {pasta}")
+        sys.exit(1)
+
+    backends = pdf_text.disponiveis()
+    if 'pdfplumber' not in backends:
+        print("pdfplumber é a referência e precisa estar instalado")
+        sys.exit(1)
+
+    # Referência: pdfplumber no documento inteiro, como a extração sempre foi feita
+    referencia, _, _ = _rodar('pdfplumber', pdfs, None, None)
+    nomes_referencia = {pdf: _nome(texto) for pdf, texto in referencia.items()}
+
+    print(f"PDFs: {len(pdfs)}  páginas: {paginas or 'todas'}  regiões: {regioes or 'página inteira'}")
+    print(f"{'backend':<12}{'ms/PDF':>9}{'idêntico':>10}{'similar.':>10}{'mesmo nome':>12}{'erros':>7}")
+    for backend in backends:
+        textos, duracao, erros = _rodar(backend, pdfs, paginas, regioes)
+        comparaveis = [pdf for pdf in textos if pdf in referencia]
+        identicos = sum(_normalizar(textos[p]) == _normalizar(referencia[p]) for p in comparaveis)
+        similaridade = sum(
+            SequenceMatcher(None, _normalizar(textos[p]), _normalizar(referencia[p])).ratio()
+            for p in comparaveis
+        ) / max(len(comparaveis), 1)
+        mesmo_nome = sum(_nome(textos[p]) == nomes_referencia[p] for p in comparaveis)
+        total = max(len(comparaveis), 1)
+        print(f"{backend:<12}{duracao / len(pdfs) * 1000:9.1f}{identicos / total * 100:9.0f}%"
+              f"{similaridade * 100:9.0f}%{mesmo_nome / total * 100:11.0f}%{erros:7d}")
+
+    ausentes = sorted(set(pdf_text.BACKENDS) - set(backends))
+    if ausentes:
+        print(f"Não instalados: {', '.join(ausentes)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: faturas/min na geração de relatórios, uma fatura por requisição
+contra o modo lote (várias faturas por requisição).
+
+Usa a API real (GOOGLE_API_KEY no .env) com o cache de respostas desligado,
+sobre os .txt já extraídos das faturas.
+
+Uso: python benchmarks/bench_report_batch.py <pasta_txts> [tamanho_lote] [max_faturas]
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import llm_gateway
+from bill_extraction import extrair_dados_fatura, extrair_dados_lote, cabe_no_lote
+
+def _modo_individual(itens):
+    ok = 0
+    with ThreadPoolExecutor(max_workers=llm_gateway.get_llm_gateway().concurrency) as executor:
+        for resultado in executor.map(lambda item: _tentar(extrair_dados_fatura, item[1]), itens):
+            ok += resultado is not None
+    return ok
+
+def _modo_lote(itens, tamanho):
+    lotes, lote = [], []
+    for item in itens:
+        if not cabe_no_lote(lote, item[1], tamanho):
+            lotes.append(lote)
+            lote = []
+        lote.append(item)
+    if lote:
+        lotes.append(lote)
+
+    with ThreadPoolExecutor(max_workers=llm_gateway.get_llm_gateway().concurrency) as executor:
+        return sum(len(r or {}) for r in executor.map(lambda l: _tentar(extrair_dados_lote, l), lotes))
+
+def _tentar(funcao, argumento):
+    try:
+        return funcao(argumento)
+    except Exception as e:
+        print(f"   erro: {e}")
+        return None
+
+def _medir(rotulo, funcao, total):
+    llm_gateway._gateway = llm_gateway.LLMGateway()
+    llm_gateway._gateway.cache = None
+    inicio = time.perf_counter()
+    ok = funcao()
+    duracao = time.perf_counter() - inicio
+    gateway = llm_gateway.get_llm_gateway()
+    print(f"{rotulo:<22} {ok}/{total} ok  {duracao:7.1f}s  {ok / duracao * 60:7.1f} faturas/min  "
+          f"{gateway.stats['requisicoes']} requisições")
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python benchmarks/bench_report_batch.py <pasta_txts> [tamanho_lote] [max_faturas]")
+        sys.exit(1)
+
+    pasta = sys.argv[1]
+    tamanho = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    maximo = int(sys.argv[3]) if len(sys.argv) > 3 else 40
+    nomes = sorted(n for n in os.listdir(pasta) if n.endswith('.txt'))[:maximo]
+    itens = []
+    for nome in nomes:
+        with open(os.path.join(pasta, nome), encoding='utf-8', errors='ignore') as f:
+            itens.append((nome, f.read()))
+    if not itens:
+        print(f"Nenhum .txt em {pasta}")
+        sys.exit(1)
+
+    _medir("uma por requisição", lambda: _modo_individual(itens), len(itens))
+    extrair_dados_fatura.cache_clear()
+    _medir(f"lote de {tamanho}", lambda: _modo_lote(itens, tamanho), len(itens))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: CPFs/hora do runner por número de workers.
+
+Troca main.main por um stub que simula uma sessão do portal (login fixo +
+latência por matrícula, com CPFs de tamanhos diferentes) e o
+DatabaseManager por credenciais falsas, e mede main_runner com 1, 2, 4...
+workers. Mede o escalonamento do runner (slots, pastas por worker), não o
+portal: no real, o limite vem de CPU/memória de cada Firefox.
+
+Uso: python benchmarks/bench_runner_workers.py [cpfs] [login_ms] [matricula_ms] [workers...]
+"""
+import os
+import sys
+import time
+import types
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import LoggingConfig, MetricsConfig
+from logging_setup import configurar_logging
+import database_manager
+
+_PASTA = tempfile.mkdtemp(prefix="bench_runner_")
+# A primeira configuração vale: main_runner chama _configurar_logging, mas o log fica na pasta temporária
+configurar_logging(os.path.join(_PASTA, "runner.log"), level="WARNING")
+MetricsConfig.PORT = 0
+os.environ["DOWNLOAD_DIR"] = _PASTA
+
+LOGIN_S = 0.2
+MATRICULA_S = 0.02
+_sessoes = {}
+
+def _main_stub(cpf, password, webmail_user, webmail_password, webmail_host, matriculas, download_dir=None,
+               ja_filtradas=False):
+    os.makedirs(download_dir or _PASTA, exist_ok=True)
+    time.sleep(LOGIN_S + MATRICULA_S * len(matriculas))
+    _sessoes[cpf] = download_dir
+
+class _FakeDatabaseManager:
+    credenciais = []
+
+    def get_credenciais_ativas(self):
+        return list(self.credenciais)
+
+    def get_matriculas_para_cpf(self, cpf, incluir_pendentes=True, verificar_duplicatas=True):
+        # Contas de tamanhos variados, estáveis entre execuções
+        return [f"{cpf}{i:03d}" for i in range(5 + int(cpf) % 40)]
+
+sys.modules["main"] = types.SimpleNamespace(main=_main_stub)
+database_manager.DatabaseManager = _FakeDatabaseManager
+
+import runner
+
+def run(cpfs=24, workers=(1, 2, 4, 8)):
+    _FakeDatabaseManager.credenciais = [
+        {"cpf": f"{random.Random(i).randint(0, 10**6):011d}", "password": "x",
+         "webmail_user": "x", "webmail_password": "x"}
+        for i in range(cpfs)
+    ]
+    base = None
+    print(f"{cpfs} CPFs, login {LOGIN_S * 1000:.0f} ms, {MATRICULA_S * 1000:.0f} ms por matrícula")
+    for n in workers:
+        _sessoes.clear()
+        inicio = time.perf_counter()
+        runner.main_runner(workers=n)
+        duracao = time.perf_counter() - inicio
+        assert len(_sessoes) == cpfs
+        por_hora = cpfs / duracao * 3600
+        base = base or por_hora
+        print(f"{n:>2} worker(s)  {duracao:7.2f}s  {por_hora:9.0f} CPFs/hora  {por_hora / base:5.2f}x")
+
+if __name__ == "__main__":
+    cpfs = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    LOGIN_S = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else LOGIN_S
+    MATRICULA_S = float(sys.argv[3]) / 1000 if len(sys.argv) > 3 else MATRICULA_S
+    workers = tuple(int(w) for w in sys.argv[4:]) or (1, 2, 4, 8)
+    run(cpfs, workers)
@@ -0,0 +1,80 @@
+"""
+Micro-benchmark: leitura da tabela #tbIdentificador.
+
+Compara a varredura antiga (find_elements + find_element(...).text por linha)
+com o snapshot em um único execute_script, usando um driver falso que cobra
+uma latência fixa por comando WebDriver.
+
+Uso: python benchmarks/bench_table_snapshot.py [linhas] [latencia_ms]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from identifier_table import snapshot_identifier_table
+
+class FakeSpan:
+    def __init__(self, driver, text):
+        self._driver = driver
+        self._text = text
+
+    @property
+    def text(self):
+        self._driver.round_trip()
+        return self._text
+
+class FakeRow:
+    def __init__(self, driver, matricula):
+        self._driver = driver
+        self.matricula = matricula
+
+    def find_element(self, by, selector):
+        self._driver.round_trip()
+        return FakeSpan(self._driver, self.matricula)
+
+class FakeDriver:
+    def __init__(self, total_rows, latency):
+        self.latency = latency
+        self.commands = 0
+        self.rows = [FakeRow(self, f"{i:04d} {i:06d}") for i in range(total_rows)]
+
+    def round_trip(self):
+        self.commands += 1
+        time.sleep(self.latency)
+
+    def find_elements(self, by, selector):
+        self.round_trip()
+        return self.rows
+
+    def execute_script(self, script, *args):
+        self.round_trip()
+        return [["".join(ch for ch in r.matricula if ch.isdigit()), i, r] for i, r in enumerate(self.rows)]
+
+def _normalize(s):
+    return "".join(ch for ch in str(s).strip() if ch.isdigit())
+
+def per_row_scan(driver, alvo):
+    for row in driver.find_elements("css selector", "#tbIdentificador tbody tr"):
+        if _normalize(row.find_element("css selector", "span.IdentifierNumber").text) == alvo:
+            return row
+    return None
+
+def snapshot_lookup(driver, alvo):
+    snapshot = snapshot_identifier_table(driver)
+    return snapshot[alvo][1] if alvo in snapshot else None
+
+def run(total_rows=300, latency_ms=2.0):
+    alvo = _normalize(f"{total_rows - 1:04d} {total_rows - 1:06d}")
+    for nome, fn in (("varredura por linha", per_row_scan), ("snapshot", snapshot_lookup)):
+        driver = FakeDriver(total_rows, latency_ms / 1000)
+        inicio = time.perf_counter()
+        assert fn(driver, alvo) is not None
+        duracao = time.perf_counter() - inicio
+        print(f"{nome:<20} {driver.commands:>5} comandos  {duracao * 1000:>8.1f} ms")
+
+if __name__ == "__main__":
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latencia = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+    run(linhas, latencia)
@@ -0,0 +1,57 @@
+"""
+Benchmark: extração de texto no pós-processamento com e sem o cache por SHA-256.
+
+Antes do cache, cada PDF passava pelo pdfplumber uma vez por estágio
+(nome pelo change_archive_name, nome pelo rename_existing_pdf e relatório).
+O benchmark mede as três leituras por PDF sem cache, com o cache frio
+(primeira execução) e com o cache quente (reexecução após rename/move).
+
+Uso: python benchmarks/bench_text_cache.py <pasta_com_pdfs> [estagios]
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pdf_text import extract as extract_sem_cache
+from text_cache import TextCache
+
+def _medir(pdfs, estagios, extrair):
+    inicio = time.perf_counter()
+    for pdf in pdfs:
+        for _ in range(estagios):
+            extrair(pdf)
+    return time.perf_counter() - inicio
+
+def main():
+    if len(sys.argv) < 2:
+        print("Uso: python benchmarks/bench_text_cache.py <pasta_com_pdfs> [estagios]")
+        sys.exit(1)
+
+    pasta = sys.argv[1]
+    estagios = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    pdfs = sorted(
+        os.path.join(pasta, nome) for nome in os.listdir(pasta)
+        if nome.lower().endswith(".pdf")
+    )
+    if not pdfs:
+        print(f"Nenhum PDF em {pasta}")
+        sys.exit(1)
+
+    sem_cache = _medir(pdfs, estagios, extract_sem_cache)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = TextCache(cache_dir=cache_dir)
+        frio = _medir(pdfs, estagios, cache.extract_text)
+        quente = _medir(pdfs, estagios, cache.extract_text)
+
+    print(f"PDFs: {len(pdfs)}  estágios por PDF: {estagios}")
+    print(f"Sem cache:     {sem_cache:8.2f}s  ({sem_cache / len(pdfs) * 1000:.1f} ms/PDF)")
+    print(f"Cache frio:    {frio:8.2f}s  ({frio / len(pdfs) * 1000:.1f} ms/PDF)  {sem_cache / frio:.1f}x")
+    print(f"Cache quente:  {quente:8.2f}s  ({quente / len(pdfs) * 1000:.1f} ms/PDF)  {sem_cache / quente:.1f}x")
+    print(f"Hits/misses:   {cache.hits}/{cache.misses}")
+
+if __name__ == "__main__":
+    main()
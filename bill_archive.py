@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from config import SystemConfig
+
+ZSTD_AUSENTE = "Pacote 'zstandard' não instalado (pip install zstandard)"
+
+def zstd_disponivel() -> bool:
+    return zstandard is not None
+
+def _sha256(caminho: str, chunk_size: int = 1024 * 1024) -> Tuple[str, int]:
+    sha256, tamanho = hashlib.sha256(), 0
+    with open(caminho, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+            tamanho += len(chunk)
+    return sha256.hexdigest(), tamanho
+
+class MonthlyArchive:
+    """
+    Arquivo mensal compactado (<mês>.zst) com índice ao lado (<mês>.idx.json).
+
+    Cada membro é gravado como um frame zstd independente e o índice guarda
+    offset e tamanho do frame, então um PDF ou relatório é lido sozinho, sem
+    descompactar o mês inteiro. Os frames concatenados continuam sendo um
+    .zst válido para `zstd -d`.
+    """
+
+    def __init__(self, pasta: str, mes: str, level: int = None):
+        if zstandard is None:
+            raise RuntimeError(ZSTD_AUSENTE)
+        self.data_path = os.path.join(pasta, f"{mes}.zst")
+        self.index_path = os.path.join(pasta, f"{mes}.idx.json")
+        self.level = level or SystemConfig.ARCHIVE_ZSTD_LEVEL
+        self._lock = threading.Lock()
+        self._membros = self._carregar_indice()
+        os.makedirs(pasta, exist_ok=True)
+
+    def _carregar_indice(self) -> List[Dict]:
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)['membros']
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def _salvar_indice(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'versao': 1, 'membros': self._membros}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def membros(self) -> List[Dict]:
+        return list(self._membros)
+
+    def buscar(self, nome: str) -> Optional[Dict]:
+        # A entrada mais recente vence quando o mesmo nome foi arquivado de novo
+        for membro in reversed(self._membros):
+            if membro['nome'] == nome:
+                return membro
+        return None
+
+    def adicionar(self, arquivos: List[Tuple[str, str, os.stat_result]]) -> List[str]:
+        """
+        Anexa (caminho, nome, stat) ao arquivo e grava o índice. Retorna os
+        caminhos que já estão seguros no arquivo e podem ser apagados. Os
+        arquivos são lidos e compactados em fluxo, sem carregar cada um inteiro.
+        """
+        compressor = zstandard.ZstdCompressor(level=self.level, write_checksum=True)
+        gravados = []
+        with self._lock:
+            existentes = {(m['nome'], m['sha256']) for m in self._membros}
+            with open(self.data_path, 'ab') as f:
+                # Bytes órfãos de uma execução interrompida ficam para trás, fora do índice
+                offset = f.seek(0, os.SEEK_END)
+                for caminho, nome, st in arquivos:
+                    try:
+                        sha256, original = _sha256(caminho)
+                        if (nome, sha256) not in existentes:
+                            with open(caminho, 'rb') as src:
+                                lidos, tamanho = compressor.copy_stream(src, f, size=original)
+                            if lidos != original:
+                                raise IOError("arquivo mudou durante o arquivamento")
+                            self._membros.append({
+                                'nome': nome,
+                                'offset': offset,
+                                'tamanho': tamanho,
+                                'original': original,
+                                'mtime': st.st_mtime,
+                                'sha256': sha256,
+                            })
+                            existentes.add((nome, sha256))
+                            offset += tamanho
+                    except (OSError, zstandard.ZstdError) as e:
+                        print(f"Erro ao arquivar {caminho}: {e}")
+                        # Descarta o frame parcial para o próximo começar no offset certo
+                        f.truncate(offset)
+                        continue
+                    gravados.append(caminho)
+                f.flush()
+                os.fsync(f.fileno())
+            self._salvar_indice()
+        return gravados
+
+    def ler(self, nome: str) -> bytes:
+        membro = self.buscar(nome)
+        if membro is None:
+            raise KeyError(nome)
+        with open(self.data_path, 'rb') as f:
+            f.seek(membro['offset'])
+            frame = f.read(membro['tamanho'])
+        dados = zstandard.ZstdDecompressor().decompress(frame, max_output_size=membro['original'])
+        if hashlib.sha256(dados).hexdigest() != membro['sha256']:
+            raise IOError(f"Membro {nome} corrompido em {self.data_path}")
+        return dados
+
+def mes_de(mtime: float) -> str:
+    return datetime.fromtimestamp(mtime).strftime('%Y-%m')
+
+def varrer(pasta: str, ignorar: Tuple[str, ...] = ()) -> Iterator[Tuple[os.DirEntry, os.stat_result]]:
+    """Percorre a árvore numa única passada de os.scandir, com um stat por arquivo."""
+    pendentes = [pasta]
+    while pendentes:
+        atual = pendentes.pop()
+        try:
+            with os.scandir(atual) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        if entrada.name not in ignorar:
+                            pendentes.append(entrada.path)
+                    elif entrada.is_file(follow_symlinks=False):
+                        yield entrada, entrada.stat(follow_symlinks=False)
+        except OSError as e:
+            print(f"Erro ao listar {atual}: {e}")
+
+def abrir_membro(nome: str, pasta_arquivo: str = None) -> bytes:
+    """Lê um membro arquivado; nome é o caminho relativo ao DOWNLOAD_DIR, procurado do mês mais recente ao mais antigo."""
+    pasta_arquivo = pasta_arquivo or os.path.join(SystemConfig.DOWNLOAD_DIR, SystemConfig.ARCHIVE_FOLDER)
+    meses = sorted((n[:-len('.idx.json')] for n in os.listdir(pasta_arquivo) if n.endswith('.idx.json')), reverse=True)
+    for mes in meses:
+        arquivo = MonthlyArchive(pasta_arquivo, mes)
+        if arquivo.buscar(nome):
+            return arquivo.ler(nome)
+    raise KeyError(nome)
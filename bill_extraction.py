@@ -0,0 +1,257 @@
+"""
+Extração combinada: uma única chamada ao LLM por fatura devolve um JSON com
+os campos do nome do arquivo e do RELATÓRIO DE ANÁLISE HÍDRICA. O nome e o
+relatório são montados localmente a partir desse objeto.
+
+O rename e o relatório da mesma fatura pagam uma só chamada: a resposta fica
+num LRU em memória e no cache persistente do gateway.
+"""
+import re
+import json
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+from config import LLMConfig
+from llm_gateway import get_llm_gateway
+
+CAMPOS_RELATORIO = [
+    ('IDENTIFICAÇÃO', [
+        ('condominio', 'Condomínio/Edificação'),
+        ('endereco', 'Endereço'),
+        ('codigo_cliente', 'Código do Cliente'),
+    ]),
+    ('FATURA ATUAL', [
+        ('data_emissao', 'Data de Emissão'),
+        ('periodo_referencia', 'Período de Referência'),
+        ('data_vencimento', 'Data de Vencimento'),
+    ]),
+    ('CONSUMO', [
+        ('leitura_anterior', 'Leitura Anterior'),
+        ('leitura_atual', 'Leitura Atual'),
+        ('consumo_total', 'Consumo Total'),
+        ('consumo_medio_diario', 'Consumo Médio Diário'),
+    ]),
+    ('VALORES', [
+        ('valor_agua', 'Valor do Consumo (Água)'),
+        ('taxa_esgoto', 'Taxa de Esgoto'),
+        ('total', 'TOTAL'),
+    ]),
+]
+
+NAO_INFORMADO = "Não informado"
+NOTA_FINAL = ("⚠️ Nota final: Este relatório foi gerado automaticamente por Inteligência Artificial "
+              "com base na fatura fornecida e **pode conter erros**.")
+
+_ESQUEMA_JSON = """
+    {{
+      "prefixo": "CONDOMINIO" ou "EDIFICIO",
+      "nome": nome do condomínio/edifício sem o prefixo,
+      "bloco": identificação do bloco ou null,
+      "referencia": mês de referência no formato "MM-AAAA",
+      "condominio": nome após "COND"/"ED" ou o nome do imóvel da área "TOTAL A PAGAR",
+      "endereco": "Rua <Nome da rua>, <número>, <Bairro>, <Cidade/UF>, CEP",
+      "codigo_cliente": MATRÍCULA exatamente como aparece, com espaços,
+      "data_emissao": campo "Quando foi emitida?",
+      "periodo_referencia": campo "REFERÊNCIA DA CONTA",
+      "data_vencimento": linha/coluna "VENCIMENTO",
+      "leitura_anterior": leitura "dd/mm/aaaa <inteiro>" mais antiga,
+      "leitura_atual": leitura "dd/mm/aaaa <inteiro>" mais recente,
+      "consumo_total": linha "XXm³ (XX.XXX litros)" ou Leitura Atual − Leitura Anterior,
+      "consumo_medio_diario": 3º número da linha "SEU CONSUMO EM LITROS" do mês de referência, seguido de "litros/dia",
+      "valor_agua": linha "ABASTECIMENTO DE AGUA", em "R$" com duas casas,
+      "taxa_esgoto": linha iniciada com "ESGOTO", em "R$" com duas casas,
+      "total": valor da área "TOTAL A PAGAR" (preferir o total final), em "R$" com duas casas,
+      "observacoes": lista de strings
+    }}
+
+    Regras para "observacoes":
+    - Compare o consumo atual com os últimos 6 meses: variação > +40% da mediana -> "Consumo atípico (acima do histórico)"; < −40% -> "Consumo atípico (abaixo do histórico)".
+    - Se (Leitura Atual − Leitura Anterior) diferir do Consumo Total em mais de 1 m³, inclua "Possível anomalia no registro de consumo" e explique.
+    - Informe EM UPPERCASE, só se constar na fatura: faturamento por média, problema na coleta, uso atípico de água, possibilidade de vazamento ou problema com a leitura.
+    - Lista vazia se não houver observações.
+
+    Campos ausentes no texto devem ser null. Números respeitam os separadores da fatura (ex.: "XX.XXX", "XXX,XX").
+
+"""
+
+TEMPLATE_COMBINADO = """
+    Tarefa: extraia os dados de uma fatura da COPASA exclusivamente a partir do texto fornecido.
+    ⚠️ Não use conhecimento externo, não invente valores, não use "estimado" ou "aprox.". Apenas o que consta no texto.
+
+    Responda APENAS com um objeto JSON válido, sem markdown, com exatamente estas chaves:
+
+""" + _ESQUEMA_JSON + """
+    Conteúdo da fatura:
+    {text}
+    """
+
+def _sem_acentos(texto: str) -> str:
+    texto = unicodedata.normalize('NFKD', texto)
+    return ''.join(ch for ch in texto if not unicodedata.combining(ch))
+
+def parse_resposta(resposta: str) -> Dict:
+    """Converte a resposta do LLM em dict; levanta ValueError se não for o JSON esperado."""
+    inicio, fim = resposta.find('{'), resposta.rfind('}')
+    if inicio < 0 or fim < inicio:
+        raise ValueError("Resposta do LLM sem objeto JSON")
+    try:
+        dados = json.loads(resposta[inicio:fim + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"JSON inválido na resposta do LLM: {e}")
+    if not isinstance(dados, dict):
+        raise ValueError("Resposta do LLM não é um objeto JSON")
+
+    if not dados.get('nome') or not re.fullmatch(r'\d{2}-\d{4}', str(dados.get('referencia') or '')):
+        raise ValueError("JSON sem nome do imóvel ou referência MM-AAAA")
+    return dados
+
+@lru_cache(maxsize=256)
+def extrair_dados_fatura(text_data: str) -> Dict:
+    resposta = get_llm_gateway().invoke(
+        TEMPLATE_COMBINADO, {'text': text_data}, temperature=0.1, validate=parse_resposta
+    )
+    return parse_resposta(resposta)
+
+def render_filename(dados: Dict) -> str:
+    prefixo = 'EDIFICIO' if 'EDIF' in _sem_acentos(str(dados.get('prefixo') or '')).upper() else 'CONDOMINIO'
+    partes = [prefixo]
+    # Parser e LLM às vezes devolvem "BLOCO A"/"Bloco 3" em vez de só "A"/"3"
+    bloco = re.sub(r'^\s*BLOCO\b[\s_:-]*', '', str(dados.get('bloco') or ''), flags=re.IGNORECASE)
+    for valor in (dados['nome'], f"BLOCO{bloco}" if bloco.strip() else None):
+        if valor:
+            limpo = re.sub(r'[^A-Z0-9]+', '_', _sem_acentos(str(valor)).upper()).strip('_')
+            if limpo and limpo != prefixo:
+                partes.append(limpo)
+    partes.append(dados['referencia'])
+    return '_'.join(partes) + '.pdf'
+
+def _valor(dados: Dict, campo: str) -> str:
+    valor = dados.get(campo)
+    if valor is None or str(valor).strip() == '':
+        return NAO_INFORMADO
+    return str(valor).strip()
+
+def render_report(dados: Dict) -> str:
+    linhas: List[str] = ["RELATÓRIO DE ANÁLISE HIDRICA - COPASA", ""]
+    for secao, campos in CAMPOS_RELATORIO:
+        linhas.append(f"{secao}:")
+        for campo, rotulo in campos:
+            linhas.append(f"• {rotulo}: {_valor(dados, campo)}")
+        linhas.append("")
+
+    observacoes = dados.get('observacoes') or []
+    if isinstance(observacoes, str):
+        observacoes = [observacoes]
+    linhas.append("OBSERVAÇÕES:")
+    for observacao in (observacoes or [NAO_INFORMADO]):
+        linhas.append(f"• {observacao}")
+    linhas.extend(["", "=====================================", NOTA_FINAL])
+    return '\n'.join(linhas) + '\n'
+
+def nome_combinado(text_data: str):
+    """Nome do arquivo pela extração combinada, ou None para usar o prompt antigo."""
+    try:
+        return render_filename(extrair_dados_fatura(text_data))
+    except ValueError as e:
+        print(f"[AVISO] Extração combinada falhou, usando prompt de nome: {e}")
+        return None
+
+def relatorio_combinado(text_data: str):
+    """Relatório pela extração combinada, ou None para usar o prompt antigo."""
+    try:
+        return render_report(extrair_dados_fatura(text_data))
+    except ValueError as e:
+        print(f"[AVISO] Extração combinada falhou, usando prompt de relatório: {e}")
+        return None
+
+TEMPLATE_LOTE = """
+    Tarefa: extraia os dados de VÁRIAS faturas da COPASA, cada uma delimitada por
+    <<<FATURA id>>> e <<<FIM id>>>. Trate cada fatura isoladamente, usando apenas o seu próprio texto.
+    ⚠️ Não use conhecimento externo, não invente valores, não use "estimado" ou "aprox.".
+
+    Para CADA fatura responda exatamente neste formato, sem markdown, na mesma ordem:
+
+    <<<RESULTADO id>>>
+    objeto JSON
+    <<<FIM id>>>
+
+    O objeto JSON de cada fatura tem exatamente estas chaves:
+
+""" + _ESQUEMA_JSON + """
+    Faturas:
+    {faturas}
+    """
+
+_RESULTADO = re.compile(r'<<<RESULTADO\s+(\S+?)>>>(.*?)<<<FIM\s+\1>>>', re.DOTALL)
+
+def _estimar_tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+def limite_lote(tamanho: int = None) -> int:
+    """Faturas por requisição, limitado pelo teto de tokens de saída do modelo."""
+    tamanho = tamanho or LLMConfig.REPORT_BATCH_SIZE
+    return max(1, min(tamanho, LLMConfig.MAX_OUTPUT_TOKENS // LLMConfig.OUTPUT_TOKENS_PER_BILL))
+
+def cabe_no_lote(lote: List[Tuple[str, str]], text_data: str, tamanho: int = None) -> bool:
+    if not lote:
+        return True
+    if len(lote) >= limite_lote(tamanho):
+        return False
+    tokens = sum(_estimar_tokens(t) for _, t in lote) + _estimar_tokens(text_data)
+    return tokens + _estimar_tokens(TEMPLATE_LOTE) <= LLMConfig.CONTEXT_TOKENS // 2
+
+def _resultados_lote(resposta: str, lote: List[Tuple[str, str]]) -> Dict[str, Dict]:
+    resultados = {}
+    for indice, corpo in _RESULTADO.findall(resposta):
+        if not indice.isdigit() or not 1 <= int(indice) <= len(lote):
+            continue
+        try:
+            resultados[lote[int(indice) - 1][0]] = parse_resposta(corpo)
+        except ValueError:
+            continue
+    return resultados
+
+def _dados_em_cache(gateway, text_data: str):
+    resposta = gateway.em_cache(TEMPLATE_COMBINADO, {'text': text_data})
+    if resposta is None:
+        return None
+    try:
+        return parse_resposta(resposta)
+    except ValueError:
+        return None
+
+def extrair_dados_lote(lote: List[Tuple[str, str]]) -> Dict[str, Dict]:
+    """
+    Envia várias faturas (id, texto) numa só requisição e devolve {id: dados}
+    só para as que voltaram com JSON válido; as demais ficam de fora.
+
+    Faturas que já passaram por extrair_dados_fatura (no rename, por exemplo)
+    saem do cache por fatura e não entram no lote; as que o lote resolve são
+    gravadas nessa mesma chave.
+    """
+    gateway = get_llm_gateway()
+    resultados, faltantes = {}, []
+    for id_fatura, texto in lote:
+        dados = _dados_em_cache(gateway, texto)
+        if dados is not None:
+            resultados[id_fatura] = dados
+        else:
+            faltantes.append((id_fatura, texto))
+    if not faltantes:
+        return resultados
+
+    faturas = '\n'.join(f"<<<FATURA {i}>>>\n{texto}\n<<<FIM {i}>>>" for i, (_, texto) in enumerate(faltantes, 1))
+
+    def validar(resposta: str):
+        # Resposta sem nenhum bloco aproveitável não vai para o cache do LLM
+        if not _resultados_lote(resposta, faltantes):
+            raise ValueError("Resposta do lote sem nenhum bloco <<<RESULTADO n>>> válido")
+
+    resposta = gateway.invoke(TEMPLATE_LOTE, {'faturas': faturas}, temperature=0.1, validate=validar)
+    novos = _resultados_lote(resposta, faltantes)
+    for id_fatura, texto in faltantes:
+        if id_fatura in novos:
+            gateway.guardar(TEMPLATE_COMBINADO, {'text': texto}, json.dumps(novos[id_fatura], ensure_ascii=False))
+    resultados.update(novos)
+    return resultados
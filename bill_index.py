@@ -0,0 +1,141 @@
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+from config import SystemConfig
+from text_cache import file_sha256
+
+_REFERENCIA = re.compile(r'(\d{2}-\d{4})(?=\.pdf$)', re.IGNORECASE)
+
+def _normalizar_caminho(caminho: Optional[str]) -> Optional[str]:
+    # Destinos remotos (s3://...) ficam como estão
+    if not caminho or '://' in caminho:
+        return caminho
+    return os.path.abspath(caminho)
+
+class BillIndex:
+    """
+    Índice persistente (SQLite, STATE_DB) do conteúdo das faturas.
+
+    Mapeia o SHA-256 de cada PDF para o nome canônico, a matrícula e o mês de
+    referência. Uma fatura repetida é reconhecida pelo hash assim que chega,
+    antes de qualquer extração ou chamada ao LLM. Os hashes ficam guardados
+    por (caminho, tamanho, mtime), então arquivos já vistos não são relidos.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or SystemConfig.STATE_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS faturas (
+                hash TEXT PRIMARY KEY,
+                nome TEXT,
+                matricula TEXT,
+                referencia TEXT,
+                caminho TEXT,
+                registrado_em REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS arquivos (
+                caminho TEXT PRIMARY KEY,
+                tamanho INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                hash TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_faturas_nome ON faturas (nome);
+        """)
+        self._conn.commit()
+
+    def hash_arquivo(self, caminho: str) -> str:
+        caminho = os.path.abspath(caminho)
+        st = os.stat(caminho)
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT hash FROM arquivos WHERE caminho=? AND tamanho=? AND mtime=?",
+                (caminho, st.st_size, st.st_mtime)
+            ).fetchone()
+        if linha:
+            return linha['hash']
+
+        digest = file_sha256(caminho)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO arquivos VALUES (?, ?, ?, ?)",
+                (caminho, st.st_size, st.st_mtime, digest)
+            )
+            self._conn.commit()
+        return digest
+
+    def buscar(self, digest: str) -> Optional[Dict]:
+        with self._lock:
+            linha = self._conn.execute("SELECT * FROM faturas WHERE hash=?", (digest,)).fetchone()
+        return dict(linha) if linha else None
+
+    def registrar(self, caminho: str, matricula: str = None, digest: str = None):
+        """
+        Registra o PDF recém-chegado. Retorna (hash, registro_existente); o
+        registro existente só vem preenchido quando o conteúdo já pertence a
+        outro arquivo, ou seja, quando o PDF é duplicata.
+        """
+        digest = digest or self.hash_arquivo(caminho)
+        caminho = os.path.abspath(caminho)
+        with self._lock:
+            linha = self._conn.execute("SELECT * FROM faturas WHERE hash=?", (digest,)).fetchone()
+            if linha is None:
+                self._conn.execute(
+                    "INSERT INTO faturas (hash, matricula, caminho, registrado_em) VALUES (?, ?, ?, ?)",
+                    (digest, matricula, caminho, time.time())
+                )
+                self._conn.commit()
+                return digest, None
+
+            existente = dict(linha)
+            if existente['caminho'] == caminho or not existente['caminho']:
+                self._conn.execute(
+                    "UPDATE faturas SET caminho=?, matricula=COALESCE(matricula, ?) WHERE hash=?",
+                    (caminho, matricula, digest)
+                )
+                self._conn.commit()
+                return digest, None
+        return digest, existente
+
+    def atualizar(self, digest: str, nome: str = None, caminho: str = None, matricula: str = None):
+        referencia = None
+        if nome:
+            match = _REFERENCIA.search(nome)
+            referencia = match.group(1) if match else None
+        with self._lock:
+            self._conn.execute(
+                """UPDATE faturas SET
+                       nome=COALESCE(?, nome),
+                       referencia=COALESCE(?, referencia),
+                       caminho=COALESCE(?, caminho),
+                       matricula=COALESCE(?, matricula)
+                   WHERE hash=?""",
+                (nome, referencia, _normalizar_caminho(caminho), matricula, digest)
+            )
+            self._conn.commit()
+
+    def remover(self, digest: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM faturas WHERE hash=?", (digest,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_index: Optional[BillIndex] = None
+_index_lock = threading.Lock()
+
+def get_bill_index() -> BillIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BillIndex()
+        return _index
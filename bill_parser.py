@@ -0,0 +1,134 @@
+"""
+Parser determinístico do nome de arquivo das faturas COPASA.
+
+Extrai do texto do pdfplumber o tipo do imóvel (CONDOMINIO/EDIFICIO), o nome,
+o bloco e o mês de referência, e monta <TIPO>_<NOME>_<BLOCO>_<MM-AAAA>.pdf.
+Quando o layout não bate, a confiança fica baixa e o chamador usa o LLM.
+
+Uso: python bill_parser.py <pasta_com_txts>  (mede a cobertura do parser)
+"""
+import re
+import sys
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+from config import SystemConfig
+
+MESES = {
+    'JAN': '01', 'FEV': '02', 'MAR': '03', 'ABR': '04', 'MAI': '05', 'JUN': '06',
+    'JUL': '07', 'AGO': '08', 'SET': '09', 'OUT': '10', 'NOV': '11', 'DEZ': '12',
+}
+
+_REFERENCIA_LABEL = re.compile(r'REFERENCIA\s+DA\s+CONTA|MES\s+DE\s+REFERENCIA|REFERENCIA')
+_REFERENCIA_NUM = re.compile(r'(?<![\d/])(0[1-9]|1[0-2])\s*/\s*(20\d{2})\b')
+_REFERENCIA_MES = re.compile(r'\b(JAN|FEV|MAR|ABR|MAI|JUN|JUL|AGO|SET|OUT|NOV|DEZ)[A-Z]*\s*/\s*(20\d{2})\b')
+
+_IMOVEL = re.compile(r'\b(CONDOMINIO|COND\.?|EDIFICIO|EDIF\.?|ED\.?)\s+(?:DO\s+|DE\s+)?(?:(?:EDIFICIO|EDIF\.?|ED\.?)\s+)?([A-Z0-9][A-Z0-9 .\'-]{1,60})')
+_BLOCO = re.compile(r'\b(?:BLOCO|BLC|BL)\.?\s*[-:]?\s*([A-Z0-9]{1,3})\b')
+_FIM_NOME = re.compile(r'\b(?:BLOCO|BLC|BL|RUA|R\.|AV|AV\.|AVENIDA|ALAMEDA|AL\.|PRACA|TRAVESSA|TV\.|ROD|RODOVIA|CEP|\d{2,})\b')
+
+def _normalizar(texto: str) -> str:
+    texto = unicodedata.normalize('NFKD', texto)
+    texto = ''.join(ch for ch in texto if not unicodedata.combining(ch))
+    return texto.upper()
+
+def _referencia(texto: str) -> Optional[str]:
+    label = _REFERENCIA_LABEL.search(texto)
+    trechos = [texto[label.end():label.end() + 120]] if label else []
+    trechos.append(texto)
+
+    for trecho in trechos:
+        numerico = _REFERENCIA_NUM.search(trecho)
+        if numerico:
+            return f"{numerico.group(1)}-{numerico.group(2)}"
+        por_extenso = _REFERENCIA_MES.search(trecho)
+        if por_extenso:
+            return f"{MESES[por_extenso.group(1)]}-{por_extenso.group(2)}"
+    return None
+
+def _imovel(texto: str):
+    candidatos = []
+    for linha in texto.splitlines():
+        match = _IMOVEL.search(linha)
+        if not match:
+            continue
+
+        prefixo = 'CONDOMINIO' if match.group(1).startswith('COND') else 'EDIFICIO'
+        resto = match.group(2)
+        corte = _FIM_NOME.search(resto)
+        nome = resto[:corte.start()] if corte else resto
+        nome = re.sub(r'[^A-Z0-9 ]', ' ', nome)
+        palavras = nome.split()
+        while palavras and palavras[0] in ('DO', 'DA', 'DE', 'DOS', 'DAS'):
+            palavras.pop(0)
+        if not palavras:
+            continue
+
+        bloco = _BLOCO.search(resto)
+        candidatos.append((prefixo, '_'.join(palavras), bloco.group(1) if bloco else None))
+    return candidatos
+
+def parse_bill_name(text_data: str) -> Optional[Dict]:
+    """
+    Retorna {'prefixo', 'nome', 'bloco', 'referencia', 'confianca', 'arquivo'}
+    ou None se nem o imóvel nem a referência forem encontrados.
+    """
+    texto = _normalizar(text_data or '')
+    referencia = _referencia(texto)
+    candidatos = _imovel(texto)
+
+    if not candidatos or not referencia:
+        return None
+
+    prefixo, nome, bloco = candidatos[0]
+    confianca = 1.0
+    # Nomes diferentes na mesma fatura indicam que o layout não é o esperado
+    if len({(c[0], c[1]) for c in candidatos}) > 1:
+        confianca -= 0.4
+    if not _REFERENCIA_LABEL.search(texto):
+        confianca -= 0.3
+    if len(nome) < 3:
+        confianca -= 0.3
+
+    partes = [prefixo, nome]
+    if bloco:
+        partes.append(f"BLOCO{bloco}")
+    partes.append(referencia)
+
+    return {
+        'prefixo': prefixo,
+        'nome': nome,
+        'bloco': bloco,
+        'referencia': referencia,
+        'confianca': round(max(confianca, 0.0), 2),
+        'arquivo': '_'.join(partes) + '.pdf',
+    }
+
+def medir_cobertura(pasta_txts: str, confianca_minima: float = None) -> Dict:
+    confianca_minima = confianca_minima or SystemConfig.PARSER_MIN_CONFIDENCE
+    arquivos = sorted(Path(pasta_txts).glob('*.txt'))
+    resolvidos = 0
+    falhas = []
+    for arquivo in arquivos:
+        parsed = parse_bill_name(arquivo.read_text(encoding='utf-8', errors='ignore'))
+        if parsed and parsed['confianca'] >= confianca_minima:
+            resolvidos += 1
+        else:
+            falhas.append(arquivo.name)
+    return {
+        'total': len(arquivos),
+        'resolvidos': resolvidos,
+        'cobertura': (resolvidos / len(arquivos) * 100) if arquivos else 0,
+        'falhas': falhas,
+    }
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Uso: python bill_parser.py <pasta_com_txts>")
+        sys.exit(1)
+
+    resultado = medir_cobertura(sys.argv[1])
+    print(f"📄 Faturas analisadas: {resultado['total']}")
+    print(f"✅ Resolvidas pelo parser: {resultado['resolvidos']} ({resultado['cobertura']:.1f}%)")
+    for nome in resultado['falhas'][:20]:
+        print(f"   ↪ LLM necessário: {nome}")
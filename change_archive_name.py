@@ -1,30 +1,35 @@
 import os
-import time
 import shutil
-import pdfplumber
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
+from bill_parser import parse_bill_name
+from llm_gateway import get_llm_gateway
+from bill_extraction import nome_combinado
+from text_cache import extract_text
+from bill_index import get_bill_index
+from pipeline_manifest import get_pipeline_manifest, PipelineStage
+from config import SystemConfig, LLMConfig
 
 load_dotenv()
 
-def get_new_filename_from_pdf(pdf_path):
-    with pdfplumber.open(pdf_path) as pdf:
-        text_data = ""
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text:
-                text_data += text + '\n'
+def get_new_filename_from_pdf(pdf_path, text_data=None):
+    if text_data is None:
+        text_data = extract_text(pdf_path)
 
-    llm = ChatGoogleGenerativeAI(model='gemini-2.0-flash-lite', temperature=0.2)
+    parsed = parse_bill_name(text_data)
+    if parsed and parsed['confianca'] >= SystemConfig.PARSER_MIN_CONFIDENCE:
+        return parsed['arquivo']
+
+    if LLMConfig.COMBINED_MODE:
+        novo_nome = nome_combinado(text_data)
+        if novo_nome:
+            return novo_nome
 
     template = """
     Você receberá o conteúdo textual de uma fatura da Copasa.
 
     Sua tarefa é gerar APENAS um nome de arquivo no seguinte formato:
 
-    <nome_condominio_ou_edificio>_<bloco_se_existir>_<MM-AAAA>.pdf
+    <PREFIXO>_<NOME>_<BLOCO_se_existir>_<MM-AAAA>.pdf
 
     Regras:
     1. Se o imóvel for um CONDOMÍNIO, use o prefixo "CONDOMINIO".
@@ -36,19 +41,14 @@ def get_new_filename_from_pdf(pdf_path):
     7. Retorne APENAS o nome do arquivo final, sem explicações adicionais.
 
     Exemplo esperado:
-    CONDOMINIO SOL BLOCO-A 01-2024.pdf
-    EDIFICIO CENTRAL 07-2023.pdf
+    CONDOMINIO_SOL_BLOCOA_01-2024.pdf
+    EDIFICIO_CENTRAL_07-2023.pdf
 
     Conteúdo da fatura:
     {text}
     """
 
-
-    prompt = PromptTemplate(input_variables=['text'], template=template)
-    chain = prompt | llm | StrOutputParser()
-
-    time.sleep(4)
-    novo_nome = chain.invoke({'text': text_data}).strip()
+    novo_nome = get_llm_gateway().invoke(template, {'text': text_data}, temperature=0.2).strip()
     return novo_nome
 
 def check_duplicate_exists(pasta, novo_nome):
@@ -105,6 +105,40 @@ def rename_all_pdfs(pasta):
     
     return arquivos_processados
 
+def mover_para_duplicatas(caminho, pasta_duplicatas, motivo):
+    nome_atual = os.path.basename(caminho)
+    os.makedirs(pasta_duplicatas, exist_ok=True)
+    caminho_duplicata = os.path.join(pasta_duplicatas, nome_atual)
+    contador = 1
+    nome_base, ext = os.path.splitext(nome_atual)
+    while os.path.exists(caminho_duplicata):
+        novo_nome_duplicata = f"{nome_base}_{contador}{ext}"
+        caminho_duplicata = os.path.join(pasta_duplicatas, novo_nome_duplicata)
+        contador += 1
+    
+    shutil.move(caminho, caminho_duplicata)
+    print(f"[DUPLICATA MOVIDA] {nome_atual} -> Duplicatas/{os.path.basename(caminho_duplicata)} ({motivo})\n")
+    return caminho_duplicata
+
+def rename_pdf_safe_mode(caminho, pasta_duplicatas, nomes_ja_processados, text_data=None, novo_nome=None):
+    """
+    Renomeia um PDF; se o nome gerado já existir, move o arquivo para Duplicatas.
+    Retorna o novo caminho, ou None quando o arquivo foi tratado como duplicata.
+    """
+    nome_atual = os.path.basename(caminho)
+    diretorio = os.path.dirname(caminho)
+    novo_nome = novo_nome or get_new_filename_from_pdf(caminho, text_data)
+    
+    if novo_nome in nomes_ja_processados or check_duplicate_exists(diretorio, novo_nome):
+        mover_para_duplicatas(caminho, pasta_duplicatas, f"nome seria: {novo_nome}")
+        return None
+    
+    novo_caminho = os.path.join(diretorio, novo_nome)
+    shutil.move(caminho, novo_caminho)
+    nomes_ja_processados.add(novo_nome)
+    print(f"[RENOMEADO] {nome_atual} -> {novo_nome}\n")
+    return novo_caminho
+
 def rename_all_pdfs_safe_mode(pasta):
     arquivos_processados = []
     arquivos_movidos = 0
@@ -123,38 +157,51 @@ def rename_all_pdfs_safe_mode(pasta):
     nomes_ja_processados = set()
     
     arquivos_ja_renomeados = []
+    indice = get_bill_index()
+    manifesto = get_pipeline_manifest()
+    conhecidos = manifesto.conhecidos(pasta)
     for caminho in pdfs_para_processar[:]:
         nome_atual = os.path.basename(caminho)
-        if '_' in nome_atual and not nome_atual.startswith(('temp', 'download', 'fatura')):
+        registro = conhecidos.get(os.path.abspath(caminho))
+        if registro:
+            ja_renomeado = registro['etapa'] >= PipelineStage.RENAMED
+        else:
+            # Arquivos anteriores ao manifesto: a heurística pelo nome vale só para eles
+            ja_renomeado = '_' in nome_atual and not nome_atual.startswith(('temp', 'download', 'fatura'))
+        if ja_renomeado:
             nomes_ja_processados.add(nome_atual)
             arquivos_ja_renomeados.append(caminho)
             pdfs_para_processar.remove(caminho)
+            if not registro:
+                digest, existente = indice.registrar(caminho)
+                if existente is None:
+                    indice.atualizar(digest, nome=nome_atual, caminho=caminho)
+                    manifesto.registrar(digest, caminho, PipelineStage.RENAMED)
     
     for caminho in pdfs_para_processar:
         nome_atual = os.path.basename(caminho)
-        diretorio = os.path.dirname(caminho)
         
         try:
             print(f"[PROCESSANDO] {nome_atual}...")
-            novo_nome = get_new_filename_from_pdf(caminho)
+            # Conteúdo já conhecido vai direto para Duplicatas, sem extração nem LLM
+            digest, existente = indice.registrar(caminho)
+            if existente is not None:
+                mover_para_duplicatas(caminho, pasta_duplicatas, f"mesmo conteúdo de {existente['nome'] or existente['caminho']}")
+                arquivos_movidos += 1
+                continue
+            manifesto.registrar(digest, caminho)
             
-            if novo_nome in nomes_ja_processados or check_duplicate_exists(diretorio, novo_nome):
-                caminho_duplicata = os.path.join(pasta_duplicatas, nome_atual)
-                contador = 1
-                nome_base, ext = os.path.splitext(nome_atual)
-                while os.path.exists(caminho_duplicata):
-                    novo_nome_duplicata = f"{nome_base}_{contador}{ext}"
-                    caminho_duplicata = os.path.join(pasta_duplicatas, novo_nome_duplicata)
-                    contador += 1
-                
-                shutil.move(caminho, caminho_duplicata)
-                print(f"[DUPLICATA MOVIDA] {nome_atual} -> Duplicatas/{os.path.basename(caminho_duplicata)} (nome seria: {novo_nome})\n")
+            novo_caminho = rename_pdf_safe_mode(
+                caminho, pasta_duplicatas, nomes_ja_processados, extract_text(caminho, digest)
+            )
+            
+            if novo_caminho is None:
+                indice.remover(digest)
+                manifesto.remover(digest)
                 arquivos_movidos += 1
             else:
-                novo_caminho = os.path.join(diretorio, novo_nome)
-                shutil.move(caminho, novo_caminho)
-                nomes_ja_processados.add(novo_nome)
-                print(f"[RENOMEADO] {nome_atual} -> {novo_nome}\n")
+                indice.atualizar(digest, nome=os.path.basename(novo_caminho), caminho=novo_caminho)
+                manifesto.avancar(digest, PipelineStage.RENAMED, caminho=novo_caminho)
                 arquivos_processados.append(novo_caminho)
                 
         except Exception as e:
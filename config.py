@@ -23,13 +23,39 @@ class SystemConfig:
     RECOVERY_INTERVAL = 1             
     STABILIZATION_WAIT = 30           
     DOWNLOAD_CHECK_INTERVAL = 0.3     
+    DOWNLOAD_WATCH_POLL_INTERVAL = 0.05
+    
+    HTTP_FETCH_ENABLED = os.getenv("HTTP_FETCH", "0") == "1"
+    HTTP_FETCH_CONCURRENCY = int(os.getenv("HTTP_FETCH_CONCURRENCY", "4"))
+    HTTP_FETCH_TIMEOUT = 30
+    
+    PIPELINE_ENABLED = os.getenv("PIPELINE_ENABLED", "1") == "1"
+    PIPELINE_QUEUE_SIZE = 16
+    
+    PARSER_MIN_CONFIDENCE = float(os.getenv("PARSER_MIN_CONFIDENCE", "0.7"))
+    
+    # Backend de extração (pdfplumber, pdfminer, pypdfium2), páginas "1,2" e regiões
+    # "x0,y0,x1,y1;..." em frações da página; vazio = documento inteiro
+    PDF_TEXT_BACKEND = os.getenv("PDF_TEXT_BACKEND", "pdfplumber")
+    PDF_TEXT_PAGES = os.getenv("PDF_TEXT_PAGES", "")
+    PDF_TEXT_REGIONS = os.getenv("PDF_TEXT_REGIONS", "")
+    
+    TEXT_CACHE_DIR = os.getenv("TEXT_CACHE_DIR", ".text_cache")
+    TEXT_CACHE_MAX_MB = int(os.getenv("TEXT_CACHE_MAX_MB", "512"))
+    EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+    EXTRACT_MAX_TASKS_PER_CHILD = 50
     
     STATS_LOG_INTERVAL = 5            
     
     DOWNLOAD_DIR = os.getenv("DOWNLOAD_DIR")
     DUPLICATES_FOLDER = "Duplicatas"
+    STATE_DB = os.getenv("STATE_DB", "estado.sqlite3")
     TXT_FOLDER = "contas_txt"
     REPORTS_FOLDER = "relatorios"
+    # clean --archive: PDFs, textos e relatórios antigos vão para <DOWNLOAD_DIR>/Arquivo/<mês>.zst
+    ARCHIVE_FOLDER = "Arquivo"
+    ARCHIVE_EXTENSIONS = ('.pdf', '.txt')
+    ARCHIVE_ZSTD_LEVEL = int(os.getenv("ARCHIVE_ZSTD_LEVEL", "10"))
 
 class DatabaseConfig:
     SUPABASE_URL = os.getenv("SUPABASE_URL")
@@ -37,6 +63,62 @@ class DatabaseConfig:
     
     RECENT_DOWNLOAD_DAYS = 5          
     CHECK_TODAY_ONLY = True           
+    
+    IN_QUERY_BATCH_SIZE = 200         
+    
+    WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "1") == "1"
+    WRITE_BEHIND_BATCH_SIZE = 25      
+    WRITE_BEHIND_FLUSH_INTERVAL = 5   
+    ATTEMPTS_JOURNAL = os.getenv("ATTEMPTS_JOURNAL", "tentativas_journal.jsonl")
+    ATTEMPTS_DEAD_LETTER = os.getenv("ATTEMPTS_DEAD_LETTER", "tentativas_rejeitadas.jsonl")
+
+class SessionConfig:
+    CACHE_DIR = os.getenv("SESSION_CACHE_DIR", ".session_cache")
+    KEY = os.getenv("SESSION_CACHE_KEY")
+    TTL = int(os.getenv("SESSION_CACHE_TTL", os.getenv("RELAUNCH_TIME", "720")))
+    PROBE_TIMEOUT = 5
+    
+    PORTAL_LOGIN_URL = "https://copasaportalprd.azurewebsites.net/Copasa.Portal/Login/index"
+
+class StorageConfig:
+    # Origem padrão de mover_arquivos_e_relatorios quando chamado sem pastas
+    SOURCE_DIR = os.getenv("STORAGE_SOURCE_DIR", r"C:\Users\User\Documents\Automacao\download_copasa_bills\Faturas")
+    SOURCE_REPORTS_DIR = os.getenv(
+        "STORAGE_SOURCE_REPORTS_DIR",
+        r"C:\Users\User\Documents\Automacao\download_copasa_bills\Faturas\Relatorios - FATURAS"
+    )
+    # Caminho local/compartilhamento montado ou s3://bucket/prefixo
+    PDF_DESTINATION = os.getenv("STORAGE_PDF_DEST", r"z:\RINTEC - 01 - GERAL\RINTEC - COPASA TESTE\Faturas")
+    REPORT_DESTINATION = os.getenv("STORAGE_REPORT_DEST", r"z:\RINTEC - 01 - GERAL\RINTEC - COPASA TESTE\Relatorios")
+    S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+    
+    WORKERS = int(os.getenv("STORAGE_WORKERS", "4"))
+    # Arquivos mais novos que isso podem ainda estar sendo escritos
+    MIN_FILE_AGE = 2
+    PARTIAL_SUFFIXES = ('.crdownload', '.part', '.tmp')
+
+class LLMConfig:
+    MODEL = os.getenv("LLM_MODEL", "gemini-2.0-flash-lite")
+    # Cota real da API (ver console do Google AI Studio)
+    REQUESTS_PER_MINUTE = int(os.getenv("LLM_RPM", "30"))
+    TOKENS_PER_MINUTE = int(os.getenv("LLM_TPM", "1000000"))
+    CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+    # Uma única chamada JSON por fatura alimenta o nome do arquivo e o relatório
+    COMBINED_MODE = os.getenv("LLM_COMBINED", "1") == "1"
+    # Faturas por requisição nos relatórios (1 = uma por vez); exige COMBINED_MODE
+    REPORT_BATCH_SIZE = int(os.getenv("LLM_REPORT_BATCH", "1"))
+    CONTEXT_TOKENS = 1000000
+    MAX_OUTPUT_TOKENS = 8192
+    OUTPUT_TOKENS_PER_BILL = 600
+    
+    MAX_RETRIES = 5
+    BACKOFF_BASE = 2
+    BACKOFF_MAX = 60
+    
+    CACHE_ENABLED = os.getenv("LLM_CACHE", "1") == "1"
+    CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3")
+    CACHE_TTL = int(os.getenv("LLM_CACHE_TTL_DAYS", "90")) * 24 * 3600
+    CACHE_MAX_ENTRIES = 20000
 
 class WebmailConfig:
     WEBMAIL_HOST = os.getenv("WEBMAIL_HOST")
@@ -44,6 +126,13 @@ class WebmailConfig:
     DEFAULT_TIMEOUT = 20
     SEARCH_TIMEOUT = 15
     EMAIL_LOAD_TIMEOUT = 10
+    
+    TOKEN_BACKEND = os.getenv("WEBMAIL_TOKEN_BACKEND", "browser")
+    IMAP_HOST = os.getenv("IMAP_HOST")
+    IMAP_PORT = int(os.getenv("IMAP_PORT", "993"))
+    IMAP_SSL = os.getenv("IMAP_SSL", "1") == "1"
+    IMAP_TIMEOUT = 60
+    IMAP_POLL_INTERVAL = 0.5
 
 class DriverConfig:
     @staticmethod
@@ -79,11 +168,21 @@ class LoggingConfig:
     
     LOG_FILES = {
         'main': 'download_bills.log',
-        'runner': 'runner.log',
         'system_monitor': 'system_monitor.log'
     }
     
     ENCODING = 'utf-8'
+    # Arquivo em JSON lines (cpf, matricula, phase, duration_ms); o console segue em FORMAT
+    JSON = os.getenv("LOG_JSON", "1") == "1"
+    MAX_BYTES = int(os.getenv("LOG_MAX_MB", "50")) * 1024 * 1024
+    BACKUP_COUNT = int(os.getenv("LOG_BACKUPS", "10"))
+    COMPRESS_ROTATED = True
+
+class MetricsConfig:
+    # /metrics em texto Prometheus enquanto a execução roda (0 desliga)
+    PORT = int(os.getenv("METRICS_PORT", "9108"))
+    HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+    BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
 
 class PerformanceConfig:
     MAX_MODALS_TO_CHECK = 3           
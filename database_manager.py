@@ -2,7 +2,9 @@ import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 from supabase import create_client, Client
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Set
+from config import DatabaseConfig
+from attempt_buffer import get_attempt_buffer, montar_tentativa
 
 load_dotenv()
 
@@ -47,48 +49,43 @@ class DatabaseManager:
             
         return self._extract_matriculas(response)
 
+    def matriculas_ja_baixadas_desde(self, matriculas: List[str], desde) -> Set[str]:
+        """
+        Retorna quais matrículas já tiveram download com sucesso a partir de `desde`,
+        com uma única consulta `in_` por lote (apenas a coluna matricula_numero).
+        """
+        matriculas = list(dict.fromkeys(str(m) for m in matriculas if str(m).strip()))
+        if not matriculas:
+            return set()
+
+        ja_baixadas = set()
+        lote = DatabaseConfig.IN_QUERY_BATCH_SIZE
+        for i in range(0, len(matriculas), lote):
+            response = (
+                self.supabase.table('tentativas_download')
+                .select('matricula_numero')
+                .in_('matricula_numero', matriculas[i:i + lote])
+                .eq('sucesso', True)
+                .gte('data_tentativa', desde)
+                .execute()
+            )
+            ja_baixadas.update(str(item['matricula_numero']) for item in response.data)
+
+        return ja_baixadas
+
+    def _inicio_mes_atual(self):
+        agora = datetime.now()
+        return datetime(agora.year, agora.month, 1).date()
+
     def matricula_ja_baixada_hoje(self, matricula: str) -> bool:
-        hoje = datetime.now().date()
-        
-        response = (
-            self.supabase.table('tentativas_download')
-            .select('*')
-            .eq('matricula_numero', matricula)
-            .eq('sucesso', True)
-            .eq('data_tentativa', hoje)
-            .execute()
-        )
-        
-        return len(response.data) > 0
+        return str(matricula) in self.matriculas_ja_baixadas_desde([matricula], datetime.now().date())
 
     def matricula_ja_baixada_no_mes_atual(self, matricula: str) -> bool:
-        agora = datetime.now()
-        inicio_mes = datetime(agora.year, agora.month, 1).date()
-        
-        response = (
-            self.supabase.table('tentativas_download')
-            .select('*')
-            .eq('matricula_numero', matricula)
-            .eq('sucesso', True)
-            .gte('data_tentativa', inicio_mes)
-            .execute()
-        )
-        
-        return len(response.data) > 0
+        return str(matricula) in self.matriculas_ja_baixadas_desde([matricula], self._inicio_mes_atual())
 
     def matricula_ja_baixada_recentemente(self, matricula: str, dias: int = 1) -> bool:
         data_limite = datetime.now() - timedelta(days=dias)
-        
-        response = (
-            self.supabase.table('tentativas_download')
-            .select('*')
-            .eq('matricula_numero', matricula)
-            .eq('sucesso', True)
-            .gte('data_tentativa', data_limite.date())
-            .execute()
-        )
-        
-        return len(response.data) > 0
+        return str(matricula) in self.matriculas_ja_baixadas_desde([matricula], data_limite.date())
 
     def get_matriculas_pendentes(self, dias_atras: int = 5, cpf: str = None) -> List[str]:
         data_limite = datetime.now() - timedelta(days=dias_atras)
@@ -132,17 +129,18 @@ class DatabaseManager:
         if not matriculas:
             return []
         
-        matriculas_nao_baixadas = []
+        if verificar_mes_atual:
+            desde = self._inicio_mes_atual()
+            periodo = "no mês atual"
+        else:
+            desde = datetime.now().date()
+            periodo = "hoje"
         
+        ja_baixadas = self.matriculas_ja_baixadas_desde(matriculas, desde)
+        
+        matriculas_nao_baixadas = []
         for matricula in matriculas:
-            if verificar_mes_atual:
-                ja_baixada = self.matricula_ja_baixada_no_mes_atual(matricula)
-                periodo = "no mês atual"
-            else:
-                ja_baixada = self.matricula_ja_baixada_hoje(matricula)
-                periodo = "hoje"
-            
-            if not ja_baixada:
+            if str(matricula) not in ja_baixadas:
                 matriculas_nao_baixadas.append(matricula)
             else:
                 print(f"📋 Matrícula {matricula} já foi baixada com sucesso {periodo} - PULANDO")
@@ -150,12 +148,16 @@ class DatabaseManager:
         return matriculas_nao_baixadas
 
     def registrar_tentativa(self, matricula: str, sucesso: bool, erro: str = None):
-        data = {
-            'matricula_numero': matricula,
-            'sucesso': sucesso,
-            'erro': erro
-        }
-        self.supabase.table('tentativas_download').insert(data).execute()
+        data = montar_tentativa(matricula, sucesso, erro)
+        if DatabaseConfig.WRITE_BEHIND_ENABLED:
+            get_attempt_buffer(self.supabase).registrar(data)
+        else:
+            self.supabase.table('tentativas_download').insert(data).execute()
+
+    def flush_tentativas(self) -> bool:
+        if not DatabaseConfig.WRITE_BEHIND_ENABLED:
+            return True
+        return get_attempt_buffer(self.supabase).flush()
 
     def get_matriculas_para_cpf(self, cpf: str, incluir_pendentes: bool = True, verificar_duplicatas: bool = True) -> List[str]:
         hoje = datetime.now().day
@@ -167,9 +169,10 @@ class DatabaseManager:
             matriculas_hoje = list(set(matriculas_hoje))
         
         if verificar_duplicatas:
+            ja_baixadas = self.matriculas_ja_baixadas_desde(matriculas_hoje, self._inicio_mes_atual())
             matriculas_filtradas = []
             for matricula in matriculas_hoje:
-                if not self.matricula_ja_baixada_no_mes_atual(matricula):
+                if str(matricula) not in ja_baixadas:
                     matriculas_filtradas.append(matricula)
                 else:
                     print(f"🚫 Matrícula {matricula} já baixada este mês - REMOVIDA")
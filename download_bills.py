@@ -1,8 +1,9 @@
 import os
 import time
 import logging
+import threading
 from enum import Enum
-from typing import Set, Optional, Tuple, Dict
+from typing import Set, Optional, Tuple, Dict, List, Callable
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support.ui import WebDriverWait
@@ -18,17 +19,21 @@ from change_archive_name import rename_all_pdfs_safe_mode
 from analysis_generator import generate_reports_from_folder
 from rename_existing_pdf import rename_only_new
 from move_files import mover_arquivos_e_relatorios
+from download_watcher import DownloadWatcher, DownloadTicket
+from identifier_table import snapshot_identifier_table
+from session_cache import session_cache
+from http_fetcher import HttpBillFetcher
+from post_processing import PostProcessingPipeline
+from config import SystemConfig, LoggingConfig
+from logging_setup import configurar_logging, definir_contexto
+from metrics import BILLS, PHASE_SECONDS, SYSTEM_STATE, RECOVERY_ACTIONS, PENDING, iniciar_servidor, rotulo_conta
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('download_bills.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+configurar_logging(LoggingConfig.LOG_FILES['main'])
 logger = logging.getLogger(__name__)
 
+# Status do Selenium que encerram a matrícula (contados em copasa_bills_total)
+_RESULTADOS_FINAIS = ("success", "no_debt", "no_invoice", "download_failed", "error", "failed")
+
 class SystemState(Enum):
     HEALTHY = "healthy"
     SLOW = "slow" 
@@ -60,6 +65,11 @@ class COPASASystemMonitor:
         self.last_problem_time = 0
         
     def detect_system_state(self, driver) -> SystemState:
+        state = self._detect_system_state(driver)
+        SYSTEM_STATE.inc(state.value)
+        return state
+    
+    def _detect_system_state(self, driver) -> SystemState:
         try:
             modal_state = self._quick_modal_check(driver)
             if modal_state != SystemState.HEALTHY:
@@ -164,6 +174,7 @@ class COPASASystemMonitor:
         self.consecutive_problems += 1
         self.last_problem_time = time.time()
         self.recovery_stats[action] += 1
+        RECOVERY_ACTIONS.inc(action.value)
         
         try:
             if action == RecoveryAction.CLOSE_MODAL:
@@ -261,12 +272,69 @@ class DownloadMonitor:
                        f"Processadas: {self.total_processadas} | Eficiência: {eficiencia:.1f}%")
 
 class OptimizedDownloadManager:
-    def __init__(self, download_folder: str):
+    def __init__(self, download_folder: str, db: DatabaseManager = None):
         self.download_folder = download_folder
+        self.db = db
         self.monitor = COPASASystemMonitor()
         self.processed_count = 0
         self.error_count = 0
         self.start_time = time.time()
+        self.watcher = DownloadWatcher(download_folder).start()
+        self.last_downloaded_file: Optional[str] = None
+        self.on_file_downloaded: Optional[Callable[[str, str], None]] = None
+        
+        self.http_fetcher: Optional[HttpBillFetcher] = None
+        self.http_failures: List[str] = []
+        self.force_selenium: Set[str] = set()
+        self._http_lock = threading.Lock()
+        if SystemConfig.HTTP_FETCH_ENABLED:
+            try:
+                self.http_fetcher = HttpBillFetcher(download_folder, watcher=self.watcher)
+                logger.info(f"🌐 Download HTTP ativo ({self.http_fetcher.concurrency} conexões)")
+            except RuntimeError as e:
+                logger.warning(f"⚠️ Download HTTP indisponível, usando apenas Selenium: {e}")
+        
+    def close(self):
+        if self.http_fetcher:
+            self.http_fetcher.close()
+            for matricula in self.coletar_falhas_http():
+                logger.error(f"❌ {matricula}: Falha no download HTTP (sem tempo para fallback no Selenium)")
+                if self.db:
+                    self.db.registrar_tentativa(matricula, False, "Falha no download HTTP")
+        self.watcher.stop()
+    
+    def http_em_andamento(self) -> bool:
+        return bool(self.http_fetcher and self.http_fetcher.inflight())
+    
+    def aguardar_http(self, timeout: float):
+        if self.http_fetcher:
+            self.http_fetcher.wait(timeout)
+    
+    def coletar_falhas_http(self) -> List[str]:
+        with self._http_lock:
+            falhas, self.http_failures = self.http_failures, []
+        return falhas
+    
+    def _on_http_done(self, matricula: str, future):
+        try:
+            path = future.result()
+        except Exception as e:
+            logger.warning(f"⚠️ {matricula}: download HTTP falhou ({e}) - nova tentativa via Selenium")
+            BILLS.inc("http_failed")
+            with self._http_lock:
+                self.http_failures.append(matricula)
+                self.force_selenium.add(matricula)
+            return
+        
+        if self.db:
+            self.db.registrar_tentativa(matricula, True)
+        with self._http_lock:
+            self.processed_count += 1
+            self.last_downloaded_file = path
+        logger.info(f"✅ {matricula}: Download HTTP concluído")
+        BILLS.inc("http_success")
+        if self.on_file_downloaded:
+            self.on_file_downloaded(path, matricula)
         
     def process_matricula_with_recovery(self, driver, wait, row, db, matricula: str) -> Tuple[str, str]:
         max_attempts = 2
@@ -337,11 +405,22 @@ class OptimizedDownloadManager:
                 download_button = WebDriverWait(driver, 10).until(
                     EC.element_to_be_clickable((By.CLASS_NAME, "fa-download"))
                 )
+                
+                if self.http_fetcher and matricula not in self.force_selenium:
+                    url = self.http_fetcher.resolve_url(driver, download_button)
+                    if url:
+                        self.http_fetcher.sync_session(driver)
+                        self.http_fetcher.submit(url, matricula, self._on_http_done)
+                        return "queued", "Download HTTP enfileirado"
+                
+                ticket = self.watcher.expect()
                 download_button.click()
                 
-                if self._wait_download_optimized():
+                if self._wait_download_optimized(ticket):
                     db.registrar_tentativa(matricula, True)
                     self.processed_count += 1
+                    if self.on_file_downloaded:
+                        self.on_file_downloaded(self.last_downloaded_file, matricula)
                     return "success", "Download realizado"
                 else:
                     db.registrar_tentativa(matricula, False, "Falha no download")
@@ -355,24 +434,13 @@ class OptimizedDownloadManager:
             self.error_count += 1
             return "error", f"Erro no processamento: {str(e)}"
     
-    def _wait_download_optimized(self, timeout: int = 10) -> bool:
-        initial_files = set(os.listdir(self.download_folder))
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            try:
-                current_files = set(os.listdir(self.download_folder))
-                new_files = current_files - initial_files
-                
-                if new_files:
-                    temp_files = [f for f in new_files if f.endswith(('.crdownload', '.part', '.tmp'))]
-                    if not temp_files:
-                        return True
-                        
-            except OSError:
-                pass
-            time.sleep(0.3)
-        
+    def _wait_download_optimized(self, ticket: DownloadTicket, timeout: int = 10) -> bool:
+        downloaded = self.watcher.wait(ticket, timeout)
+        if downloaded:
+            self.last_downloaded_file = downloaded
+            logger.debug(f"📄 Arquivo finalizado: {os.path.basename(downloaded)} "
+                         f"({(time.monotonic() - ticket.started) * 1000:.0f} ms)")
+            return True
         return False
     
     def should_continue(self) -> bool:
@@ -399,170 +467,214 @@ class OptimizedDownloadManager:
 def _normalize_matricula(s: str) -> str:
     return "".join(ch for ch in str(s).strip() if ch.isdigit())
 
+def _relogin(driver, wait, cpf: str, password: str, webmail_user: str, webmail_password: str, webmail_host: str):
+    logoff(driver, wait, cpf)
+    inicio = time.time()
+    if login_copasa_simple(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host):
+        session_cache.save(cpf, driver, time.time() - inicio)
+    select_all_option(driver)
+
 def download_bills_by_matricula(driver, download_folder: str, matriculas, cpf: str, 
                               password: str, webmail_user: str, webmail_password: str, 
-                              webmail_host: str, timeout: int = 10):
+                              webmail_host: str, timeout: int = 10, sessao_desde: float = None,
+                              ja_filtradas: bool = False):
     
     RELAUNCH_TIME = int(os.getenv("RELAUNCH_TIME", "720")) 
     max_passes = 50
+    definir_contexto(cpf=cpf, matricula=None)
+    iniciar_servidor()
+    conta = rotulo_conta(cpf)
     
     wait = WebDriverWait(driver, timeout)
-    selector = "#tbIdentificador tbody tr"
     db = DatabaseManager()
-    download_manager = OptimizedDownloadManager(download_folder)
     download_monitor = DownloadMonitor()
     
-    matriculas_filtradas = db.filtrar_matriculas_nao_baixadas(matriculas, verificar_mes_atual=True)
+    # O runner já filtra com get_matriculas_para_cpf(verificar_duplicatas=True)
+    if ja_filtradas:
+        matriculas_filtradas = matriculas
+    else:
+        matriculas_filtradas = db.filtrar_matriculas_nao_baixadas(matriculas, verificar_mes_atual=True)
     pending = {_normalize_matricula(m) for m in (matriculas_filtradas or []) if str(m).strip()}
 
     if not pending:
         logger.info("Nenhuma matrícula pendente para processar")
         return
 
-    logger.info(f"🚀 SISTEMA OTIMIZADO - Processando {len(pending)} matrículas")
-    logger.debug(f"Matrículas pendentes: {sorted(pending)}")
+    txt_folder = os.path.join(download_folder, "Faturas - TXT")
+    relatorio_folder = os.path.join(download_folder, "Relatorios - FATURAS")
+    pipeline = None
+    # Watcher (thread + inotify), fetcher HTTP e pipeline só existem daqui em diante e
+    # são fechados em qualquer saída: main.main tenta de novo e criaria outros
+    download_manager = OptimizedDownloadManager(download_folder, db)
+    try:
+        if SystemConfig.PIPELINE_ENABLED:
+            pipeline = PostProcessingPipeline(
+                download_folder, txt_folder, relatorio_folder, watcher=download_manager.watcher
+            ).start()
+            download_manager.on_file_downloaded = pipeline.submit
 
-    start_time = time.time()
-    session_start = time.time()
-    passes = 0
+        logger.info(f"🚀 SISTEMA OTIMIZADO - Processando {len(pending)} matrículas")
+        logger.debug(f"Matrículas pendentes: {sorted(pending)}")
 
-    while pending and passes < max_passes and download_manager.should_continue():
-        passes += 1
-        logger.debug(f"🔄 Pass {passes}/{max_passes} - Pendentes: {len(pending)}")
+        start_time = time.time()
+        session_start = sessao_desde or time.time()
+        passes = 0
 
-        if time.time() - session_start >= RELAUNCH_TIME:
-            logger.info("🔄 Relogin preventivo (12 min)...")
-            try:
-                logoff(driver, wait)
-                login_copasa_simple(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host)
-                select_all_option(driver)
-                session_start = time.time()
-                logger.info("✅ Relogin preventivo concluído")
-            except Exception as e:
-                logger.error(f"Erro no relogin preventivo: {e}")
-                break
+        while (pending or download_manager.http_em_andamento()) and passes < max_passes and download_manager.should_continue():
+            pending.update(download_manager.coletar_falhas_http())
+            if not pending:
+                download_manager.aguardar_http(timeout=1)
+                continue
+        
+            passes += 1
+            logger.debug(f"🔄 Pass {passes}/{max_passes} - Pendentes: {len(pending)}")
+            PENDING.set(conta, valor=len(pending))
 
-        system_state = download_manager.monitor.detect_system_state(driver)
-        if system_state not in [SystemState.HEALTHY, SystemState.SLOW]:
-            recovery_action = download_manager.monitor.get_recovery_action(system_state, 0)
-            
-            if recovery_action == RecoveryAction.RELOGIN:
-                logger.info("🔐 Sistema requer relogin...")
+            if time.time() - session_start >= RELAUNCH_TIME:
+                logger.info("🔄 Relogin preventivo (12 min)...")
                 try:
-                    logoff(driver, wait)
-                    login_copasa_simple(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host)
-                    select_all_option(driver)
+                    _relogin(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host)
                     session_start = time.time()
-                    continue
+                    logger.info("✅ Relogin preventivo concluído")
                 except Exception as e:
-                    logger.error(f"Erro no relogin requerido: {e}")
+                    logger.error(f"Erro no relogin preventivo: {e}")
                     break
+
+            system_state = download_manager.monitor.detect_system_state(driver)
+            if system_state not in [SystemState.HEALTHY, SystemState.SLOW]:
+                recovery_action = download_manager.monitor.get_recovery_action(system_state, 0)
+            
+                if recovery_action == RecoveryAction.RELOGIN:
+                    logger.info("🔐 Sistema requer relogin...")
+                    try:
+                        _relogin(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host)
+                        session_start = time.time()
+                        continue
+                    except Exception as e:
+                        logger.error(f"Erro no relogin requerido: {e}")
+                        break
             
-            elif recovery_action == RecoveryAction.ABORT:
-                logger.error("🛑 Sistema em estado crítico - abortando")
-                break
+                elif recovery_action == RecoveryAction.ABORT:
+                    logger.error("🛑 Sistema em estado crítico - abortando")
+                    break
             
-            else:
-                download_manager.monitor.execute_recovery(driver, wait, recovery_action)
-                continue
+                else:
+                    download_manager.monitor.execute_recovery(driver, wait, recovery_action)
+                    continue
 
-        if download_monitor.deve_pausar():
-            logger.warning("🔄 Muitas passagens vazias - aguardando estabilização...")
-            time.sleep(30)
-            download_monitor.passes_sem_resultado = 0
-            continue
+            if download_monitor.deve_pausar():
+                logger.warning("🔄 Muitas passagens vazias - aguardando estabilização...")
+                time.sleep(30)
+                download_monitor.passes_sem_resultado = 0
+                continue
 
-        try:
-            rows = driver.find_elements(By.CSS_SELECTOR, selector)
-        except Exception as e:
-            logger.error(f"Erro ao buscar elementos: {e}")
-            driver.refresh()
-            time.sleep(2)
-            continue
-
-        if len(rows) <= 0:
-            logger.warning("Lista vazia - possível problema no carregamento")
-            download_monitor.registrar_pass_vazio()
-            driver.refresh()
-            time.sleep(2)
-            continue
-
-        matricula_processada_nesta_pass = False
-        
-        for row in rows:
             try:
-                linha_raw = row.find_element(By.CSS_SELECTOR, "span.IdentifierNumber").text
-                linha = _normalize_matricula(linha_raw)
+                snapshot = snapshot_identifier_table(driver)
+            except Exception as e:
+                logger.error(f"Erro ao buscar elementos: {e}")
+                driver.refresh()
+                time.sleep(2)
+                continue
 
-                if linha not in pending:
-                    continue
+            if len(snapshot) <= 0:
+                logger.warning("Lista vazia - possível problema no carregamento")
+                download_monitor.registrar_pass_vazio()
+                driver.refresh()
+                time.sleep(2)
+                continue
 
-                status, message = download_manager.process_matricula_with_recovery(
-                    driver, wait, row, db, linha
-                )
+            matricula_processada_nesta_pass = False
+            alvos = sorted((m for m in pending if m in snapshot), key=lambda m: snapshot[m][0])
+        
+            for linha in alvos:
+                row = snapshot[linha][1]
+                definir_contexto(matricula=linha)
+                inicio_matricula = time.perf_counter()
+                try:
+                    status, message = download_manager.process_matricula_with_recovery(
+                        driver, wait, row, db, linha
+                    )
+                    medicao = {'phase': 'download', 'duration_ms': round((time.perf_counter() - inicio_matricula) * 1000)}
+                    # "queued" é contado pelo fetcher HTTP (http_success/http_failed); relogin/abort/skipped não são resultado
+                    if status in _RESULTADOS_FINAIS:
+                        BILLS.inc(status)
+                    PHASE_SECONDS.observe('download', segundos=medicao['duration_ms'] / 1000)
                 
-                if status == "relogin_needed":
-                    logger.info("🔐 Relogin solicitado pelo monitor...")
-                    try:
-                        logoff(driver, wait)
-                        login_copasa_simple(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host)
-                        select_all_option(driver)
-                        session_start = time.time()
-                        break
-                    except Exception as e:
-                        logger.error(f"Erro no relogin solicitado: {e}")
-                        pending.discard(linha)
-                        break
+                    if status == "relogin_needed":
+                        logger.info("🔐 Relogin solicitado pelo monitor...")
+                        try:
+                            _relogin(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host)
+                            session_start = time.time()
+                            break
+                        except Exception as e:
+                            logger.error(f"Erro no relogin solicitado: {e}")
+                            pending.discard(linha)
+                            break
 
-                elif status == "abort":
-                    logger.error("🛑 Abortando por solicitação do monitor")
-                    pending.clear()
-                    break
+                    elif status == "abort":
+                        logger.error("🛑 Abortando por solicitação do monitor")
+                        pending.clear()
+                        break
 
-                elif status in ["success", "no_debt", "no_invoice", "skipped"]:
-                    pending.discard(linha)
-                    download_monitor.registrar_processamento()
-                    matricula_processada_nesta_pass = True
-                    logger.info(f"✅ {linha}: {message}")
+                    elif status in ["success", "queued", "no_debt", "no_invoice", "skipped"]:
+                        pending.discard(linha)
+                        download_monitor.registrar_processamento()
+                        matricula_processada_nesta_pass = True
+                        logger.info(f"✅ {linha}: {message}", extra=medicao)
 
-                elif status in ["download_failed", "error", "failed"]:
-                    pending.discard(linha)
-                    logger.error(f"❌ {linha}: {message}")
-                    matricula_processada_nesta_pass = True
+                    elif status in ["download_failed", "error", "failed"]:
+                        pending.discard(linha)
+                        logger.error(f"❌ {linha}: {message}", extra=medicao)
+                        matricula_processada_nesta_pass = True
 
-                back_status = back_to_list(driver, wait)
+                    back_status = back_to_list(driver, wait)
                 
-                if back_status == "no_invoice":
-                    logger.info(f"Matrícula {linha} - SEM FATURA DISPONÍVEL")
-                    db.registrar_tentativa(linha, False, "Sem fatura disponível")
-                    pending.discard(linha)
+                    if back_status == "no_invoice":
+                        logger.info(f"Matrícula {linha} - SEM FATURA DISPONÍVEL")
+                        db.registrar_tentativa(linha, False, "Sem fatura disponível")
+                        pending.discard(linha)
                 
-                break
+                    break
 
-            except (StaleElementReferenceException, NoSuchElementException) as e:
-                logger.warning(f"Elemento perdido durante processamento: {e}")
-                try:
-                    if "Message: Unable to locate element: span.IdentifierNumber;" in e:
-                        driver.refresh()
-                    else:
-                        back_to_list(driver, wait)
-                except Exception:
-                    pass
-                matricula_processada_nesta_pass = True
-                break
+                except (StaleElementReferenceException, NoSuchElementException) as e:
+                    logger.warning(f"Elemento perdido durante processamento: {e}")
+                    try:
+                        if "Message: Unable to locate element: span.IdentifierNumber;" in e:
+                            driver.refresh()
+                        else:
+                            back_to_list(driver, wait)
+                    except Exception:
+                        pass
+                    matricula_processada_nesta_pass = True
+                    break
                 
-            except Exception as e:
-                logger.error(f"Erro inesperado no processamento: {str(e)}")
-                driver.refresh()
-                matricula_processada_nesta_pass = True
-                break
+                except Exception as e:
+                    logger.error(f"Erro inesperado no processamento: {str(e)}")
+                    driver.refresh()
+                    matricula_processada_nesta_pass = True
+                    break
+            
+                finally:
+                    definir_contexto(matricula=None)
 
-        if not matricula_processada_nesta_pass:
-            download_monitor.registrar_pass_vazio()
+            if not matricula_processada_nesta_pass:
+                download_monitor.registrar_pass_vazio()
         
-        download_monitor.log_estatisticas(passes, len(pending))
+            download_monitor.log_estatisticas(passes, len(pending))
+
+            time.sleep(0.5)
 
-        time.sleep(0.5)
+    finally:
+        download_manager.close()
+        if pipeline:
+            # O pipeline trata o que foi baixado nesta execução; o lote final cobre o restante
+            try:
+                pipeline.close()
+            except Exception as e:
+                logger.error(f"❌ Erro ao encerrar o pipeline: {e}")
+        PENDING.remove(conta)
+        if not db.flush_tentativas():
+            logger.warning("⚠️ Tentativas pendentes no journal local - serão reenviadas na próxima execução")
 
     if pending:
         logger.warning(f"⚠️ Matrículas não processadas após {passes} passes: {sorted(pending)}")
@@ -572,15 +684,21 @@ def download_bills_by_matricula(driver, download_folder: str, matriculas, cpf: s
     logger.info("🔧 Executando processamento final...")
     
     try:
+        inicio_fase = time.perf_counter()
         rename_all_pdfs_safe_mode(download_folder)
         rename_only_new(download_folder)
-        logger.info("✅ Arquivos renomeados")
+        PHASE_SECONDS.observe('rename', segundos=time.perf_counter() - inicio_fase)
+        logger.info("✅ Arquivos renomeados", extra={
+            'phase': 'rename', 'duration_ms': round((time.perf_counter() - inicio_fase) * 1000)
+        })
         
-        txt_folder = os.path.join(download_folder, "Faturas - TXT")
-        relatorio_folder = os.path.join(download_folder, "Relatorios - FATURAS")
+        inicio_fase = time.perf_counter()
         generate_reports_from_folder(download_folder, txt_folder, relatorio_folder)
-        logger.info("✅ Relatórios gerados com sucesso!")
-        mover_arquivos_e_relatorios()        
+        PHASE_SECONDS.observe('report', segundos=time.perf_counter() - inicio_fase)
+        logger.info("✅ Relatórios gerados com sucesso!", extra={
+            'phase': 'report', 'duration_ms': round((time.perf_counter() - inicio_fase) * 1000)
+        })
+        mover_arquivos_e_relatorios(download_folder, relatorio_folder)
         
     except Exception as e:
         logger.error(f"❌ Erro no processamento final: {e}")
@@ -0,0 +1,252 @@
+import os
+import sys
+import time
+import stat
+import errno
+import struct
+import select
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+from config import SystemConfig
+
+logger = logging.getLogger(__name__)
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+class DownloadTicket:
+    def __init__(self, seq: int):
+        self.seq = seq
+        self.started = time.monotonic()
+        self.path: Optional[str] = None
+
+class DownloadWatcher:
+    """
+    Observa a pasta de downloads e emite eventos de "arquivo finalizado".
+
+    Usa inotify no Linux (IN_CLOSE_WRITE / IN_MOVED_TO). Nos demais sistemas
+    cai para polling do mtime da pasta: só quando ela muda a lista de nomes é
+    lida, e só os nomes novos (ou ainda em download) são consultados.
+    Cada clique de download pede um ticket antes de clicar e recebe o primeiro
+    arquivo finalizado depois dele. O início do download (placeholder vazio ou
+    .part) amarra o nome ao ticket da vez; se esse ticket já expirou, o arquivo
+    que chega atrasado é descartado em vez de ir para o próximo clique.
+    """
+
+    TEMP_SUFFIXES = ('.crdownload', '.part', '.tmp')
+
+    def __init__(self, folder: str, poll_interval: float = None):
+        self.folder = folder
+        self.poll_interval = poll_interval or SystemConfig.DOWNLOAD_WATCH_POLL_INTERVAL
+        self.backend = None
+        self._cond = threading.Condition()
+        self._events = deque()
+        self._emitted = {}
+        self._ignored = set()
+        self._owners = {}
+        self._seq = 0
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify_fd = None
+
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        if sys.platform.startswith('linux') and self._init_inotify():
+            self.backend = "inotify"
+            target = self._run_inotify
+        else:
+            self.backend = "scandir"
+            target = self._run_scandir
+        self._thread = threading.Thread(target=target, name="download-watcher", daemon=True)
+        self._thread.start()
+        logger.debug(f"Download watcher ativo ({self.backend}) em {self.folder}")
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+
+    def expect(self) -> DownloadTicket:
+        with self._cond:
+            self._seq += 1
+            return DownloadTicket(self._seq)
+
+    def wait(self, ticket: DownloadTicket, timeout: float) -> Optional[str]:
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                while self._events:
+                    momento, path, dono = self._events.popleft()
+                    # Evento consumido: a assinatura só servia para não repeti-lo
+                    self._emitted.pop(os.path.basename(path), None)
+                    if dono is not None and dono != ticket.seq:
+                        logger.debug(f"Arquivo atrasado de um clique anterior descartado: {os.path.basename(path)}")
+                        continue
+                    # Eventos anteriores ao clique pertencem a outro download
+                    if dono is None and momento < ticket.started:
+                        continue
+                    ticket.path = path
+                    return path
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    def ignore(self, path: str):
+        """Arquivos gravados por outro caminho (ex.: download HTTP) não viram eventos."""
+        with self._cond:
+            self._ignored.add(os.path.basename(path))
+
+    def unignore(self, path: str):
+        """Desfaz um ignore() cujo arquivo acabou não sendo gravado."""
+        with self._cond:
+            self._ignored.discard(os.path.basename(path))
+
+    def _is_candidate(self, name: str) -> bool:
+        return not name.startswith('.') and not name.endswith(self.TEMP_SUFFIXES)
+
+    def _owns(self, name: str, replace: bool):
+        with self._cond:
+            if self._seq and (replace or name not in self._owners):
+                self._owners[name] = self._seq
+
+    def _emit(self, name: str, stat_result=None):
+        if name.endswith(self.TEMP_SUFFIXES) and not name.startswith('.'):
+            self._owns(os.path.splitext(name)[0], replace=False)
+            return
+        if not self._is_candidate(name):
+            return
+        path = os.path.join(self.folder, name)
+        try:
+            st = stat_result or os.stat(path)
+        except OSError:
+            return
+        # O Firefox cria um placeholder vazio com o nome final antes do .part: é o início do download
+        if st.st_size == 0:
+            self._owns(name, replace=True)
+            return
+        signature = (st.st_ino, st.st_size, st.st_mtime_ns)
+
+        with self._cond:
+            if self._emitted.get(name) == signature:
+                return
+            dono = self._owners.pop(name, None)
+            if name in self._ignored:
+                self._ignored.discard(name)
+                return
+            self._emitted[name] = signature
+            self._events.append((time.monotonic(), path, dono))
+            self._cond.notify_all()
+
+    def _init_inotify(self) -> bool:
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return False
+            wd = libc.inotify_add_watch(fd, os.fsencode(self.folder), IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                os.close(fd)
+                return False
+            self._inotify_fd = fd
+            return True
+        except (OSError, AttributeError):
+            return False
+
+    def _run_inotify(self):
+        fd = self._inotify_fd
+        while not self._stopping.is_set():
+            readable, _, _ = select.select([fd], [], [], 0.5)
+            if not readable:
+                continue
+            try:
+                data = os.read(fd, 64 * 1024)
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    continue
+                logger.error(f"Erro lendo eventos inotify: {e}")
+                return
+
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                _, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += name_len
+                if mask & IN_Q_OVERFLOW:
+                    logger.warning("Fila do inotify estourou - eventos de download podem ter sido perdidos")
+                elif name:
+                    self._emit(name)
+
+    def _run_scandir(self):
+        last_mtime = None
+        # Nomes já resolvidos não são consultados de novo; em aberto ficam os
+        # placeholders vazios, à espera do conteúdo final
+        vistos = set()
+        abertos = {}
+        try:
+            with os.scandir(self.folder) as it:
+                for entry in it:
+                    if entry.is_file() and entry.stat().st_size == 0:
+                        abertos[entry.name] = 0
+                    else:
+                        vistos.add(entry.name)
+        except OSError:
+            pass
+
+        while not self._stopping.is_set():
+            try:
+                mtime = os.stat(self.folder).st_mtime_ns
+            except OSError:
+                mtime = None
+
+            if mtime != last_mtime:
+                last_mtime = mtime
+                try:
+                    nomes = set(os.listdir(self.folder))
+                except OSError:
+                    nomes = None
+                if nomes is not None:
+                    # Nomes removidos saem do registro: um download novo com o mesmo nome é visto
+                    vistos &= nomes
+                    for name in list(abertos):
+                        if name not in nomes:
+                            del abertos[name]
+                    for name in (nomes - vistos):
+                        self._scan_name(name, vistos, abertos)
+
+            self._stopping.wait(self.poll_interval)
+
+    def _scan_name(self, name: str, vistos: set, abertos: dict):
+        if not self._is_candidate(name):
+            vistos.add(name)
+            return
+        try:
+            st = os.stat(os.path.join(self.folder, name))
+        except OSError:
+            return
+        if not stat.S_ISREG(st.st_mode):
+            vistos.add(name)
+            return
+        if abertos.get(name) == st.st_size:
+            return
+        if st.st_size == 0:
+            abertos[name] = 0
+        else:
+            abertos.pop(name, None)
+            vistos.add(name)
+        self._emit(name, st)
@@ -0,0 +1,147 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from config import SystemConfig
+
+# Sistemas de arquivos com mtime de 2s (FAT, alguns compartilhamentos SMB)
+_GRANULARIDADE_MTIME = 2.0
+
+class FolderStatsIndex:
+    """
+    Estatísticas persistentes (SQLite, STATE_DB) da árvore de downloads:
+    quantidade e tamanho por extensão de cada pasta.
+
+    Criar, apagar ou renomear um arquivo altera o mtime da pasta que o
+    contém, então uma atualização só relista as pastas cujo mtime mudou;
+    as demais custam um stat. Pastas alteradas durante a própria varredura
+    ficam sem marca d'água e são relidas na próxima vez. Mudanças de
+    conteúdo no lugar (mesmo nome) não mexem no mtime da pasta; para elas
+    existe o rescan completo.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or SystemConfig.STATE_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pastas (
+                caminho TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                extensoes TEXT NOT NULL,
+                subpastas TEXT NOT NULL,
+                atualizado_em REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def _carregar(self, raiz: str) -> Dict[str, sqlite3.Row]:
+        prefixo = raiz.rstrip(os.sep) + os.sep
+        linhas = self._conn.execute(
+            "SELECT * FROM pastas WHERE caminho = ? OR substr(caminho, 1, ?) = ?",
+            (raiz, len(prefixo), prefixo)
+        ).fetchall()
+        return {linha['caminho']: linha for linha in linhas}
+
+    def atualizar(self, raiz: str, rescan: bool = False) -> Dict:
+        """Sincroniza o índice com a árvore; retorna quantas pastas foram relidas e reaproveitadas."""
+        raiz = os.path.abspath(raiz)
+        inicio = time.time()
+        with self._lock:
+            conhecidas = {} if rescan else self._carregar(raiz)
+            visitadas, gravar = set(), []
+            relidas = reaproveitadas = 0
+
+            pendentes = [raiz]
+            while pendentes:
+                pasta = pendentes.pop()
+                try:
+                    mtime = os.stat(pasta).st_mtime
+                except OSError:
+                    continue
+                visitadas.add(pasta)
+
+                linha = conhecidas.get(pasta)
+                if linha is not None and linha['mtime'] == mtime:
+                    reaproveitadas += 1
+                    pendentes.extend(json.loads(linha['subpastas']))
+                    continue
+
+                relidas += 1
+                extensoes, subpastas = {}, []
+                try:
+                    with os.scandir(pasta) as entradas:
+                        for entrada in entradas:
+                            if entrada.is_dir(follow_symlinks=False):
+                                subpastas.append(entrada.path)
+                            elif entrada.is_file(follow_symlinks=False):
+                                ext = os.path.splitext(entrada.name)[1].lower()
+                                contagem = extensoes.setdefault(ext, [0, 0])
+                                contagem[0] += 1
+                                contagem[1] += entrada.stat(follow_symlinks=False).st_size
+                except OSError as e:
+                    print(f"Erro ao listar {pasta}: {e}")
+                    continue
+
+                # Sem marca d'água se a pasta mudou durante a varredura
+                marca = mtime if mtime < inicio - _GRANULARIDADE_MTIME else -1.0
+                gravar.append((pasta, marca, json.dumps(extensoes), json.dumps(subpastas), inicio))
+                pendentes.extend(subpastas)
+
+            # Pastas apagadas ou renomeadas desde a última atualização
+            removidas = set(self._carregar(raiz)) - visitadas
+            self._conn.executemany("DELETE FROM pastas WHERE caminho=?", [(p,) for p in removidas])
+            self._conn.executemany("INSERT OR REPLACE INTO pastas VALUES (?, ?, ?, ?, ?)", gravar)
+            self._conn.commit()
+
+        return {
+            'pastas_relidas': relidas,
+            'pastas_reaproveitadas': reaproveitadas,
+            'duracao_s': round(time.time() - inicio, 3),
+        }
+
+    def por_extensao(self, raiz: str) -> Dict:
+        """Mesmo formato de FileUtils.count_files_by_type, somando as pastas indexadas."""
+        raiz = os.path.abspath(raiz)
+        with self._lock:
+            linhas = self._carregar(raiz).values()
+        file_counts = {}
+        total_size = 0
+        for linha in linhas:
+            for ext, (count, size) in json.loads(linha['extensoes']).items():
+                dados = file_counts.setdefault(ext, {'count': 0, 'size_mb': 0})
+                dados['count'] += count
+                dados['size_mb'] += size / 1024 / 1024
+                total_size += size
+        for ext in file_counts:
+            file_counts[ext]['size_mb'] = round(file_counts[ext]['size_mb'], 2)
+        return {
+            'tipos_arquivo': file_counts,
+            'tamanho_total_mb': round(total_size / 1024 / 1024, 2)
+        }
+
+    def subpastas(self, pasta: str) -> Optional[List[str]]:
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT subpastas FROM pastas WHERE caminho=?", (os.path.abspath(pasta),)
+            ).fetchone()
+        return [os.path.basename(p) for p in json.loads(linha['subpastas'])] if linha else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_stats: Optional[FolderStatsIndex] = None
+_stats_lock = threading.Lock()
+
+def get_folder_stats() -> FolderStatsIndex:
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = FolderStatsIndex()
+        return _stats
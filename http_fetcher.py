@@ -0,0 +1,145 @@
+import os
+import re
+import logging
+import threading
+from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor, Future, wait as wait_futures
+from typing import Callable, Optional
+
+from config import SystemConfig
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ImportError:
+    requests = None
+
+logger = logging.getLogger(__name__)
+
+_RESOLVE_URL_SCRIPT = """
+const link = arguments[0].closest('a');
+return link ? link.href : null;
+"""
+
+class HttpBillFetcher:
+    """
+    Baixa as faturas por HTTP reaproveitando os cookies da sessão do Selenium.
+
+    Os downloads rodam em paralelo (limitados por HTTP_FETCH_CONCURRENCY),
+    são gravados em streaming num arquivo .part e renomeados só no final.
+    """
+
+    def __init__(self, download_folder: str, concurrency: int = None, watcher=None):
+        if requests is None:
+            raise RuntimeError("Pacote 'requests' não instalado")
+
+        self.download_folder = download_folder
+        self.concurrency = concurrency or SystemConfig.HTTP_FETCH_CONCURRENCY
+        self.watcher = watcher
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency, pool_maxsize=self.concurrency)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="http-fetch")
+        self._inflight = set()
+        self._lock = threading.Lock()
+
+    def resolve_url(self, driver, download_button) -> Optional[str]:
+        try:
+            url = driver.execute_script(_RESOLVE_URL_SCRIPT, download_button)
+        except Exception:
+            return None
+        if url and url.lower().startswith(("http://", "https://")):
+            return url
+        return None
+
+    def sync_session(self, driver):
+        self.session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+        # Monta um jar novo e troca de uma vez: downloads em andamento não veem o jar vazio
+        cookies = requests.cookies.RequestsCookieJar()
+        for cookie in driver.get_cookies():
+            cookies.set(
+                cookie["name"], cookie["value"],
+                domain=cookie.get("domain"), path=cookie.get("path", "/")
+            )
+        with self._lock:
+            self.session.cookies = cookies
+
+    def submit(self, url: str, matricula: str, on_done: Callable[[str, Future], None]) -> Future:
+        future = self._executor.submit(self._fetch, url, matricula)
+        with self._lock:
+            self._inflight.add(future)
+
+        def _done(f):
+            with self._lock:
+                self._inflight.discard(f)
+            on_done(matricula, f)
+
+        future.add_done_callback(_done)
+        return future
+
+    def inflight(self) -> int:
+        with self._lock:
+            return len(self._inflight)
+
+    def wait(self, timeout: float = None):
+        with self._lock:
+            pendentes = list(self._inflight)
+        if pendentes:
+            wait_futures(pendentes, timeout=timeout)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+
+    def _filename(self, response, matricula: str) -> str:
+        disposition = response.headers.get("Content-Disposition", "")
+        match = re.search(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", disposition, re.IGNORECASE)
+        nome = os.path.basename(unquote(match.group(1))) if match else ""
+        if not nome.lower().endswith(".pdf"):
+            nome = f"fatura_{matricula}.pdf"
+        return nome
+
+    def _unique_path(self, nome: str) -> str:
+        base, ext = os.path.splitext(nome)
+        caminho = os.path.join(self.download_folder, nome)
+        contador = 1
+        while os.path.exists(caminho):
+            caminho = os.path.join(self.download_folder, f"{base}({contador}){ext}")
+            contador += 1
+        return caminho
+
+    def _fetch(self, url: str, matricula: str) -> str:
+        with self.session.get(url, stream=True, timeout=SystemConfig.HTTP_FETCH_TIMEOUT) as response:
+            response.raise_for_status()
+
+            chunks = response.iter_content(chunk_size=64 * 1024)
+            primeiro = next(chunks, b"")
+            if not primeiro.startswith(b"%PDF"):
+                raise ValueError(f"Resposta não é um PDF ({response.headers.get('Content-Type')})")
+
+            with self._lock:
+                destino = self._unique_path(self._filename(response, matricula))
+                # Placeholder vazio reserva o nome entre downloads concorrentes
+                open(destino, "wb").close()
+            tmp_path = f"{destino}.part"
+
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(primeiro)
+                    for chunk in chunks:
+                        f.write(chunk)
+                # O arquivo já tem dono; o watcher não deve entregá-lo a um clique do Selenium
+                if self.watcher:
+                    self.watcher.ignore(destino)
+                os.replace(tmp_path, destino)
+            except BaseException:
+                for path in (tmp_path, destino):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                raise
+
+        logger.debug(f"🌐 {matricula}: {os.path.basename(destino)} baixado por HTTP")
+        return destino
@@ -0,0 +1,26 @@
+from typing import Dict, Tuple
+from config import Selectors
+
+_SNAPSHOT_SCRIPT = """
+const rows = document.querySelectorAll(arguments[0]);
+const snapshot = [];
+for (let i = 0; i < rows.length; i++) {
+    const span = rows[i].querySelector(arguments[1]);
+    if (!span) continue;
+    snapshot.push([span.textContent.replace(/\\D/g, ''), i, rows[i]]);
+}
+return snapshot;
+"""
+
+def snapshot_identifier_table(driver) -> Dict[str, Tuple[int, object]]:
+    """
+    Lê todas as linhas de #tbIdentificador em um único execute_script.
+    Retorna {matricula_normalizada: (indice_da_linha, WebElement da linha)}.
+    """
+    rows = driver.execute_script(_SNAPSHOT_SCRIPT, Selectors.TABLE_ROWS, Selectors.IDENTIFIER_NUMBER) or []
+
+    snapshot = {}
+    for matricula, indice, row in rows:
+        if matricula and matricula not in snapshot:
+            snapshot[matricula] = (indice, row)
+    return snapshot
\ No newline at end of file
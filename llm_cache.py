@@ -0,0 +1,96 @@
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from config import LLMConfig
+
+def _sha256(texto: str) -> str:
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+class LLMResponseCache:
+    """
+    Cache persistente (SQLite) das respostas do LLM.
+
+    A chave é (hash do template, modelo, hash das variáveis), então reexecutar o
+    pós-processamento sobre as mesmas faturas não chama a API de novo. Entradas
+    vencem após o TTL e, acima de MAX_ENTRIES, as menos usadas são removidas.
+    """
+
+    def __init__(self, path: str = None, ttl: int = None, max_entries: int = None):
+        self.path = path or LLMConfig.CACHE_PATH
+        self.ttl = ttl or LLMConfig.CACHE_TTL
+        self.max_entries = max_entries or LLMConfig.CACHE_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                template_hash TEXT NOT NULL,
+                modelo TEXT NOT NULL,
+                texto_hash TEXT NOT NULL,
+                resposta TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                usado_em REAL NOT NULL,
+                PRIMARY KEY (template_hash, modelo, texto_hash)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_usado_em ON respostas (usado_em)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def chave(template: str, model: str, variables: Dict[str, str]) -> tuple:
+        texto = json.dumps(variables, sort_keys=True, ensure_ascii=False, default=str)
+        return _sha256(template), model, _sha256(texto)
+
+    def get(self, chave: tuple) -> Optional[str]:
+        agora = time.time()
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT resposta, criado_em FROM respostas WHERE template_hash=? AND modelo=? AND texto_hash=?",
+                chave
+            ).fetchone()
+            if linha is None or agora - linha[1] > self.ttl:
+                if linha is not None:
+                    self._conn.execute(
+                        "DELETE FROM respostas WHERE template_hash=? AND modelo=? AND texto_hash=?", chave
+                    )
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE respostas SET usado_em=? WHERE template_hash=? AND modelo=? AND texto_hash=?",
+                (agora, *chave)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return linha[0]
+
+    def put(self, chave: tuple, resposta: str):
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respostas VALUES (?, ?, ?, ?, ?, ?)",
+                (*chave, resposta, agora, agora)
+            )
+            total = self._conn.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+            if total > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM respostas WHERE rowid IN "
+                    "(SELECT rowid FROM respostas ORDER BY usado_em LIMIT ?)",
+                    (total - self.max_entries,)
+                )
+            self._conn.commit()
+
+    def resumo(self) -> str:
+        total = self.hits + self.misses
+        taxa = (self.hits / total * 100) if total else 0
+        return f"💾 Cache do LLM: {self.hits}/{total} hits ({taxa:.0f}%)"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,183 @@
+import time
+import random
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+from langchain.prompts import PromptTemplate
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.output_parsers import StrOutputParser
+
+from config import LLMConfig
+from llm_cache import LLMResponseCache
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Balde de tokens thread-safe; acquire bloqueia até haver saldo."""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        agora = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (agora - self._updated) * self.rate)
+        self._updated = agora
+
+    def acquire(self, amount: float = 1) -> float:
+        amount = min(amount, self.capacity)
+        esperado = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return esperado
+                espera = (amount - self._tokens) / self.rate
+            time.sleep(espera)
+            esperado += espera
+
+    def charge(self, amount: float):
+        """Debita sem bloquear (ex.: tokens da resposta); o saldo pode ficar negativo."""
+        with self._lock:
+            self._refill()
+            self._tokens -= amount
+
+def _estimar_tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+def _is_rate_limit(erro: Exception) -> bool:
+    mensagem = f"{erro.__class__.__name__} {erro}"
+    return any(marca in mensagem for marca in ("429", "ResourceExhausted", "RESOURCE_EXHAUSTED", "quota"))
+
+class LLMGateway:
+    """
+    Cliente compartilhado do Gemini para todo o pós-processamento.
+
+    Limita requisições e tokens por minuto com token buckets configurados pela
+    cota real (LLMConfig), roda até CONCURRENCY chamadas em paralelo, refaz
+    com backoff exponencial as respostas 429 e reaproveita as chains por
+    (template, modelo, temperatura) em vez de recriá-las a cada PDF.
+    Respostas já obtidas vêm do LLMResponseCache sem passar pelo limitador.
+    """
+
+    def __init__(self, requests_per_minute: int = None, tokens_per_minute: int = None,
+                 concurrency: int = None, max_retries: int = None, cache: LLMResponseCache = None):
+        self.concurrency = concurrency or LLMConfig.CONCURRENCY
+        self.max_retries = max_retries if max_retries is not None else LLMConfig.MAX_RETRIES
+        rpm = requests_per_minute or LLMConfig.REQUESTS_PER_MINUTE
+        # Capacidade pequena no balde de requisições evita rajadas que estouram a janela de 1 minuto
+        self._requests = TokenBucket(rpm, capacity=max(1, min(self.concurrency, rpm)))
+        self._tokens = TokenBucket(tokens_per_minute or LLMConfig.TOKENS_PER_MINUTE)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._chains: Dict[tuple, object] = {}
+        self.cache = cache if cache is not None else (LLMResponseCache() if LLMConfig.CACHE_ENABLED else None)
+        self._lock = threading.Lock()
+        self.stats = {'requisicoes': 0, 'retries': 0, 'rate_limited': 0, 'erros': 0, 'espera_limite': 0.0}
+        self._primeira = None
+        self._ultima = None
+
+    def _chain(self, template: str, model: str, temperature: float):
+        chave = (template, model, temperature)
+        with self._lock:
+            chain = self._chains.get(chave)
+            if chain is None:
+                # O retry interno do cliente ficaria fora do controle do limitador
+                llm = ChatGoogleGenerativeAI(model=model, temperature=temperature, max_retries=1)
+                prompt = PromptTemplate.from_template(template)
+                chain = prompt | llm | StrOutputParser()
+                self._chains[chave] = chain
+            return chain
+
+    def invoke(self, template: str, variables: Dict[str, str], model: str = None,
+               temperature: float = 0.1, validate: Callable[[str], object] = None) -> str:
+        """
+        validate, se informado, é chamado com a resposta antes de ela ir para o
+        cache; se levantar exceção, a resposta não é guardada e o erro sobe.
+        """
+        model = model or LLMConfig.MODEL
+        chave = None
+        if self.cache is not None:
+            chave = LLMResponseCache.chave(template, model, variables)
+            resposta = self.cache.get(chave)
+            if resposta is not None:
+                return resposta
+
+        chain = self._chain(template, model, temperature)
+        tokens = _estimar_tokens(template) + sum(_estimar_tokens(str(v)) for v in variables.values())
+
+        for tentativa in range(self.max_retries + 1):
+            espera = self._requests.acquire(1) + self._tokens.acquire(tokens)
+            with self._slots:
+                try:
+                    resposta = chain.invoke(variables)
+                except Exception as e:
+                    if not _is_rate_limit(e) or tentativa == self.max_retries:
+                        with self._lock:
+                            self.stats['erros'] += 1
+                        raise
+                    backoff = min(LLMConfig.BACKOFF_MAX, LLMConfig.BACKOFF_BASE ** (tentativa + 1))
+                    backoff *= random.uniform(0.5, 1.0)
+                    with self._lock:
+                        self.stats['rate_limited'] += 1
+                        self.stats['retries'] += 1
+                    logger.warning(f"⏳ LLM limitado (429), nova tentativa em {backoff:.1f}s")
+                else:
+                    self._tokens.charge(_estimar_tokens(resposta))
+                    agora = time.time()
+                    with self._lock:
+                        self.stats['requisicoes'] += 1
+                        self.stats['espera_limite'] += espera
+                        self._primeira = self._primeira or agora
+                        self._ultima = agora
+                    if validate is not None:
+                        validate(resposta)
+                    if chave is not None:
+                        self.cache.put(chave, resposta)
+                    return resposta
+            time.sleep(backoff)
+
+    def em_cache(self, template: str, variables: Dict[str, str], model: str = None) -> Optional[str]:
+        """Resposta que invoke devolveria do cache, sem chamar a API; None se não houver."""
+        if self.cache is None:
+            return None
+        return self.cache.get(LLMResponseCache.chave(template, model or LLMConfig.MODEL, variables))
+
+    def guardar(self, template: str, variables: Dict[str, str], resposta: str, model: str = None):
+        """Grava uma resposta obtida por outro prompt na chave que invoke consultaria."""
+        if self.cache is not None:
+            self.cache.put(LLMResponseCache.chave(template, model or LLMConfig.MODEL, variables), resposta)
+
+    def requests_per_second(self) -> float:
+        with self._lock:
+            if not self._primeira or self.stats['requisicoes'] < 2:
+                return 0.0
+            duracao = self._ultima - self._primeira
+            return (self.stats['requisicoes'] - 1) / duracao if duracao > 0 else 0.0
+
+    def resumo(self) -> str:
+        rps = self.requests_per_second()
+        with self._lock:
+            resumo = (f"🤖 LLM: {self.stats['requisicoes']} requisições, {rps:.2f} req/s, "
+                      f"{self.stats['rate_limited']} respostas 429, {self.stats['erros']} erros, "
+                      f"{self.stats['espera_limite']:.0f}s aguardando o limite")
+        if self.cache is not None:
+            resumo += f" | {self.cache.resumo()}"
+        return resumo
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+def get_llm_gateway() -> LLMGateway:
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway()
+        return _gateway
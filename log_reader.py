@@ -0,0 +1,119 @@
+import os
+import re
+import gzip
+import json
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Segmentos do RotatingFileHandler: arquivo.log.1, arquivo.log.2.gz, ...
+_ROTACAO = re.compile(r'\.(\d+)(\.gz)?$')
+
+# Linhas do JsonFormatter (logging_setup) começam sempre com o 'ts'
+_PREFIXO_JSON = '{"ts": "'
+
+def timestamp_da_linha(linha: str) -> Optional[datetime]:
+    """Lê o '%(asctime)s' do começo da linha ('2024-05-01 12:00:00,123'); None se a linha não tiver."""
+    if linha.startswith(_PREFIXO_JSON):
+        linha = linha[len(_PREFIXO_JSON):]
+    if len(linha) < 23 or linha[4] != '-' or linha[10] != ' ' or linha[19] != ',':
+        return None
+    try:
+        return datetime(
+            int(linha[0:4]), int(linha[5:7]), int(linha[8:10]),
+            int(linha[11:13]), int(linha[14:16]), int(linha[17:19]), int(linha[20:23]) * 1000
+        )
+    except ValueError:
+        return None
+
+def campos_da_linha(linha: str) -> Dict:
+    """ts/level/msg (e cpf, matricula, phase, duration_ms no JSON) de uma linha em qualquer dos dois formatos."""
+    if linha.startswith(_PREFIXO_JSON):
+        try:
+            return json.loads(linha)
+        except ValueError:
+            return {}
+    partes = linha.split(' - ', 2)
+    if len(partes) < 3:
+        return {}
+    return {'ts': partes[0], 'level': partes[1], 'msg': partes[2].rstrip('\n')}
+
+def segmentos(log_file: str) -> List[str]:
+    """Arquivo de log e seus rotacionados (inclusive .gz), do mais antigo para o mais novo."""
+    pasta = os.path.dirname(os.path.abspath(log_file))
+    base = os.path.basename(log_file)
+    rotacionados = []
+    try:
+        nomes = os.listdir(pasta)
+    except OSError:
+        return []
+    for nome in nomes:
+        if not nome.startswith(base + '.'):
+            continue
+        match = _ROTACAO.match(nome[len(base):])
+        if match:
+            rotacionados.append((int(match.group(1)), os.path.join(pasta, nome)))
+    # Número maior = mais antigo
+    ordenados = [caminho for _, caminho in sorted(rotacionados, reverse=True)]
+    if os.path.exists(log_file):
+        ordenados.append(log_file)
+    return ordenados
+
+def _offset_inicial(f, inicio: datetime, tamanho: int) -> int:
+    """Busca binária pelo primeiro registro >= inicio num arquivo ordenado por horário."""
+    baixo, alto = 0, tamanho
+    while alto - baixo > 64 * 1024:
+        meio = (baixo + alto) // 2
+        f.seek(meio)
+        f.readline()
+        momento = None
+        while momento is None:
+            linha = f.readline()
+            if not linha:
+                break
+            momento = timestamp_da_linha(linha.decode('utf-8', errors='replace'))
+        if momento is None or momento >= inicio:
+            alto = meio
+        else:
+            baixo = meio
+    # 'baixo' está antes do início da janela (ou no começo do arquivo); o resto é filtrado lendo
+    if baixo:
+        f.seek(baixo)
+        f.readline()
+        return f.tell()
+    return 0
+
+def _linhas(caminho: str, inicio: Optional[datetime]) -> Iterator[str]:
+    if caminho.endswith('.gz'):
+        # gzip não permite seek barato: lê em fluxo, memória constante
+        with gzip.open(caminho, 'rt', encoding='utf-8', errors='replace') as f:
+            yield from f
+        return
+    with open(caminho, 'rb') as f:
+        if inicio is not None:
+            f.seek(_offset_inicial(f, inicio, os.fstat(f.fileno()).st_size))
+        for linha in f:
+            yield linha.decode('utf-8', errors='replace')
+
+def ler_janela(log_file: str, inicio: datetime = None, fim: datetime = None) -> Iterator[Tuple[datetime, str]]:
+    """
+    Registros (horário, linha) entre inicio e fim, somando os segmentos
+    rotacionados. Segmentos modificados antes do início são pulados sem abrir;
+    no arquivo aberto, a posição inicial vem de busca binária. Linhas sem
+    horário (continuação de traceback) são ignoradas.
+    """
+    for caminho in segmentos(log_file):
+        if inicio is not None:
+            try:
+                if datetime.fromtimestamp(os.path.getmtime(caminho)) < inicio:
+                    continue
+            except OSError:
+                continue
+        for linha in _linhas(caminho, inicio):
+            momento = timestamp_da_linha(linha)
+            if momento is None:
+                continue
+            if inicio is not None and momento < inicio:
+                continue
+            if fim is not None and momento > fim:
+                return
+            yield momento, linha.rstrip('\n')
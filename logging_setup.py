@@ -0,0 +1,165 @@
+import os
+import copy
+import json
+import gzip
+import queue
+import shutil
+import atexit
+import logging
+import contextvars
+import logging.handlers
+from typing import Optional
+
+from config import LoggingConfig
+
+# Campos de contexto anexados a cada registro da thread/CPF atual
+_CAMPOS_CONTEXTO = ('cpf', 'matricula')
+_contexto = {campo: contextvars.ContextVar(f"log_{campo}", default=None) for campo in _CAMPOS_CONTEXTO}
+_CAMPOS_EXTRA = _CAMPOS_CONTEXTO + ('phase', 'duration_ms')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def definir_contexto(**campos):
+    """Define cpf/matricula para os próximos logs desta thread (None limpa)."""
+    for campo, valor in campos.items():
+        _contexto[campo].set(valor)
+
+class _ContextoFilter(logging.Filter):
+    # Roda na thread que loga, antes do registro ir para a fila
+    def filter(self, record: logging.LogRecord) -> bool:
+        for campo, var in _contexto.items():
+            if getattr(record, campo, None) is None:
+                setattr(record, campo, var.get())
+        return True
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro; 'ts' vem primeiro e no mesmo formato do asctime."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        # O RotatingFileHandler formata duas vezes (shouldRollover e emit)
+        linha = getattr(record, '_linha_json', None)
+        if linha is not None:
+            return linha
+        dados = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        for campo in _CAMPOS_EXTRA:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                dados[campo] = valor
+        record._linha_json = json.dumps(dados, ensure_ascii=False, default=str)
+        return record._linha_json
+
+class _FilaHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Só resolve a mensagem na thread que loga; a formatação fica para o listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.msg = f"{record.msg}\n{logging.Formatter().formatException(record.exc_info)}"
+            record.exc_info = None
+            record.exc_text = None
+        return record
+
+class _ArquivoRotativo(logging.handlers.RotatingFileHandler):
+    """
+    Não descarrega o buffer a cada registro (o listener descarrega quando a
+    fila esvazia) e conta os bytes gravados em vez de seek/stat por registro.
+    """
+
+    _tamanho = None
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if self.stream is None:
+            self.stream = self._open()
+        if self._tamanho is None:
+            self._tamanho = self.stream.tell()
+        if not self.maxBytes:
+            return False
+        # maxBytes é em bytes: conta a linha codificada, não os caracteres (acentos e emojis ocupam mais)
+        tamanho = len((self.format(record) + self.terminator).encode(self.encoding or 'utf-8', errors='replace'))
+        if self._tamanho and self._tamanho + tamanho >= self.maxBytes:
+            self._tamanho = tamanho
+            return True
+        self._tamanho += tamanho
+        return False
+
+    def flush(self):
+        pass
+
+    def descarregar(self):
+        super().flush()
+
+    def close(self):
+        self.descarregar()
+        super().close()
+
+class _Listener(logging.handlers.QueueListener):
+    def _descarregar(self):
+        for handler in self.handlers:
+            if isinstance(handler, _ArquivoRotativo):
+                handler.descarregar()
+
+    def handle(self, record: logging.LogRecord):
+        super().handle(record)
+        if self.queue.empty():
+            self._descarregar()
+
+    def stop(self):
+        # Pode ser chamado de novo pelo atexit
+        if self._thread is None:
+            return
+        # O sentinel de parada também passa pela fila; o último lote pode não ter sido descarregado
+        super().stop()
+        self._descarregar()
+
+def _namer(nome: str) -> str:
+    return f"{nome}.gz"
+
+def _rotator(origem: str, destino: str):
+    # Compacta o segmento rotacionado; roda na thread do listener, fora do caminho do Selenium
+    with open(origem, 'rb') as src, gzip.open(destino, 'wb') as dst:
+        shutil.copyfileobj(src, dst)
+    os.remove(origem)
+
+def configurar_logging(log_file: str, level: str = None) -> logging.handlers.QueueListener:
+    """
+    Substitui o basicConfig: os módulos só enfileiram (QueueHandler) e uma
+    thread própria (QueueListener) grava o arquivo com rotação por tamanho
+    e escreve no console. Como no basicConfig, só a primeira chamada vale.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    arquivo = _ArquivoRotativo(
+        log_file, maxBytes=LoggingConfig.MAX_BYTES, backupCount=LoggingConfig.BACKUP_COUNT,
+        encoding=LoggingConfig.ENCODING, delay=True
+    )
+    if LoggingConfig.COMPRESS_ROTATED:
+        arquivo.namer = _namer
+        arquivo.rotator = _rotator
+    arquivo.setFormatter(JsonFormatter() if LoggingConfig.JSON else logging.Formatter(LoggingConfig.FORMAT))
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(LoggingConfig.FORMAT))
+
+    fila = queue.SimpleQueue()
+    handler = _FilaHandler(fila)
+    handler.addFilter(_ContextoFilter())
+
+    root = logging.getLogger()
+    root.setLevel(level or LoggingConfig.LEVEL)
+    for antigo in list(root.handlers):
+        root.removeHandler(antigo)
+    root.addHandler(handler)
+
+    _listener = _Listener(fila, arquivo, console, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
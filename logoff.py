@@ -1,8 +1,12 @@
 import time
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
+from session_cache import session_cache
 
-def logoff(driver, wait):
+def logoff(driver, wait, cpf: str = None):
+    # Depois do "Sair" os cookies em cache não valem mais, mesmo se o clique falhar no meio
+    if cpf:
+        session_cache.invalidate(cpf)
     try:
         show_logout = wait.until(
             EC.element_to_be_clickable((By.ID, "spUserName"))
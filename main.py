@@ -2,6 +2,7 @@ import os
 import time
 from selenium import webdriver
 from login import login_copasa
+from session_cache import session_cache
 from select_all import select_all_option
 from selenium.webdriver.support.ui import WebDriverWait
 from download_bills import download_bills_by_matricula
@@ -16,8 +17,8 @@ class CustomTimeoutException(Exception):
 def timeout_handler(signum, frame):
     raise CustomTimeoutException("Timeout: Operação demorou mais que 60 segundos")
 
-def create_driver():
-    donwload_dir = os.getenv("DOWNLOAD_DIR")
+def create_driver(donwload_dir=None):
+    donwload_dir = donwload_dir or os.getenv("DOWNLOAD_DIR")
     firefox_prefs = {
         "browser.download.folderList": 2,
         "browser.download.dir": donwload_dir,
@@ -46,17 +47,23 @@ def create_driver():
     driver.maximize_window()
     return driver
 
-def execute_main(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host, matriculas, donwload_dir, callbacks=None):
+def execute_main(driver, wait, cpf, password, webmail_user, webmail_password, webmail_host, matriculas, donwload_dir, callbacks=None, ja_filtradas=False):
     try:
-        login_copasa(
-            driver=driver,
-            wait=wait,
-            cpf=cpf,
-            password=password,
-            webmail_user=webmail_user,
-            webmail_password=webmail_password,
-            webmail_host=webmail_host
-        )
+        # O relogin preventivo conta a partir do login que gerou a sessão, não da restauração
+        sessao_desde = session_cache.restore(cpf, driver)
+        if sessao_desde is None:
+            inicio_login = sessao_desde = time.time()
+            logado = login_copasa(
+                driver=driver,
+                wait=wait,
+                cpf=cpf,
+                password=password,
+                webmail_user=webmail_user,
+                webmail_password=webmail_password,
+                webmail_host=webmail_host
+            )
+            if logado:
+                session_cache.save(cpf, driver, time.time() - inicio_login)
 
         select_all_option(driver=driver)
 
@@ -69,7 +76,9 @@ def execute_main(driver, wait, cpf, password, webmail_user, webmail_password, we
                 password=password,
                 webmail_user=webmail_user,
                 webmail_password=webmail_password,
-                webmail_host=webmail_host
+                webmail_host=webmail_host,
+                sessao_desde=sessao_desde,
+                ja_filtradas=ja_filtradas
             )
         else:
             print('Nenhuma matrícula fornecida.')
@@ -81,9 +90,11 @@ def execute_main(driver, wait, cpf, password, webmail_user, webmail_password, we
     except Exception as e:
         raise e
 
-def main(cpf, password, webmail_user, webmail_password, webmail_host, matriculas=None, success_callback=None, failure_callback=None, no_invoice_callback=None):
+def main(cpf, password, webmail_user, webmail_password, webmail_host, matriculas=None, success_callback=None, failure_callback=None, no_invoice_callback=None, download_dir=None, ja_filtradas=False):
     start_time = time.time()
-    donwload_dir = os.getenv("DOWNLOAD_DIR")
+    donwload_dir = download_dir or os.getenv("DOWNLOAD_DIR")
+    if donwload_dir:
+        os.makedirs(donwload_dir, exist_ok=True)
     driver = None
     
     callbacks = {
@@ -102,12 +113,14 @@ def main(cpf, password, webmail_user, webmail_password, webmail_host, matriculas
                 except:
                     pass
             
-            driver = create_driver()
+            driver = create_driver(donwload_dir)
             wait = WebDriverWait(driver, 30)
             
+            # Numa nova tentativa parte das matrículas já pode ter sido baixada: filtra de novo
             execute_main(
                 driver, wait, cpf, password, webmail_user, 
-                webmail_password, webmail_host, matriculas, donwload_dir, callbacks
+                webmail_password, webmail_host, matriculas, donwload_dir, callbacks,
+                ja_filtradas=ja_filtradas and tentativa == 1
             )
             
             print(f"✅ Sucesso na tentativa {tentativa} para CPF {cpf}")
@@ -153,4 +166,6 @@ def main(cpf, password, webmail_user, webmail_password, webmail_host, matriculas
     total_seconds = end_time - start_time
     minutes = int(total_seconds // 60)
     seconds = int(total_seconds % 60)
-    print(f"⏱️ Tempo total de execução para CPF {cpf}: {minutes}min {seconds}s")
\ No newline at end of file
+    print(f"⏱️ Tempo total de execução para CPF {cpf}: {minutes}min {seconds}s")
+    if session_cache.enabled:
+        print(session_cache.resumo())
\ No newline at end of file
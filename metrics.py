@@ -0,0 +1,173 @@
+import bisect
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import MetricsConfig
+
+logger = logging.getLogger(__name__)
+
+def _rotulos(nomes: Sequence[str], valores: Tuple[str, ...], extra: str = "") -> str:
+    pares = [f'{nome}="{valor}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+class Counter:
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *valores, quantidade: float = 1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def valor(self, *valores) -> float:
+        with self._lock:
+            return self._valores.get(valores, 0)
+
+    def expor(self) -> str:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} counter"]
+        linhas += [f"{self.nome}{_rotulos(self.rotulos, chave)} {valor}" for chave, valor in itens]
+        return "\n".join(linhas)
+
+class Gauge(Counter):
+    def set(self, *valores, valor: float):
+        with self._lock:
+            self._valores[valores] = valor
+
+    def remove(self, *valores):
+        with self._lock:
+            self._valores.pop(valores, None)
+
+    def expor(self) -> str:
+        return super().expor().replace(f"# TYPE {self.nome} counter", f"# TYPE {self.nome} gauge")
+
+class Histogram:
+    def __init__(self, nome: str, ajuda: str, rotulos: Sequence[str] = (), buckets: Sequence[float] = None):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets or MetricsConfig.BUCKETS))
+        # chave -> (contagem por bucket, soma, total)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, *valores, segundos: float):
+        indice = bisect.bisect_left(self.buckets, segundos)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * len(self.buckets), 0.0, 0]
+            if indice < len(self.buckets):
+                serie[0][indice] += 1
+            serie[1] += segundos
+            serie[2] += 1
+
+    def expor(self) -> str:
+        with self._lock:
+            itens = sorted((chave, (list(s[0]), s[1], s[2])) for chave, s in self._series.items())
+        linhas = [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} histogram"]
+        for chave, (contagens, soma, total) in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, contagens):
+                acumulado += contagem
+                le = 'le="%s"' % limite
+                linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, le)} {acumulado}")
+            le = 'le="+Inf"'
+            linhas.append(f"{self.nome}_bucket{_rotulos(self.rotulos, chave, le)} {total}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, chave)} {soma}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, chave)} {total}")
+        return "\n".join(linhas)
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metricas = []
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica):
+        with self._lock:
+            self._metricas.append(metrica)
+        return metrica
+
+    def counter(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Counter:
+        return self._registrar(Counter(nome, ajuda, rotulos))
+
+    def gauge(self, nome: str, ajuda: str, rotulos: Sequence[str] = ()) -> Gauge:
+        return self._registrar(Gauge(nome, ajuda, rotulos))
+
+    def histogram(self, nome: str, ajuda: str, rotulos: Sequence[str] = (), buckets: Sequence[float] = None) -> Histogram:
+        return self._registrar(Histogram(nome, ajuda, rotulos, buckets))
+
+    def expor(self) -> str:
+        with self._lock:
+            metricas = list(self._metricas)
+        return "\n".join(m.expor() for m in metricas) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+BILLS = REGISTRY.counter(
+    "copasa_bills_total",
+    "Matrículas com resultado final (success, http_success, no_debt, no_invoice, download_failed, http_failed...); "
+    "faturas/min: sum(rate(copasa_bills_total{outcome=~\"success|http_success\"}[5m])) * 60",
+    ("outcome",)
+)
+PHASE_SECONDS = REGISTRY.histogram(
+    "copasa_phase_duration_seconds", "Duração de cada fase (login, download, rename, report)", ("phase",)
+)
+SYSTEM_STATE = REGISTRY.counter(
+    "copasa_system_state_total", "Estados do portal detectados pelo monitor", ("state",)
+)
+RECOVERY_ACTIONS = REGISTRY.counter(
+    "copasa_recovery_actions_total", "Ações de recuperação executadas", ("action",)
+)
+PENDING = REGISTRY.gauge(
+    "copasa_pending_bills", "Matrículas pendentes na execução atual, por conta (hash do CPF)", ("conta",)
+)
+
+def rotulo_conta(cpf: str) -> str:
+    """Rótulo estável para a conta sem expor o CPF no /metrics."""
+    return hashlib.sha256(str(cpf).encode('utf-8')).hexdigest()[:10]
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        corpo = REGISTRY.expor().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def log_message(self, format, *args):
+        pass
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def iniciar_servidor(porta: int = None, host: str = None) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics (texto Prometheus) numa thread daemon; idempotente. Porta 0 desliga."""
+    global _server
+    porta = MetricsConfig.PORT if porta is None else porta
+    if not porta:
+        return None
+    with _server_lock:
+        if _server is None:
+            try:
+                _server = ThreadingHTTPServer((host or MetricsConfig.HOST, porta), _MetricsHandler)
+            except OSError as e:
+                logger.warning(f"⚠️ Métricas indisponíveis na porta {porta}: {e}")
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+            logger.info(f"📈 Métricas em http://{_server.server_address[0]}:{_server.server_address[1]}/metrics")
+        return _server
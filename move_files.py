@@ -1,88 +1,104 @@
-import shutil
 import os
+import time
 from pathlib import Path
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import StorageConfig
+from storage_sink import StorageSink, get_sink, checksums
+from pipeline_manifest import get_pipeline_manifest, PipelineStage
+from bill_index import get_bill_index
 
-def mover_arquivos_e_relatorios():
-    """Script simples para mover arquivos baixados e relatórios"""
+def arquivo_pronto(arquivo: Path) -> bool:
+    """Ignora pastas, temporários de download, placeholders vazios e arquivos ainda em escrita."""
+    if not arquivo.is_file() or arquivo.name.startswith('.'):
+        return False
+    if arquivo.name.endswith(StorageConfig.PARTIAL_SUFFIXES):
+        return False
+    st = arquivo.stat()
+    return st.st_size > 0 and time.time() - st.st_mtime >= StorageConfig.MIN_FILE_AGE
+
+def entregar_arquivo(arquivo, sink: StorageSink) -> str:
+    """
+    Copia o arquivo para o sink com verificação de checksum e só então apaga
+    a origem. Se o destino já tem o mesmo conteúdo (execução interrompida
+    antes de apagar a origem), não reenvia.
+    """
+    arquivo = Path(arquivo)
+    sha256, md5 = checksums(str(arquivo))
+    destino = sink.find(arquivo.name, sha256, arquivo.stat().st_size)
+    if destino is None:
+        destino = sink.put(str(arquivo), arquivo.name, sha256, md5)
+    
+    manifesto = get_pipeline_manifest()
+    registro = manifesto.por_caminho(str(arquivo))
+    os.remove(arquivo)
+    if registro:
+        manifesto.avancar(registro['hash'], PipelineStage.MOVED, caminho=destino)
+        get_bill_index().atualizar(registro['hash'], caminho=destino)
+    return destino
+
+def entregar_pasta(pasta, sink: StorageSink, workers: int = None):
+    """Entrega em paralelo (pool limitado) os arquivos prontos da pasta. Retorna (movidos, erros)."""
+    arquivos = [a for a in Path(pasta).iterdir() if arquivo_pronto(a)]
+    movidos, erros = 0, 0
+    if not arquivos:
+        return movidos, erros
     
-    # SEUS CAMINHOS (ajuste conforme necessário)
-    pasta_downloads = r"C:\Users\User\Documents\Automacao\download_copasa_bills\Faturas"
-    pasta_relatorios = r"C:\Users\User\Documents\Automacao\download_copasa_bills\Faturas\Relatorios - FATURAS"
+    with ThreadPoolExecutor(max_workers=workers or StorageConfig.WORKERS, thread_name_prefix="storage") as executor:
+        futuros = {executor.submit(entregar_arquivo, arquivo, sink): arquivo for arquivo in arquivos}
+        for futuro in as_completed(futuros):
+            arquivo = futuros[futuro]
+            try:
+                destino = futuro.result()
+                print(f"✅ Movido: {arquivo.name} → {os.path.basename(destino)}")
+                movidos += 1
+            except Exception as e:
+                print(f"❌ Erro ao mover {arquivo.name}: {e}")
+                erros += 1
+    return movidos, erros
+
+def mover_arquivos_e_relatorios(pasta_downloads=None, pasta_relatorios=None):
+    """Script simples para mover arquivos baixados e relatórios"""
     
-    # DESTINOS (crie essas pastas ou ajuste os caminhos)
-    pasta_destino_arquivos = r"z:\RINTEC - 01 - GERAL\RINTEC - COPASA TESTE\Faturas"
-    pasta_destino_relatorios = r"z:\RINTEC - 01 - GERAL\RINTEC - COPASA TESTE\Relatorios"
+    pasta_downloads = pasta_downloads or StorageConfig.SOURCE_DIR
+    pasta_relatorios = pasta_relatorios or StorageConfig.SOURCE_REPORTS_DIR
     
     print("🚀 INICIANDO MOVIMENTAÇÃO DE ARQUIVOS")
     print("=" * 50)
     
-    # Criar pastas de destino
+    # Destinos: pasta local, compartilhamento montado ou s3://
     try:
-        Path(pasta_destino_arquivos).mkdir(parents=True, exist_ok=True)
-        Path(pasta_destino_relatorios).mkdir(parents=True, exist_ok=True)
-        print("✅ Pastas de destino criadas/verificadas")
+        sink_arquivos = get_sink(StorageConfig.PDF_DESTINATION, StorageConfig.S3_ENDPOINT_URL)
+        sink_relatorios = get_sink(StorageConfig.REPORT_DESTINATION, StorageConfig.S3_ENDPOINT_URL)
+        print("✅ Destinos configurados")
     except Exception as e:
-        print(f"❌ Erro ao criar pastas: {e}")
+        print(f"❌ Erro ao configurar destinos: {e}")
         return
     
     total_movidos = 0
+    total_erros = 0
     
     # MOVER ARQUIVOS DA PASTA DOWNLOADS
     print(f"\n📁 Movendo arquivos de: {pasta_downloads}")
-    print(f"📁 Para: {pasta_destino_arquivos}")
+    print(f"📁 Para: {sink_arquivos.describe()}")
     print("-" * 40)
     
     try:
-        for arquivo in Path(pasta_downloads).iterdir():
-            # Só pegar arquivos (não pastas)
-            if arquivo.is_file():
-                destino = Path(pasta_destino_arquivos) / arquivo.name
-                
-                # Se arquivo já existe, adicionar timestamp
-                if destino.exists():
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    nome_base = arquivo.stem
-                    extensao = arquivo.suffix
-                    novo_nome = f"{nome_base}_{timestamp}{extensao}"
-                    destino = Path(pasta_destino_arquivos) / novo_nome
-                
-                try:
-                    shutil.move(str(arquivo), str(destino))
-                    print(f"✅ Movido: {arquivo.name} → {destino.name}")
-                    total_movidos += 1
-                except Exception as e:
-                    print(f"❌ Erro ao mover {arquivo.name}: {e}")
-                    
+        movidos, erros = entregar_pasta(pasta_downloads, sink_arquivos)
+        total_movidos += movidos
+        total_erros += erros
     except Exception as e:
         print(f"❌ Erro ao processar pasta downloads: {e}")
     
     # MOVER RELATÓRIOS
     print(f"\n📋 Movendo relatórios de: {pasta_relatorios}")
-    print(f"📋 Para: {pasta_destino_relatorios}")
+    print(f"📋 Para: {sink_relatorios.describe()}")
     print("-" * 40)
     
     try:
         if Path(pasta_relatorios).exists():
-            for relatorio in Path(pasta_relatorios).iterdir():
-                # Só pegar arquivos
-                if relatorio.is_file():
-                    destino = Path(pasta_destino_relatorios) / relatorio.name
-                    
-                    # Se arquivo já existe, adicionar timestamp
-                    if destino.exists():
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        nome_base = relatorio.stem
-                        extensao = relatorio.suffix
-                        novo_nome = f"{nome_base}_{timestamp}{extensao}"
-                        destino = Path(pasta_destino_relatorios) / novo_nome
-                    
-                    try:
-                        shutil.move(str(relatorio), str(destino))
-                        print(f"✅ Movido: {relatorio.name} → {destino.name}")
-                        total_movidos += 1
-                    except Exception as e:
-                        print(f"❌ Erro ao mover {relatorio.name}: {e}")
+            movidos, erros = entregar_pasta(pasta_relatorios, sink_relatorios)
+            total_movidos += movidos
+            total_erros += erros
         else:
             print("⚠️ Pasta de relatórios não encontrada")
             
@@ -94,10 +110,12 @@ def mover_arquivos_e_relatorios():
     print("📊 RESULTADO FINAL")
     print("=" * 50)
     print(f"📁 Total de arquivos movidos: {total_movidos}")
+    if total_erros:
+        print(f"⚠️ {total_erros} arquivos falharam e continuam na origem; rode de novo para retomar")
     if total_movidos > 0:
         print("✅ Movimentação concluída com sucesso!")
-        print(f"\n📂 Arquivos movidos para: {pasta_destino_arquivos}")
-        print(f"📂 Relatórios movidos para: {pasta_destino_relatorios}")
+        print(f"\n📂 Arquivos movidos para: {sink_arquivos.describe()}")
+        print(f"📂 Relatórios movidos para: {sink_relatorios.describe()}")
     else:
         print("⚠️ Nenhum arquivo foi movido")
         print("   - Verifique se há arquivos nas pastas de origem")
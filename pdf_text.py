@@ -0,0 +1,148 @@
+"""
+Extração de texto dos PDFs com backend selecionável.
+
+Backends: pdfplumber (padrão), pdfminer (LAParams ajustados) e pypdfium2.
+Opcionalmente limita a extração a algumas páginas e a regiões da página,
+dadas como frações (x0, y0, x1, y1) da largura/altura, origem no topo.
+"""
+import hashlib
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from config import SystemConfig
+
+try:
+    import pdfplumber
+except ImportError:
+    pdfplumber = None
+
+try:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LAParams, LTTextContainer
+except ImportError:
+    extract_pages = None
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+Regiao = Tuple[float, float, float, float]
+
+# Faturas têm layout fixo e texto em colunas curtas; margens menores evitam juntar colunas vizinhas
+PDFMINER_LAPARAMS = dict(line_margin=0.3, char_margin=1.5, word_margin=0.1, boxes_flow=None)
+
+def _paginas_selecionadas(total: int, paginas: Optional[Sequence[int]]):
+    if not paginas:
+        return range(total)
+    return [p - 1 for p in paginas if 1 <= p <= total]
+
+def _extract_pdfplumber(pdf_path: str, paginas=None, regioes=None) -> str:
+    text_data = ""
+    with pdfplumber.open(pdf_path) as pdf:
+        for indice in _paginas_selecionadas(len(pdf.pages), paginas):
+            page = pdf.pages[indice]
+            areas = [page.crop((x0 * page.width, y0 * page.height, x1 * page.width, y1 * page.height))
+                     for x0, y0, x1, y1 in regioes] if regioes else [page]
+            for area in areas:
+                text = area.extract_text()
+                if text:
+                    text_data += text + '\n'
+    return text_data
+
+def _extract_pdfminer(pdf_path: str, paginas=None, regioes=None) -> str:
+    page_numbers = [p - 1 for p in paginas] if paginas else None
+    text_data = ""
+    for layout in extract_pages(pdf_path, page_numbers=page_numbers, laparams=LAParams(**PDFMINER_LAPARAMS)):
+        blocos = [el for el in layout if isinstance(el, LTTextContainer)]
+        if regioes:
+            selecionados = []
+            for x0, y0, x1, y1 in regioes:
+                # pdfminer usa origem no canto inferior esquerdo
+                caixa = (x0 * layout.width, (1 - y1) * layout.height, x1 * layout.width, (1 - y0) * layout.height)
+                selecionados.extend(
+                    el for el in blocos
+                    if el.x0 >= caixa[0] and el.x1 <= caixa[2] and el.y0 >= caixa[1] and el.y1 <= caixa[3]
+                )
+            blocos = selecionados
+        for bloco in blocos:
+            text = bloco.get_text()
+            if text.strip():
+                text_data += text if text.endswith('\n') else text + '\n'
+    return text_data
+
+def _extract_pypdfium2(pdf_path: str, paginas=None, regioes=None) -> str:
+    text_data = ""
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        for indice in _paginas_selecionadas(len(pdf), paginas):
+            page = pdf[indice]
+            textpage = page.get_textpage()
+            try:
+                if regioes:
+                    largura, altura = page.get_size()
+                    textos = [
+                        textpage.get_text_bounded(left=x0 * largura, bottom=(1 - y1) * altura,
+                                                  right=x1 * largura, top=(1 - y0) * altura)
+                        for x0, y0, x1, y1 in regioes
+                    ]
+                else:
+                    textos = [textpage.get_text_range()]
+            finally:
+                textpage.close()
+                page.close()
+            for text in textos:
+                text = text.replace('\r\n', '\n')
+                if text.strip():
+                    text_data += text + '\n'
+    finally:
+        pdf.close()
+    return text_data
+
+BACKENDS: Dict[str, Tuple[Callable, object]] = {
+    'pdfplumber': (_extract_pdfplumber, lambda: pdfplumber),
+    'pdfminer': (_extract_pdfminer, lambda: extract_pages),
+    'pypdfium2': (_extract_pypdfium2, lambda: pdfium),
+}
+
+def disponiveis():
+    return [nome for nome, (_, modulo) in BACKENDS.items() if modulo() is not None]
+
+def parse_regioes(valor: str):
+    """'x0,y0,x1,y1;x0,y0,x1,y1' (frações da página) -> lista de tuplas."""
+    regioes = []
+    for trecho in (valor or '').split(';'):
+        if trecho.strip():
+            x0, y0, x1, y1 = (float(v) for v in trecho.split(','))
+            regioes.append((x0, y0, x1, y1))
+    return regioes
+
+def parse_paginas(valor: str):
+    return [int(p) for p in (valor or '').split(',') if p.strip()]
+
+def configuracao_padrao():
+    return (
+        SystemConfig.PDF_TEXT_BACKEND,
+        tuple(parse_paginas(SystemConfig.PDF_TEXT_PAGES)),
+        tuple(parse_regioes(SystemConfig.PDF_TEXT_REGIONS)),
+    )
+
+def variante(backend: str, paginas=(), regioes=()) -> str:
+    """Identificador da configuração, para separar entradas no cache de texto."""
+    if backend == 'pdfplumber' and not paginas and not regioes:
+        return ''
+    chave = f"{backend}|{list(paginas)}|{list(regioes)}"
+    return hashlib.sha256(chave.encode()).hexdigest()[:12]
+
+def extract(pdf_path: str, backend: str = None, paginas: Sequence[int] = None,
+            regioes: Sequence[Regiao] = None) -> str:
+    if backend is None:
+        backend, paginas_padrao, regioes_padrao = configuracao_padrao()
+        paginas = paginas if paginas is not None else paginas_padrao
+        regioes = regioes if regioes is not None else regioes_padrao
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de PDF desconhecido: {backend} (opções: {', '.join(BACKENDS)})")
+    funcao, modulo = BACKENDS[backend]
+    if modulo() is None:
+        raise RuntimeError(f"Backend '{backend}' não instalado")
+    return funcao(pdf_path, paginas or None, regioes or None)
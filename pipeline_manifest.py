@@ -0,0 +1,140 @@
+import os
+import time
+import sqlite3
+import threading
+from enum import IntEnum
+from typing import Dict, List, Optional
+
+from config import SystemConfig
+from bill_index import get_bill_index, _normalizar_caminho
+
+class PipelineStage(IntEnum):
+    DOWNLOADED = 1
+    EXTRACTED = 2
+    RENAMED = 3
+    REPORTED = 4
+    MOVED = 5
+
+class PipelineManifest:
+    """
+    Manifesto (SQLite, mesmo STATE_DB do índice de faturas) com a etapa de
+    cada PDF no pós-processamento, chaveado pelo hash do conteúdo.
+
+    Cada estágio consulta o manifesto antes de trabalhar e avança a etapa ao
+    terminar. Numa retomada, os arquivos já conhecidos de uma pasta vêm de uma
+    única consulta; só os arquivos novos precisam ser lidos.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or SystemConfig.STATE_DB
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS manifesto (
+                hash TEXT PRIMARY KEY,
+                caminho TEXT NOT NULL,
+                etapa INTEGER NOT NULL,
+                matricula TEXT,
+                relatorio TEXT,
+                atualizado_em REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_manifesto_caminho ON manifesto (caminho);
+            CREATE INDEX IF NOT EXISTS idx_manifesto_etapa ON manifesto (etapa);
+        """)
+        self._conn.commit()
+
+    def registrar(self, digest: str, caminho: str, etapa: PipelineStage = PipelineStage.DOWNLOADED,
+                  matricula: str = None) -> PipelineStage:
+        """Registra o PDF se ainda não existir; retorna a etapa em que ele está."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO manifesto VALUES (?, ?, ?, ?, NULL, ?)",
+                (digest, os.path.abspath(caminho), int(etapa), matricula, time.time())
+            )
+            self._conn.commit()
+            linha = self._conn.execute("SELECT etapa FROM manifesto WHERE hash=?", (digest,)).fetchone()
+        return PipelineStage(linha['etapa'])
+
+    def avancar(self, digest: str, etapa: PipelineStage, caminho: str = None, relatorio: str = None):
+        with self._lock:
+            self._conn.execute(
+                """UPDATE manifesto SET
+                       etapa=MAX(etapa, ?),
+                       caminho=COALESCE(?, caminho),
+                       relatorio=COALESCE(?, relatorio),
+                       atualizado_em=?
+                   WHERE hash=?""",
+                (int(etapa), _normalizar_caminho(caminho),
+                 os.path.abspath(relatorio) if relatorio else None, time.time(), digest)
+            )
+            self._conn.commit()
+
+    def remover(self, digest: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM manifesto WHERE hash=?", (digest,))
+            self._conn.commit()
+
+    def etapa(self, digest: str) -> Optional[PipelineStage]:
+        with self._lock:
+            linha = self._conn.execute("SELECT etapa FROM manifesto WHERE hash=?", (digest,)).fetchone()
+        return PipelineStage(linha['etapa']) if linha else None
+
+    def por_caminho(self, caminho: str) -> Optional[Dict]:
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT * FROM manifesto WHERE caminho=?", (os.path.abspath(caminho),)
+            ).fetchone()
+        return dict(linha) if linha else None
+
+    def conhecidos(self, pasta: str) -> Dict[str, Dict]:
+        """{caminho: registro} de todos os PDFs do manifesto que estão diretamente em `pasta`."""
+        pasta = os.path.abspath(pasta)
+        # Comparação de prefixo: num LIKE com ESCAPE o separador do Windows viraria escape
+        prefixo = pasta.rstrip(os.sep) + os.sep
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT * FROM manifesto WHERE substr(caminho, 1, ?) = ?", (len(prefixo), prefixo)
+            ).fetchall()
+        return {l['caminho']: dict(l) for l in linhas if os.path.dirname(l['caminho']) == pasta}
+
+    def pendentes(self, etapa: PipelineStage) -> List[Dict]:
+        """PDFs que ainda não chegaram à etapa informada."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT * FROM manifesto WHERE etapa < ? ORDER BY atualizado_em", (int(etapa),)
+            ).fetchall()
+        return [dict(l) for l in linhas]
+
+    def resumo(self) -> Dict[str, int]:
+        with self._lock:
+            linhas = self._conn.execute("SELECT etapa, COUNT(*) AS total FROM manifesto GROUP BY etapa").fetchall()
+        return {PipelineStage(l['etapa']).name.lower(): l['total'] for l in linhas}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_manifest: Optional[PipelineManifest] = None
+_manifest_lock = threading.Lock()
+
+def get_pipeline_manifest() -> PipelineManifest:
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = PipelineManifest()
+        return _manifest
+
+def localizar(caminho: str, matricula: str = None):
+    """
+    (hash, registro) do PDF no manifesto. Arquivos desconhecidos são lidos uma
+    vez (hash pelo índice de faturas) e entram como DOWNLOADED.
+    """
+    manifesto = get_pipeline_manifest()
+    registro = manifesto.por_caminho(caminho)
+    if registro:
+        return registro['hash'], registro
+    digest = get_bill_index().hash_arquivo(caminho)
+    manifesto.registrar(digest, caminho, matricula=matricula)
+    return digest, manifesto.por_caminho(caminho) or {'hash': digest, 'etapa': manifesto.etapa(digest)}
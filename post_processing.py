@@ -0,0 +1,167 @@
+import os
+import time
+import queue
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from config import SystemConfig, StorageConfig
+from change_archive_name import rename_pdf_safe_mode, get_new_filename_from_pdf, mover_para_duplicatas
+from bill_index import get_bill_index
+from pipeline_manifest import get_pipeline_manifest, PipelineStage
+from analysis_generator import generate_report
+from text_cache import extract_text
+from llm_gateway import get_llm_gateway
+from move_files import entregar_arquivo
+from storage_sink import get_sink
+
+logger = logging.getLogger(__name__)
+
+_FIM = object()
+
+class PostProcessingPipeline:
+    """
+    Pipeline produtor/consumidor do pós-processamento.
+
+    Cada PDF finalizado durante os downloads entra na fila e passa pelos
+    estágios extract -> rename -> report -> move, cada um em sua thread e
+    ligados por filas limitadas. Assim o pós-processamento roda enquanto o
+    navegador ainda está baixando.
+    """
+
+    STAGES = ("extract", "rename", "report", "move")
+
+    def __init__(self, download_folder: str, txt_folder: str, relatorio_folder: str,
+                 queue_size: int = None, mover: bool = True, watcher=None):
+        self.download_folder = download_folder
+        self.watcher = watcher
+        self.txt_folder = txt_folder
+        self.relatorio_folder = relatorio_folder
+        self.pasta_duplicatas = os.path.join(download_folder, SystemConfig.DUPLICATES_FOLDER)
+        self.mover = mover
+        if mover:
+            self.sink_arquivos = get_sink(StorageConfig.PDF_DESTINATION, StorageConfig.S3_ENDPOINT_URL)
+            self.sink_relatorios = get_sink(StorageConfig.REPORT_DESTINATION, StorageConfig.S3_ENDPOINT_URL)
+        queue_size = queue_size or SystemConfig.PIPELINE_QUEUE_SIZE
+
+        self._inbox = queue.Queue()
+        self._queues = {stage: queue.Queue(maxsize=queue_size) for stage in self.STAGES[1:]}
+        self._nomes_ja_processados = {
+            nome for nome in os.listdir(download_folder)
+            if nome.lower().endswith(".pdf") and '_' in nome
+        }
+        self.stats: Dict[str, int] = {stage: 0 for stage in self.STAGES}
+        self.stats['erros'] = 0
+        self.stats['duplicatas'] = 0
+        self.indice = get_bill_index()
+        self.manifesto = get_pipeline_manifest()
+        self._stats_lock = threading.Lock()
+        self._threads = []
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.time()
+        handlers = {
+            "extract": (self._inbox, self._queues["rename"], self._do_extract),
+            "rename": (self._queues["rename"], self._queues["report"], self._do_rename),
+            "report": (self._queues["report"], self._queues["move"], self._do_report),
+            "move": (self._queues["move"], None, self._do_move),
+        }
+        for stage in self.STAGES:
+            entrada, saida, handler = handlers[stage]
+            thread = threading.Thread(
+                target=self._run_stage, args=(stage, entrada, saida, handler),
+                name=f"pipeline-{stage}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info("🧵 Pipeline de pós-processamento iniciado")
+        return self
+
+    def submit(self, pdf_path: str, matricula: Optional[str] = None):
+        if pdf_path and pdf_path.lower().endswith(".pdf"):
+            self._inbox.put({'path': pdf_path, 'matricula': matricula})
+
+    def close(self):
+        self._inbox.put(_FIM)
+        for thread in self._threads:
+            thread.join()
+        duracao = time.time() - self._started_at if self._started_at else 0
+        logger.info(f"🧵 Pipeline finalizado em {duracao:.1f}s: {self.stats}")
+        logger.info(get_llm_gateway().resumo())
+
+    def _run_stage(self, stage: str, entrada: queue.Queue, saida: Optional[queue.Queue], handler: Callable):
+        while True:
+            item = entrada.get()
+            if item is _FIM:
+                if saida is not None:
+                    saida.put(_FIM)
+                return
+
+            try:
+                resultado = handler(item)
+            except Exception as e:
+                with self._stats_lock:
+                    self.stats['erros'] += 1
+                logger.error(f"❌ Pipeline [{stage}] {os.path.basename(item['path'])}: {e}")
+                continue
+
+            if resultado is None:
+                continue
+            with self._stats_lock:
+                self.stats[stage] += 1
+            if saida is not None:
+                saida.put(resultado)
+
+    def _do_extract(self, item: Dict) -> Optional[Dict]:
+        # Duplicatas são reconhecidas pelo hash antes de extrair ou chamar o LLM
+        digest, existente = self.indice.registrar(item['path'], item.get('matricula'))
+        if existente is not None:
+            mover_para_duplicatas(
+                item['path'], self.pasta_duplicatas,
+                f"mesmo conteúdo de {existente['nome'] or existente['caminho']}"
+            )
+            with self._stats_lock:
+                self.stats['duplicatas'] += 1
+            return None
+        item['hash'] = digest
+        self.manifesto.registrar(digest, item['path'], matricula=item.get('matricula'))
+        item['text'] = extract_text(item['path'], digest)
+        self.manifesto.avancar(digest, PipelineStage.EXTRACTED)
+        return item
+
+    def _do_rename(self, item: Dict) -> Optional[Dict]:
+        novo_nome = get_new_filename_from_pdf(item['path'], item['text'])
+        # O rename acontece na pasta observada e não é um download novo; o ignore
+        # vem antes para o evento não escapar, e é desfeito se o nome não for gravado
+        observado = self.watcher and os.path.abspath(os.path.dirname(item['path'])) == os.path.abspath(self.watcher.folder)
+        if observado:
+            self.watcher.ignore(novo_nome)
+        novo_caminho = None
+        try:
+            novo_caminho = rename_pdf_safe_mode(
+                item['path'], self.pasta_duplicatas, self._nomes_ja_processados, item['text'], novo_nome
+            )
+        finally:
+            if observado and novo_caminho is None:
+                self.watcher.unignore(novo_nome)
+        if novo_caminho is None:
+            self.indice.remover(item['hash'])
+            self.manifesto.remover(item['hash'])
+            return None
+        self.indice.atualizar(item['hash'], nome=os.path.basename(novo_caminho), caminho=novo_caminho)
+        self.manifesto.avancar(item['hash'], PipelineStage.RENAMED, caminho=novo_caminho)
+        item['path'] = novo_caminho
+        return item
+
+    def _do_report(self, item: Dict) -> Dict:
+        item['report'] = generate_report(item['path'], self.txt_folder, self.relatorio_folder, item['text'])
+        return item
+
+    def _do_move(self, item: Dict) -> Optional[Dict]:
+        if not self.mover:
+            return None
+        # entregar_arquivo confere o checksum no destino e atualiza manifesto e índice
+        entregar_arquivo(item['path'], self.sink_arquivos)
+        entregar_arquivo(item['report'], self.sink_relatorios)
+        return item
@@ -1,55 +1,12 @@
 import os
-import time
 import shutil
-import pdfplumber
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.output_parsers import StrOutputParser
+from change_archive_name import get_new_filename_from_pdf
+from text_cache import extract_text
+from pipeline_manifest import get_pipeline_manifest, localizar, PipelineStage
 
 load_dotenv()
 
-def get_new_filename_from_pdf(pdf_path):  
-    with pdfplumber.open(pdf_path) as pdf:
-        text_data = ""
-        for page in pdf.pages:
-            text = page.extract_text()
-            if text:
-                text_data += text + '\n'
-
-    llm = ChatGoogleGenerativeAI(model='gemini-2.0-flash-lite', temperature=0.2)
-
-    template = """
-    Você receberá o conteúdo textual de uma fatura da Copasa.
-
-    Sua tarefa é gerar APENAS um nome de arquivo no seguinte formato:
-
-    <nome_condominio_ou_edificio>_<bloco_se_existir>_<MM-AAAA>.pdf
-
-    Regras:
-    1. Se o imóvel for um CONDOMÍNIO, use o prefixo "CONDOMINIO".
-    2. Se o imóvel for um EDIFÍCIO, use o prefixo "EDIFICIO".
-    3. Se houver identificação de BLOCO, inclua-o após o nome. Exemplo: "BLOCOA".
-    4. Se NÃO houver bloco, omita essa parte.
-    5. A data deve estar no formato mês-ano (MM-AAAA).
-    6. Use apenas letras e números, sem acentos, espaços ou caracteres especiais. Substitua espaços por underline `_`.
-    7. Retorne APENAS o nome do arquivo final, sem explicações adicionais.
-
-    Exemplo esperado:
-    CONDOMINIO_SOL_BLOCO-A_01-2024.pdf
-    EDIFICIO_CENTRAL_07-2023.pdf
-
-    Conteúdo da fatura:
-    {text}
-    """
-
-    prompt = PromptTemplate(input_variables=['text'], template=template)
-    chain = prompt | llm | StrOutputParser()
-
-    time.sleep(4)
-    novo_nome = chain.invoke({'text': text_data}).strip()
-    return novo_nome
-
 def already_renamed(nome_arquivo):
     nome_upper = nome_arquivo.upper()
 
@@ -71,17 +28,30 @@ def rename_only_new(pasta):
 
     print(f"[INFO] Encontrados {len(pdfs_para_processar)} PDFs\n")
 
+    manifesto = get_pipeline_manifest()
+    conhecidos = manifesto.conhecidos(pasta)
+
     for caminho in pdfs_para_processar:
         nome_atual = os.path.basename(caminho)
+        registro = conhecidos.get(os.path.abspath(caminho))
 
-        if already_renamed(nome_atual):
+        # O manifesto decide; o padrão do nome só vale para arquivos anteriores a ele
+        if registro and registro['etapa'] >= PipelineStage.RENAMED:
+            print(f"[PULADO] {nome_atual} (já renomeado)")
+            arquivos_pulados.append(caminho)
+            continue
+        if not registro and already_renamed(nome_atual):
+            digest, _ = localizar(caminho)
+            manifesto.avancar(digest, PipelineStage.RENAMED)
             print(f"[PULADO] {nome_atual} (já está no padrão)")
             arquivos_pulados.append(caminho)
             continue
 
         try:
             print(f"[PROCESSANDO] {nome_atual}...")
-            novo_nome = get_new_filename_from_pdf(caminho)
+            digest = registro['hash'] if registro else localizar(caminho)[0]
+            novo_nome = get_new_filename_from_pdf(caminho, extract_text(caminho, digest))
+            manifesto.avancar(digest, PipelineStage.EXTRACTED)
             novo_caminho = os.path.join(pasta, novo_nome)
 
             if os.path.exists(novo_caminho):
@@ -89,6 +59,7 @@ def rename_only_new(pasta):
                 continue
 
             shutil.move(caminho, novo_caminho)
+            manifesto.avancar(digest, PipelineStage.RENAMED, caminho=novo_caminho)
             print(f"[RENOMEADO] {nome_atual} -> {novo_nome}")
             arquivos_processados.append(novo_caminho)
 
@@ -1,28 +1,115 @@
 import os
+import time
+import queue
 import logging
-from main import main
+import argparse
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from database_manager import DatabaseManager
+from config import LoggingConfig
+from logging_setup import configurar_logging, definir_contexto
+from metrics import iniciar_servidor
 
 load_dotenv()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('runner.log', encoding='utf-8'),
-        logging.StreamHandler()
-    ]
-)
+def _configurar_logging():
+    # Runner e download_bills gravam no mesmo arquivo: é o que o LogAnalyzer (utils.py logs/errors) lê
+    return configurar_logging(LoggingConfig.LOG_FILES['main'])
+
 logger = logging.getLogger(__name__)
 
 webmail_host = os.getenv('WEBMAIL_HOST')
-db = DatabaseManager()
 
-def main_runner():
+# Nada de efeito colateral no import: no Windows cada processo do Pool de extração
+# (text_cache) reimporta este módulo como __mp_main__, e de novo a cada reciclagem.
+# Logging, banco e Selenium (via main) só sobem em main_runner.
+
+def _processar_credencial(i, total, cred, db, download_dir=None):
+    """
+    Processa um CPF completo. Retorna True (sucesso), False (erro) ou None (nada a fazer).
+    """
+    cpf = cred['cpf']
+    password = cred['password']
+    webmail_user = cred['webmail_user']
+    webmail_password = cred['webmail_password']
+    definir_contexto(cpf=cpf)
+    from main import main
+    
+    logger.info(f"\n{'='*60}")
+    logger.info(f"🔄 PROCESSANDO CREDENCIAL {i}/{total}")
+    logger.info(f"👤 CPF: {cpf}")
+    logger.info(f"📧 Email: {webmail_user}")
+    if download_dir:
+        logger.info(f"📁 Pasta do worker: {download_dir}")
+    logger.info(f"{'='*60}")
+    
+    try:
+        identifiers = db.get_matriculas_para_cpf(
+            cpf, 
+            incluir_pendentes=True, 
+            verificar_duplicatas=True
+        )
+
+        if not identifiers:
+            logger.info(f"ℹ️ CPF {cpf}: Nenhuma matrícula pendente para processar")
+            logger.info("   • Todas as matrículas já foram baixadas hoje")
+            logger.info("   • Ou não há matrículas agendadas para hoje")
+            return None
+        
+        logger.info(f"🎯 Matrículas para processar: {len(identifiers)}")
+        logger.info(f"📋 Lista: {identifiers}")
+        
+        main(
+            cpf=cpf,
+            password=password,
+            webmail_user=webmail_user,
+            webmail_password=webmail_password,
+            webmail_host=webmail_host,
+            matriculas=identifiers,
+            download_dir=download_dir,
+            ja_filtradas=True
+        )
+        
+        logger.info(f"✅ CPF {cpf} processado com sucesso!")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Erro ao processar CPF {cpf}: {str(e)}")
+        logger.error(f"🔄 Continuando para próxima credencial...")
+        return False
+
+def _executar_em_paralelo(credentials, workers, db):
+    base_dir = os.getenv("DOWNLOAD_DIR")
+    slots = queue.Queue()
+    for slot in range(1, workers + 1):
+        slots.put(slot)
+
+    def _worker(i, cred):
+        # Cada worker usa um slot fixo: um Firefox por vez e pasta de download própria
+        slot = slots.get()
+        try:
+            download_dir = os.path.join(base_dir, f"worker_{slot}")
+            return _processar_credencial(i, len(credentials), cred, db, download_dir)
+        finally:
+            slots.put(slot)
+
+    resultados = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="copasa-worker") as executor:
+        futures = [
+            executor.submit(_worker, i, cred)
+            for i, cred in enumerate(credentials, 1)
+        ]
+        for future in as_completed(futures):
+            resultados.append(future.result())
+    return resultados
+
+def main_runner(workers: int = 1):
+    _configurar_logging()
     logger.info("🚀 Iniciando sistema de download COPASA otimizado")
+    iniciar_servidor()
     
     try:
+        db = DatabaseManager()
         credentials = db.get_credenciais_ativas()
         
         if not credentials:
@@ -31,54 +118,22 @@ def main_runner():
         
         logger.info(f"📋 Encontradas {len(credentials)} credenciais ativas para processar")
         
-        total_processados = 0
-        total_erros = 0
+        workers = max(1, min(workers, len(credentials)))
+        inicio = time.time()
         
-        for i, cred in enumerate(credentials, 1):
-            cpf = cred['cpf']
-            password = cred['password']
-            webmail_user = cred['webmail_user']
-            webmail_password = cred['webmail_password']
-            
-            logger.info(f"\n{'='*60}")
-            logger.info(f"🔄 PROCESSANDO CREDENCIAL {i}/{len(credentials)}")
-            logger.info(f"👤 CPF: {cpf}")
-            logger.info(f"📧 Email: {webmail_user}")
-            logger.info(f"{'='*60}")
-            
-            try:
-                identifiers = db.get_matriculas_para_cpf(
-                    cpf, 
-                    incluir_pendentes=True, 
-                    verificar_duplicatas=True
-                )
-
-                if not identifiers:
-                    logger.info(f"ℹ️ CPF {cpf}: Nenhuma matrícula pendente para processar")
-                    logger.info("   • Todas as matrículas já foram baixadas hoje")
-                    logger.info("   • Ou não há matrículas agendadas para hoje")
-                    continue
-                
-                logger.info(f"🎯 Matrículas para processar: {len(identifiers)}")
-                logger.info(f"📋 Lista: {identifiers}")
-                
-                main(
-                    cpf=cpf,
-                    password=password,
-                    webmail_user=webmail_user,
-                    webmail_password=webmail_password,
-                    webmail_host=webmail_host,
-                    matriculas=identifiers
-                )
-                
-                logger.info(f"✅ CPF {cpf} processado com sucesso!")
-                total_processados += 1
-                
-            except Exception as e:
-                logger.error(f"❌ Erro ao processar CPF {cpf}: {str(e)}")
-                logger.error(f"🔄 Continuando para próxima credencial...")
-                total_erros += 1
-                continue
+        if workers > 1:
+            logger.info(f"⚙️ Modo paralelo: {workers} workers")
+            resultados = _executar_em_paralelo(credentials, workers, db)
+        else:
+            resultados = [
+                _processar_credencial(i, len(credentials), cred, db)
+                for i, cred in enumerate(credentials, 1)
+            ]
+        
+        total_processados = sum(1 for r in resultados if r is True)
+        total_erros = sum(1 for r in resultados if r is False)
+        duracao = time.time() - inicio
+        cpfs_por_hora = (len(credentials) / duracao * 3600) if duracao > 0 else 0
         
         logger.info(f"\n{'='*60}")
         logger.info(f"📊 RELATÓRIO FINAL")
@@ -86,6 +141,7 @@ def main_runner():
         logger.info(f"✅ Credenciais processadas com sucesso: {total_processados}")
         logger.info(f"❌ Credenciais com erro: {total_erros}")
         logger.info(f"📈 Taxa de sucesso: {(total_processados/(total_processados + total_erros)*100) if (total_processados + total_erros) > 0 else 0:.1f}%")
+        logger.info(f"⏱️ Vazão: {cpfs_por_hora:.1f} CPFs/hora com {workers} worker(s) ({duracao:.1f}s)")
         logger.info(f"🎉 Processamento finalizado!")
         
     except Exception as e:
@@ -93,8 +149,17 @@ def main_runner():
         raise
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download automatizado de faturas COPASA")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("RUNNER_WORKERS", "1")),
+        help="Número de CPFs processados em paralelo (um Firefox por worker)"
+    )
+    args = parser.parse_args()
+
     try:
-        main_runner()
+        main_runner(workers=args.workers)
     except KeyboardInterrupt:
         logger.warning("⚠️ Execução interrompida pelo usuário")
     except Exception as e:
@@ -0,0 +1,130 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from config import SessionConfig
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = Exception
+
+logger = logging.getLogger(__name__)
+
+class SessionCache:
+    """
+    Cache criptografado (Fernet) dos cookies autenticados do portal, por CPF.
+
+    Um driver novo restaura os cookies, abre a última página autenticada e faz
+    um probe rápido (select "Todos" da lista de matrículas). Se o probe falhar,
+    o chamador segue para o login completo.
+    """
+
+    def __init__(self, cache_dir: str = None, key: str = None, ttl: int = None):
+        self.cache_dir = cache_dir or SessionConfig.CACHE_DIR
+        self.ttl = ttl or SessionConfig.TTL
+        key = key or SessionConfig.KEY
+        self._fernet = Fernet(key.encode()) if (Fernet and key) else None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'tempo_economizado': 0.0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._fernet is not None
+
+    def _path(self, cpf: str) -> str:
+        nome = hashlib.sha256(str(cpf).encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{nome}.session")
+
+    def _load(self, cpf: str) -> Optional[Dict]:
+        try:
+            with open(self._path(cpf), 'rb') as f:
+                return json.loads(self._fernet.decrypt(f.read()))
+        except (OSError, ValueError, InvalidToken):
+            return None
+
+    def save(self, cpf: str, driver, login_seconds: float = None):
+        if not self.enabled:
+            return
+        try:
+            anterior = self._load(cpf) or {}
+            payload = {
+                'saved_at': time.time(),
+                'url': driver.current_url,
+                'cookies': driver.get_cookies(),
+                'login_seconds': login_seconds or anterior.get('login_seconds', 0),
+            }
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(cpf)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(self._fernet.encrypt(json.dumps(payload).encode()))
+            os.replace(tmp_path, path)
+        except (OSError, WebDriverException) as e:
+            logger.warning(f"⚠️ Não foi possível salvar sessão em cache: {e}")
+
+    def invalidate(self, cpf: str):
+        try:
+            os.remove(self._path(cpf))
+        except OSError:
+            pass
+
+    def _miss(self) -> None:
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def restore(self, cpf: str, driver) -> Optional[float]:
+        """Restaura a sessão no driver; devolve o saved_at do cache, ou None se precisar de login."""
+        if not self.enabled:
+            return None
+
+        payload = self._load(cpf)
+        if not payload or time.time() - payload.get('saved_at', 0) > self.ttl:
+            return self._miss()
+
+        inicio = time.time()
+        try:
+            # add_cookie exige estar no domínio do portal
+            driver.get(SessionConfig.PORTAL_LOGIN_URL)
+            driver.delete_all_cookies()
+            for cookie in payload['cookies']:
+                if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+                    cookie.pop('sameSite', None)
+                driver.add_cookie(cookie)
+
+            driver.get(payload['url'])
+            WebDriverWait(driver, SessionConfig.PROBE_TIMEOUT).until(
+                EC.element_to_be_clickable((By.CLASS_NAME, "custom-select"))
+            )
+            if "/Login" in driver.current_url:
+                raise TimeoutException("Redirecionado para o login")
+        except (TimeoutException, WebDriverException) as e:
+            logger.info(f"🔑 Sessão em cache inválida para CPF {cpf}: {e.__class__.__name__}")
+            self.invalidate(cpf)
+            return self._miss()
+
+        economizado = max(0.0, payload.get('login_seconds', 0) - (time.time() - inicio))
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['tempo_economizado'] += economizado
+        logger.info(f"🔑 Sessão restaurada do cache para CPF {cpf} (~{economizado:.0f}s economizados)")
+        return payload['saved_at']
+
+    def resumo(self) -> str:
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            taxa = (self.stats['hits'] / total * 100) if total else 0
+            return (f"🔑 Cache de sessão: {self.stats['hits']}/{total} hits ({taxa:.0f}%), "
+                    f"~{self.stats['tempo_economizado']:.0f}s de login economizados")
+
+session_cache = SessionCache()
@@ -0,0 +1,197 @@
+import os
+import re
+import base64
+import hashlib
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+    ClientError = Exception
+
+# Sufixo que put() acrescenta quando o nome já está ocupado por outro conteúdo
+_SUFIXO_TIMESTAMP = re.compile(r'_\d{8}_\d{6}$')
+
+def _com_timestamp(nome: str) -> str:
+    base, ext = os.path.splitext(nome)
+    return f"{base}_{datetime.now().strftime('%Y%m%d_%H%M%S')}{ext}"
+
+def _variante_de(candidato: str, nome: str) -> bool:
+    """candidato é nome com o sufixo de timestamp de put()?"""
+    base, ext = os.path.splitext(nome)
+    base_candidato, ext_candidato = os.path.splitext(candidato)
+    return (ext_candidato == ext and base_candidato.startswith(base)
+            and _SUFIXO_TIMESTAMP.fullmatch(base_candidato[len(base):]) is not None)
+
+def checksums(path: str, chunk_size: int = 1024 * 1024) -> Tuple[str, str]:
+    """(sha256 hex, md5 base64) numa única leitura."""
+    sha256, md5 = hashlib.sha256(), hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256.hexdigest(), base64.b64encode(md5.digest()).decode()
+
+class StorageSink(ABC):
+    """
+    Destino das faturas e relatórios. put() grava de forma atômica, confere o
+    checksum e devolve o local final; find() permite retomar uma transferência
+    interrompida sem reenviar o que já chegou íntegro, inclusive quando put()
+    gravou com timestamp por o nome estar ocupado.
+    """
+
+    @abstractmethod
+    def find(self, nome: str, sha256: str, tamanho: int) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def put(self, origem: str, nome: str, sha256: str, md5: str) -> str:
+        ...
+
+    @abstractmethod
+    def describe(self) -> str:
+        ...
+
+class LocalSink(StorageSink):
+    """Pasta local ou compartilhamento de rede montado (ex.: Z:\\)."""
+
+    def __init__(self, base_dir: str):
+        self.base_dir = base_dir
+
+    def describe(self) -> str:
+        return self.base_dir
+
+    def _candidatos(self, nome: str) -> Iterator[str]:
+        destino = os.path.join(self.base_dir, nome)
+        # Variantes com timestamp só existem se o nome simples já estava ocupado
+        if not os.path.exists(destino):
+            return
+        yield destino
+        try:
+            with os.scandir(self.base_dir) as entradas:
+                variantes = sorted(e.path for e in entradas if _variante_de(e.name, nome))
+        except OSError:
+            return
+        yield from variantes
+
+    def find(self, nome: str, sha256: str, tamanho: int) -> Optional[str]:
+        for destino in self._candidatos(nome):
+            try:
+                if os.path.getsize(destino) != tamanho:
+                    continue
+            except OSError:
+                continue
+            if checksums(destino)[0] == sha256:
+                return destino
+        return None
+
+    def put(self, origem: str, nome: str, sha256: str, md5: str) -> str:
+        os.makedirs(self.base_dir, exist_ok=True)
+        destino = os.path.join(self.base_dir, nome)
+        tmp_path = os.path.join(self.base_dir, f".{nome}.{uuid.uuid4().hex[:8]}.part")
+
+        try:
+            with open(origem, 'rb') as src, open(tmp_path, 'wb') as dst:
+                for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                    dst.write(chunk)
+                dst.flush()
+                os.fsync(dst.fileno())
+            # Relê do destino: no compartilhamento de rede é o que garante que os bytes chegaram
+            if checksums(tmp_path)[0] != sha256:
+                raise IOError(f"Checksum divergente ao gravar {nome}")
+
+            if os.path.exists(destino):
+                # Mesmo comportamento de antes: nome ocupado por outro conteúdo ganha timestamp
+                destino = os.path.join(self.base_dir, _com_timestamp(nome))
+            os.replace(tmp_path, destino)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return destino
+
+class S3Sink(StorageSink):
+    """
+    Bucket S3 ou compatível (MinIO etc., via endpoint_url). O PUT do S3 já é
+    atômico; a integridade é conferida pelo Content-MD5 no envio e pelo sha256
+    gravado nos metadados do objeto.
+    """
+
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = None, client=None):
+        if client is None and boto3 is None:
+            raise RuntimeError("Pacote 'boto3' não instalado")
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = client or boto3.client('s3', endpoint_url=endpoint_url)
+
+    def describe(self) -> str:
+        return f"s3://{self.bucket}/{self.prefix}"
+
+    def _key(self, nome: str) -> str:
+        return f"{self.prefix}/{nome}" if self.prefix else nome
+
+    def _head(self, key: str) -> Optional[dict]:
+        """head_object, ou None se o objeto não existe; outros erros (permissão, rede) sobem."""
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as e:
+            erro = getattr(e, 'response', None) or {}
+            codigo = str(erro.get('Error', {}).get('Code', ''))
+            status = erro.get('ResponseMetadata', {}).get('HTTPStatusCode')
+            if codigo in ('404', 'NoSuchKey', 'NotFound') or status == 404:
+                return None
+            raise
+
+    def _variantes(self, nome: str) -> Iterator[Tuple[str, int]]:
+        base, _ = os.path.splitext(nome)
+        paginator = self.client.get_paginator('list_objects_v2')
+        for pagina in paginator.paginate(Bucket=self.bucket, Prefix=self._key(f"{base}_")):
+            for objeto in pagina.get('Contents', []):
+                if _variante_de(objeto['Key'].rsplit('/', 1)[-1], nome):
+                    yield objeto['Key'], objeto['Size']
+
+    def _confere(self, head: Optional[dict], sha256: str, tamanho: int) -> bool:
+        if not head:
+            return False
+        return head.get('ContentLength') == tamanho and head.get('Metadata', {}).get('sha256') == sha256
+
+    def find(self, nome: str, sha256: str, tamanho: int) -> Optional[str]:
+        key = self._key(nome)
+        head = self._head(key)
+        if head is None:
+            # Variantes com timestamp só existem se o nome simples já estava ocupado
+            return None
+        if self._confere(head, sha256, tamanho):
+            return f"s3://{self.bucket}/{key}"
+        for key, size in sorted(self._variantes(nome)):
+            if size == tamanho and self._confere(self._head(key), sha256, tamanho):
+                return f"s3://{self.bucket}/{key}"
+        return None
+
+    def put(self, origem: str, nome: str, sha256: str, md5: str) -> str:
+        key = self._key(nome)
+        if self._head(key) is not None:
+            key = self._key(_com_timestamp(nome))
+
+        with open(origem, 'rb') as f:
+            self.client.put_object(
+                Bucket=self.bucket, Key=key, Body=f, ContentMD5=md5, Metadata={'sha256': sha256}
+            )
+        head = self.client.head_object(Bucket=self.bucket, Key=key)
+        if head.get('Metadata', {}).get('sha256') != sha256 or head.get('ContentLength') != os.path.getsize(origem):
+            raise IOError(f"Objeto {key} não confere após o envio")
+        return f"s3://{self.bucket}/{key}"
+
+def get_sink(destino: str, endpoint_url: str = None) -> StorageSink:
+    """'s3://bucket/prefixo' vira S3Sink; qualquer outro valor é um caminho local/montado."""
+    if destino.startswith('s3://'):
+        bucket, _, prefix = destino[5:].partition('/')
+        return S3Sink(bucket, prefix, endpoint_url=endpoint_url)
+    return LocalSink(destino)
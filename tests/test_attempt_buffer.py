@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from attempt_buffer import AttemptWriteBuffer
+
+
+class _APIError(Exception):
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+class _Supabase:
+    """Cliente falso: recusa (23502) qualquer insert que contenha um registro 'ruim'."""
+
+    def __init__(self, erro=None):
+        self.inseridos = []
+        self.chamadas = 0
+        self.erro = erro
+        self._lote = None
+
+    def table(self, nome):
+        assert nome == 'tentativas_download'
+        return self
+
+    def insert(self, lote):
+        self._lote = lote
+        return self
+
+    def execute(self):
+        self.chamadas += 1
+        if self.erro is not None:
+            raise self.erro
+        if any(r.get('ruim') for r in self._lote):
+            raise _APIError('null value in column "matricula_numero"', '23502')
+        self.inseridos.extend(self._lote)
+
+
+@pytest.fixture
+def caminhos(tmp_path):
+    return str(tmp_path / 'journal.jsonl'), str(tmp_path / 'rejeitados.jsonl')
+
+
+def _buffer(supabase, caminhos):
+    journal, rejeitados = caminhos
+    buf = AttemptWriteBuffer(supabase, journal, batch_size=10, flush_interval=3600, dead_letter_path=rejeitados)
+    buf._replay_journal()
+    buf._journal = open(journal, 'a', encoding='utf-8')
+    return buf
+
+
+def test_erro_permanente_isola_o_registro_e_continua(caminhos):
+    supabase = _Supabase()
+    buf = _buffer(supabase, caminhos)
+    for i in range(25):
+        buf.registrar({'matricula_numero': str(i), 'ruim': i == 3})
+
+    assert buf.flush() is True
+    assert [r['matricula_numero'] for r in supabase.inseridos] == [str(i) for i in range(25) if i != 3]
+    assert buf.enviados == 24 and buf.rejeitados == 1
+
+    with open(caminhos[1], encoding='utf-8') as f:
+        rejeitados = [json.loads(l) for l in f]
+    assert [r['data']['matricula_numero'] for r in rejeitados] == ['3']
+    assert 'matricula_numero' in rejeitados[0]['erro']
+
+    # Nada fica pendente para o próximo start
+    buf._journal.close()
+    assert _buffer(_Supabase(), caminhos)._pending == []
+
+
+def test_erro_transitorio_mantem_no_journal(caminhos):
+    supabase = _Supabase(erro=ConnectionError('timeout'))
+    buf = _buffer(supabase, caminhos)
+    buf.registrar({'matricula_numero': '1'})
+
+    assert buf.flush() is False
+    assert buf.flush() is False
+    assert buf.rejeitados == 0 and buf.falhas_envio == 2
+
+    buf._journal.close()
+    assert len(_buffer(_Supabase(), caminhos)._pending) == 1
@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import bill_archive
+import utils
+from config import SystemConfig
+
+
+def _arquivos(pasta, conteudos):
+    lista = []
+    for nome, dados in conteudos.items():
+        caminho = pasta / nome
+        caminho.write_bytes(dados)
+        lista.append((str(caminho), nome, os.stat(caminho)))
+    return lista
+
+
+def test_adicionar_e_ler_em_fluxo(tmp_path):
+    pytest.importorskip('zstandard')
+    origem = tmp_path / 'origem'
+    origem.mkdir()
+    conteudos = {'a.pdf': b'%PDF a' * 50000, 'b.txt': 'relatório'.encode() * 1000}
+    arquivos = _arquivos(origem, conteudos)
+
+    arquivo = bill_archive.MonthlyArchive(str(tmp_path / 'arquivo'), '2024-01', level=3)
+    assert arquivo.adicionar(arquivos) == [caminho for caminho, _, _ in arquivos]
+    # Mesmo conteúdo de novo não duplica o membro
+    arquivo.adicionar(arquivos)
+    assert len(arquivo.membros()) == 2
+
+    relido = bill_archive.MonthlyArchive(str(tmp_path / 'arquivo'), '2024-01')
+    for nome, dados in conteudos.items():
+        assert relido.ler(nome) == dados
+
+
+def test_clean_archive_sem_zstandard(tmp_path, monkeypatch):
+    antigo = tmp_path / 'antigo.pdf'
+    antigo.write_bytes(b'%PDF')
+    os.utime(antigo, (0, 0))
+    monkeypatch.setattr(SystemConfig, 'DOWNLOAD_DIR', str(tmp_path))
+    monkeypatch.setattr(bill_archive, 'zstandard', None)
+
+    def varrer(*args, **kwargs):
+        raise AssertionError("varreu a pasta sem zstandard")
+
+    monkeypatch.setattr(utils, 'varrer', varrer)
+    resultado = utils.FileUtils.clean_download_folder(arquivar=True)
+
+    assert 'zstandard' in resultado['erro']
+    assert antigo.exists()
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+import bill_extraction
+
+LOTE = [('a.pdf', 'texto a'), ('b.pdf', 'texto b')]
+
+
+class _Gateway:
+    """Repete o contrato do LLMGateway: validate roda antes do cache e o erro sobe."""
+
+    def __init__(self, resposta):
+        self.resposta = resposta
+        self.cache = {}
+        self.enviados = []
+
+    def invoke(self, template, variables, model=None, temperature=0.1, validate=None):
+        assert validate is not None
+        self.enviados.append(variables['faturas'])
+        validate(self.resposta)
+        self.guardar(template, variables, self.resposta)
+        return self.resposta
+
+    def em_cache(self, template, variables, model=None):
+        return self.cache.get((template, json.dumps(variables, sort_keys=True)))
+
+    def guardar(self, template, variables, resposta, model=None):
+        self.cache[(template, json.dumps(variables, sort_keys=True))] = resposta
+
+
+@pytest.fixture
+def gateway(monkeypatch):
+    def usar(resposta):
+        gw = _Gateway(resposta)
+        monkeypatch.setattr(bill_extraction, 'get_llm_gateway', lambda: gw)
+        return gw
+    return usar
+
+
+def test_lote_valido(gateway):
+    gw = gateway('<<<RESULTADO 2>>>{"nome": "EDIFICIO CENTRAL", "referencia": "07-2023"}<<<FIM 2>>>')
+
+    dados = bill_extraction.extrair_dados_lote(LOTE)
+
+    assert list(dados) == ['b.pdf'] and dados['b.pdf']['referencia'] == '07-2023'
+    # Resposta do lote + chave por fatura de b.pdf (a.pdf não voltou válida)
+    assert len(gw.cache) == 2
+
+
+@pytest.mark.parametrize('resposta', [
+    'Desculpe, não consegui ler as faturas.',
+    '<<<RESULTADO 1>>>{"nome": "X"}<<<FIM 1>>>',
+    '<<<RESULTADO 7>>>{"nome": "EDIFICIO CENTRAL", "referencia": "07-2023"}<<<FIM 7>>>',
+])
+def test_lote_sem_bloco_valido_nao_vai_para_o_cache(gateway, resposta):
+    gw = gateway(resposta)
+
+    with pytest.raises(ValueError):
+        bill_extraction.extrair_dados_lote(LOTE)
+    assert gw.cache == {}
+
+
+def test_lote_reaproveita_cache_por_fatura(gateway):
+    gw = gateway('<<<RESULTADO 1>>>{"nome": "EDIFICIO CENTRAL", "referencia": "07-2023"}<<<FIM 1>>>')
+    # O rename já pagou a extração de a.pdf
+    gw.guardar(bill_extraction.TEMPLATE_COMBINADO, {'text': 'texto a'},
+               '{"nome": "CONDOMINIO SOL", "referencia": "06-2023"}')
+
+    dados = bill_extraction.extrair_dados_lote(LOTE)
+
+    assert dados['a.pdf']['nome'] == 'CONDOMINIO SOL'
+    assert dados['b.pdf']['nome'] == 'EDIFICIO CENTRAL'
+    assert len(gw.enviados) == 1 and 'texto a' not in gw.enviados[0]
+    # O relatório de b.pdf pela via individual acha a resposta do lote
+    assert json.loads(gw.em_cache(bill_extraction.TEMPLATE_COMBINADO, {'text': 'texto b'}))['referencia'] == '07-2023'
+
+
+def test_lote_todo_em_cache_nao_chama_o_llm(gateway):
+    gw = gateway('')
+    for _, texto in LOTE:
+        gw.guardar(bill_extraction.TEMPLATE_COMBINADO, {'text': texto},
+                   '{"nome": "CONDOMINIO SOL", "referencia": "06-2023"}')
+
+    assert set(bill_extraction.extrair_dados_lote(LOTE)) == {'a.pdf', 'b.pdf'}
+    assert gw.enviados == []
+
+
+@pytest.mark.parametrize('bloco', ['A', 'BLOCO A', 'Bloco A', 'bloco: a', ' BLOCO-A '])
+def test_render_filename_nao_repete_bloco(bloco):
+    dados = {'prefixo': 'CONDOMINIO', 'nome': 'RESIDENCIAL SOL', 'bloco': bloco, 'referencia': '07-2023'}
+
+    assert bill_extraction.render_filename(dados) == 'CONDOMINIO_RESIDENCIAL_SOL_BLOCOA_07-2023.pdf'
+
+
+def test_render_filename_bloco_so_com_prefixo_e_ignorado():
+    dados = {'prefixo': 'EDIFICIO', 'nome': 'CENTRAL', 'bloco': 'Bloco', 'referencia': '07-2023'}
+
+    assert bill_extraction.render_filename(dados) == 'EDIFICIO_CENTRAL_07-2023.pdf'
@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from bill_parser import medir_cobertura, parse_bill_name
+from config import SystemConfig
+
+# Textos de faturas anonimizados (nomes, endereços e matrículas fictícios);
+# null no esperado.json = layout que deve ir para o LLM
+CORPUS = Path(__file__).parent / 'fixtures' / 'faturas'
+ESPERADO = json.loads((CORPUS / 'esperado.json').read_text(encoding='utf-8'))
+
+
+@pytest.mark.parametrize('arquivo', sorted(ESPERADO))
+def test_nome_e_confianca(arquivo):
+    parsed = parse_bill_name((CORPUS / arquivo).read_text(encoding='utf-8'))
+    esperado = ESPERADO[arquivo]
+
+    if esperado is None:
+        assert parsed is None or parsed['confianca'] < SystemConfig.PARSER_MIN_CONFIDENCE
+    else:
+        assert parsed['arquivo'] == esperado
+        assert parsed['confianca'] >= SystemConfig.PARSER_MIN_CONFIDENCE
+
+
+def test_cobertura_do_corpus():
+    resultado = medir_cobertura(str(CORPUS))
+    resolviveis = sum(1 for nome in ESPERADO.values() if nome)
+
+    assert resultado['total'] == len(ESPERADO)
+    assert resultado['resolvidos'] == resolviveis
+    assert sorted(resultado['falhas']) == sorted(a for a, nome in ESPERADO.items() if nome is None)
+    assert resultado['cobertura'] >= 75
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import pytest
+
+from config import DatabaseConfig
+from database_manager import DatabaseManager
+
+
+class _Consulta:
+    """Encadeia select/in_/eq/gte como o cliente do Supabase e registra cada chamada."""
+
+    def __init__(self, cliente, tabela):
+        self.cliente = cliente
+        self.tabela = tabela
+        self.filtros = {}
+
+    def select(self, colunas):
+        self.cliente.selects.append((self.tabela, colunas))
+        return self
+
+    def in_(self, coluna, valores):
+        self.cliente.ins.append((coluna, list(valores)))
+        self.filtros['in'] = list(valores)
+        return self
+
+    def eq(self, *args):
+        return self
+
+    def gte(self, *args):
+        return self
+
+    def execute(self):
+        baixadas = [m for m in self.filtros.get('in', []) if m in self.cliente.baixadas]
+        return SimpleNamespace(data=[{'matricula_numero': m} for m in baixadas])
+
+
+class _Supabase:
+    def __init__(self, baixadas):
+        self.baixadas = set(baixadas)
+        self.selects = []
+        self.ins = []
+
+    def table(self, nome):
+        return _Consulta(self, nome)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    matriculas = [str(1000 + i) for i in range(450)]
+    db = DatabaseManager.__new__(DatabaseManager)
+    db.supabase = _Supabase(baixadas=matriculas[::3])
+
+    def por_item(*args, **kwargs):
+        raise AssertionError("consulta por matrícula")
+
+    for nome in ('matricula_ja_baixada_no_mes_atual', 'matricula_ja_baixada_hoje', 'matricula_ja_baixada_recentemente'):
+        monkeypatch.setattr(DatabaseManager, nome, por_item)
+    return db, matriculas
+
+
+def _verificar_lotes(supabase, matriculas):
+    lote = DatabaseConfig.IN_QUERY_BATCH_SIZE
+    assert len(supabase.ins) == -(-len(matriculas) // lote)
+    assert all(coluna == 'matricula_numero' and len(valores) <= lote for coluna, valores in supabase.ins)
+    assert sorted(m for _, valores in supabase.ins for m in valores) == sorted(matriculas)
+    assert supabase.selects == [('tentativas_download', 'matricula_numero')] * len(supabase.ins)
+
+
+def test_filtrar_matriculas_nao_baixadas_em_lotes(db):
+    db, matriculas = db
+    restantes = db.filtrar_matriculas_nao_baixadas(matriculas)
+
+    assert restantes == [m for i, m in enumerate(matriculas) if i % 3]
+    _verificar_lotes(db.supabase, matriculas)
+
+
+def test_get_matriculas_para_cpf_em_lotes(db, monkeypatch):
+    db, matriculas = db
+    monkeypatch.setattr(db, 'get_matriculas_por_dia', lambda dia, cpf=None: list(matriculas))
+
+    restantes = db.get_matriculas_para_cpf('00000000000', incluir_pendentes=False)
+
+    assert restantes == [m for i, m in enumerate(matriculas) if i % 3]
+    _verificar_lotes(db.supabase, matriculas)
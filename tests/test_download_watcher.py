@@ -0,0 +1,99 @@
+import os
+import sys
+import time
+
+import pytest
+
+from download_watcher import DownloadWatcher
+
+
+@pytest.fixture(params=['inotify', 'scandir'])
+def watcher(request, tmp_path, monkeypatch):
+    if request.param == 'scandir':
+        monkeypatch.setattr(DownloadWatcher, '_init_inotify', lambda self: False)
+    elif not sys.platform.startswith('linux'):
+        pytest.skip("inotify só existe no Linux")
+    w = DownloadWatcher(str(tmp_path), poll_interval=0.02).start()
+    # O backend scandir lista a pasta ao iniciar; o que já existe não gera evento
+    time.sleep(0.1)
+    yield w
+    w.stop()
+
+
+def _iniciar(pasta, nome):
+    # Como o Firefox: placeholder vazio com o nome final e o conteúdo num .part
+    open(os.path.join(pasta, nome), 'wb').close()
+    with open(os.path.join(pasta, nome + '.part'), 'wb') as f:
+        f.write(b'%PDF-1.4 ' + nome.encode())
+
+
+def _concluir(pasta, nome):
+    os.replace(os.path.join(pasta, nome + '.part'), os.path.join(pasta, nome))
+
+
+def test_arquivo_do_clique(watcher):
+    ticket = watcher.expect()
+    _iniciar(watcher.folder, 'a.pdf')
+    time.sleep(0.1)
+    _concluir(watcher.folder, 'a.pdf')
+
+    assert watcher.wait(ticket, 2) == os.path.join(watcher.folder, 'a.pdf')
+
+
+def test_arquivo_atrasado_nao_vai_para_o_proximo_clique(watcher):
+    primeiro = watcher.expect()
+    _iniciar(watcher.folder, 'atrasado.pdf')
+    assert watcher.wait(primeiro, 0.3) is None
+
+    segundo = watcher.expect()
+    _concluir(watcher.folder, 'atrasado.pdf')
+    time.sleep(0.1)
+    _iniciar(watcher.folder, 'certo.pdf')
+    time.sleep(0.1)
+    _concluir(watcher.folder, 'certo.pdf')
+
+    assert watcher.wait(segundo, 2) == os.path.join(watcher.folder, 'certo.pdf')
+
+
+def test_arquivo_atrasado_sozinho_expira(watcher):
+    primeiro = watcher.expect()
+    _iniciar(watcher.folder, 'atrasado.pdf')
+    assert watcher.wait(primeiro, 0.3) is None
+
+    segundo = watcher.expect()
+    _concluir(watcher.folder, 'atrasado.pdf')
+
+    assert watcher.wait(segundo, 0.5) is None
+
+
+def test_evento_consumido_sai_das_assinaturas(watcher):
+    ticket = watcher.expect()
+    _iniciar(watcher.folder, 'a.pdf')
+    time.sleep(0.1)
+    _concluir(watcher.folder, 'a.pdf')
+
+    assert watcher.wait(ticket, 2)
+    assert watcher._emitted == {}
+
+
+def test_scandir_consulta_so_nomes_novos(tmp_path, monkeypatch):
+    monkeypatch.setattr(DownloadWatcher, '_init_inotify', lambda self: False)
+    for i in range(50):
+        with open(tmp_path / f"antigo_{i}.pdf", 'wb') as f:
+            f.write(b'%PDF')
+    w = DownloadWatcher(str(tmp_path), poll_interval=0.02)
+    consultados = []
+    original = w._scan_name
+    monkeypatch.setattr(w, '_scan_name', lambda name, *args: (consultados.append(name), original(name, *args)))
+    w.start()
+    try:
+        time.sleep(0.1)
+        ticket = w.expect()
+        _iniciar(w.folder, 'novo.pdf')
+        time.sleep(0.1)
+        _concluir(w.folder, 'novo.pdf')
+
+        assert w.wait(ticket, 2) == os.path.join(w.folder, 'novo.pdf')
+        assert not any(nome.startswith('antigo_') for nome in consultados)
+    finally:
+        w.stop()
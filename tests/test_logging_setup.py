@@ -0,0 +1,42 @@
+import os
+import queue
+import logging
+
+from logging_setup import _ArquivoRotativo, _Listener
+
+
+def _registro(msg):
+    return logging.LogRecord('teste', logging.INFO, __file__, 1, msg, None, None)
+
+
+def test_rotacao_conta_bytes_utf8(tmp_path):
+    caminho = str(tmp_path / 'app.log')
+    handler = _ArquivoRotativo(caminho, maxBytes=200, backupCount=20, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+
+    # 20 caracteres, 60 bytes em UTF-8
+    for _ in range(30):
+        handler.handle(_registro('ção✅' * 5))
+    handler.close()
+
+    tamanhos = [os.path.getsize(os.path.join(tmp_path, nome)) for nome in os.listdir(tmp_path)]
+    assert len(tamanhos) > 1
+    assert max(tamanhos) <= 200
+
+
+def test_stop_descarrega_o_arquivo(tmp_path):
+    caminho = str(tmp_path / 'app.log')
+    handler = _ArquivoRotativo(caminho, maxBytes=0, backupCount=0, encoding='utf-8', delay=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    fila = queue.SimpleQueue()
+    listener = _Listener(fila, handler)
+
+    # Fila cheia antes do start: o listener nunca a vê vazia durante o handle
+    for i in range(500):
+        fila.put(_registro(f'linha {i}'))
+    listener.start()
+    listener.stop()
+
+    with open(caminho, encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 500
+    handler.close()
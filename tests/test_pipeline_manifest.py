@@ -0,0 +1,29 @@
+import ntpath
+import types
+
+import pipeline_manifest
+from pipeline_manifest import PipelineManifest, PipelineStage
+
+def test_conhecidos_lista_so_a_pasta(tmp_path):
+    manifesto = PipelineManifest(str(tmp_path / "estado.sqlite3"))
+    pasta = tmp_path / "Faturas_%"
+    manifesto.registrar("a", str(pasta / "a.pdf"))
+    manifesto.registrar("b", str(pasta / "sub" / "b.pdf"))
+    manifesto.registrar("c", str(tmp_path / "FaturasX" / "c.pdf"))
+
+    conhecidos = manifesto.conhecidos(str(pasta))
+
+    assert list(conhecidos) == [str(pasta / "a.pdf")]
+    assert conhecidos[str(pasta / "a.pdf")]['etapa'] == PipelineStage.DOWNLOADED
+
+def test_conhecidos_com_caminho_windows(tmp_path, monkeypatch):
+    # Caminhos separados por '\', como no Windows onde a automação roda
+    monkeypatch.setattr(pipeline_manifest, "os", types.SimpleNamespace(sep="\\", path=ntpath))
+    manifesto = PipelineManifest(str(tmp_path / "estado.sqlite3"))
+    manifesto.registrar("a", r"C:\Faturas\FATURA_01-2024.pdf")
+    manifesto.registrar("b", r"C:\Faturas\Duplicatas\FATURA_01-2024.pdf")
+    manifesto.registrar("c", r"C:\Faturas2\outra.pdf")
+
+    conhecidos = manifesto.conhecidos("C:\\Faturas")
+
+    assert list(conhecidos) == [r"C:\Faturas\FATURA_01-2024.pdf"]
@@ -0,0 +1,55 @@
+import os
+from types import SimpleNamespace
+
+import post_processing
+from download_watcher import DownloadWatcher
+
+
+class _Registro:
+    def __init__(self):
+        self.removidos = []
+
+    def remover(self, digest):
+        self.removidos.append(digest)
+
+    def atualizar(self, *args, **kwargs):
+        pass
+
+    def avancar(self, *args, **kwargs):
+        pass
+
+
+def _pipeline(pasta):
+    return SimpleNamespace(
+        watcher=DownloadWatcher(str(pasta)), pasta_duplicatas=str(pasta / 'Duplicatas'),
+        _nomes_ja_processados=set(), indice=_Registro(), manifesto=_Registro()
+    )
+
+
+def _item(pasta):
+    caminho = pasta / 'fatura.pdf'
+    caminho.write_bytes(b'%PDF')
+    return {'path': str(caminho), 'text': 'texto', 'hash': 'abc'}
+
+
+def test_rename_mantem_o_ignore_do_nome_gravado(tmp_path, monkeypatch):
+    monkeypatch.setattr(post_processing, 'get_new_filename_from_pdf', lambda path, text: 'NOVO.pdf')
+    monkeypatch.setattr(post_processing, 'rename_pdf_safe_mode',
+                        lambda path, dup, nomes, text, nome: os.path.join(os.path.dirname(path), nome))
+    pipeline = _pipeline(tmp_path)
+
+    item = post_processing.PostProcessingPipeline._do_rename(pipeline, _item(tmp_path))
+
+    assert item['path'].endswith('NOVO.pdf')
+    assert pipeline.watcher._ignored == {'NOVO.pdf'}
+
+
+def test_duplicata_desfaz_o_ignore(tmp_path, monkeypatch):
+    monkeypatch.setattr(post_processing, 'get_new_filename_from_pdf', lambda path, text: 'NOVO.pdf')
+    monkeypatch.setattr(post_processing, 'rename_pdf_safe_mode', lambda *args: None)
+    pipeline = _pipeline(tmp_path)
+
+    assert post_processing.PostProcessingPipeline._do_rename(pipeline, _item(tmp_path)) is None
+    # Um download real com esse nome mais tarde não pode ser engolido
+    assert pipeline.watcher._ignored == set()
+    assert pipeline.indice.removidos == ['abc']
@@ -0,0 +1,60 @@
+import sys
+import logging
+import importlib
+
+import pytest
+
+import logging_setup
+import utils
+from config import LoggingConfig
+
+
+@pytest.fixture
+def log_isolado(tmp_path, monkeypatch):
+    caminho = tmp_path / 'download_bills.log'
+    monkeypatch.setitem(LoggingConfig.LOG_FILES, 'main', str(caminho))
+    monkeypatch.setattr(logging_setup, '_listener', None)
+    root = logging.getLogger()
+    handlers, nivel = list(root.handlers), root.level
+    yield caminho
+    if logging_setup._listener is not None:
+        logging_setup._listener.stop()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(nivel)
+
+
+def test_log_do_runner_e_lido_pelo_analisador(log_isolado):
+    sys.modules.pop('runner', None)
+    runner = importlib.import_module('runner')
+    listener = runner._configurar_logging()
+
+    logging.getLogger('runner').info("🚀 Iniciando sistema de download COPASA otimizado")
+    logging.getLogger('runner').error("❌ Erro ao processar CPF 123: timeout")
+    listener.stop()
+
+    assert log_isolado.exists()
+    resultado = utils.LogAnalyzer.analyze_recent_logs(hours=1)
+    assert resultado['erros'] == 1 and resultado['infos'] >= 1
+    padroes = utils.LogAnalyzer.find_error_patterns(hours=1)['padroes_erro']
+    assert "❌ Erro ao processar CPF X: timeout" in padroes
+
+
+def test_importar_runner_nao_tem_efeito_colateral(log_isolado, monkeypatch):
+    # Workers do Pool (spawn) reimportam o runner como __mp_main__
+    import database_manager
+
+    def _nao_construir(*args, **kwargs):
+        raise AssertionError("DatabaseManager construído no import")
+
+    monkeypatch.setattr(database_manager, 'DatabaseManager', _nao_construir)
+    monkeypatch.delitem(sys.modules, 'main', raising=False)
+    sys.modules.pop('runner', None)
+
+    importlib.import_module('runner')
+
+    assert logging_setup._listener is None
+    assert 'main' not in sys.modules
+    assert not log_isolado.exists()
@@ -0,0 +1,65 @@
+import time
+
+import pytest
+
+pytest.importorskip('cryptography')
+from cryptography.fernet import Fernet
+
+import session_cache as modulo
+from session_cache import SessionCache
+
+
+class _Driver:
+    """Driver mínimo: guarda cookies e URL; o probe passa sempre."""
+
+    def __init__(self):
+        self.current_url = 'https://portal/Fatura'
+        self.cookies = [{'name': 'sessao', 'value': 'x'}]
+
+    def get(self, url):
+        self.current_url = url
+
+    def get_cookies(self):
+        return list(self.cookies)
+
+    def delete_all_cookies(self):
+        self.cookies = []
+
+    def add_cookie(self, cookie):
+        self.cookies.append(cookie)
+
+
+class _Wait:
+    def __init__(self, driver, timeout):
+        pass
+
+    def until(self, condicao):
+        return True
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo, 'WebDriverWait', _Wait)
+    return SessionCache(cache_dir=str(tmp_path), key=Fernet.generate_key().decode(), ttl=720)
+
+
+def test_restore_devolve_o_momento_do_login(cache):
+    cache.save('123', _Driver(), login_seconds=30)
+    salvo = cache._load('123')['saved_at']
+
+    assert cache.restore('123', _Driver()) == salvo
+    assert cache.stats['hits'] == 1
+
+
+def test_restore_sem_sessao_ou_vencida(cache):
+    assert cache.restore('123', _Driver()) is None
+
+    cache.save('123', _Driver())
+    cache.ttl = 1
+    payload = cache._load('123')
+    payload['saved_at'] = time.time() - 5
+    with open(cache._path('123'), 'wb') as f:
+        f.write(cache._fernet.encrypt(modulo.json.dumps(payload).encode()))
+
+    assert cache.restore('123', _Driver()) is None
+    assert cache.stats['misses'] == 2
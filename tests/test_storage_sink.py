@@ -0,0 +1,111 @@
+import os
+
+import pytest
+
+from storage_sink import LocalSink, S3Sink, StorageSink, checksums
+
+
+class _ErroS3(Exception):
+    """Mesmo formato do botocore ClientError (atributo response)."""
+
+    def __init__(self, codigo, status):
+        super().__init__(codigo)
+        self.response = {'Error': {'Code': codigo}, 'ResponseMetadata': {'HTTPStatusCode': status}}
+
+
+class _Paginator:
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def paginate(self, Bucket, Prefix):
+        chaves = sorted(k for k in self.cliente.objetos if k.startswith(Prefix))
+        yield {'Contents': [{'Key': k, 'Size': len(self.cliente.objetos[k][0])} for k in chaves]}
+
+
+class _FakeS3:
+    """Cliente S3 em memória com head_object/put_object/list_objects_v2."""
+
+    def __init__(self):
+        self.objetos = {}
+        self.puts = []
+        self.erro_head = None
+
+    def head_object(self, Bucket, Key):
+        if self.erro_head:
+            raise self.erro_head
+        if Key not in self.objetos:
+            raise _ErroS3('404', 404)
+        corpo, metadata = self.objetos[Key]
+        return {'ContentLength': len(corpo), 'Metadata': dict(metadata)}
+
+    def put_object(self, Bucket, Key, Body, ContentMD5, Metadata):
+        self.puts.append(Key)
+        self.objetos[Key] = (Body.read(), Metadata)
+
+    def get_paginator(self, nome):
+        assert nome == 'list_objects_v2'
+        return _Paginator(self)
+
+
+def _arquivo(tmp_path, nome, conteudo):
+    caminho = tmp_path / nome
+    caminho.write_bytes(conteudo)
+    sha256, md5 = checksums(str(caminho))
+    return str(caminho), sha256, md5, len(conteudo)
+
+
+def test_storage_sink_e_abstrato():
+    with pytest.raises(TypeError):
+        StorageSink()
+
+
+def test_s3_put_e_find(tmp_path):
+    cliente = _FakeS3()
+    sink = S3Sink('faturas', 'copasa', client=cliente)
+    origem, sha256, md5, tamanho = _arquivo(tmp_path, 'a.pdf', b'%PDF a')
+
+    assert sink.find('a.pdf', sha256, tamanho) is None
+    assert sink.put(origem, 'a.pdf', sha256, md5) == 's3://faturas/copasa/a.pdf'
+    assert sink.find('a.pdf', sha256, tamanho) == 's3://faturas/copasa/a.pdf'
+
+
+def test_s3_retomada_encontra_a_copia_com_timestamp(tmp_path):
+    cliente = _FakeS3()
+    sink = S3Sink('faturas', 'copasa', client=cliente)
+    antigo = _arquivo(tmp_path, 'antigo.pdf', b'%PDF antigo')
+    sink.put(antigo[0], 'a.pdf', antigo[1], antigo[2])
+
+    origem, sha256, md5, tamanho = _arquivo(tmp_path, 'a.pdf', b'%PDF novo')
+    destino = sink.put(origem, 'a.pdf', sha256, md5)
+    assert destino != 's3://faturas/copasa/a.pdf'
+
+    # Execução interrompida antes de apagar a origem: a retomada não reenvia
+    assert sink.find('a.pdf', sha256, tamanho) == destino
+    assert len(cliente.puts) == 2
+
+
+def test_s3_head_so_404_e_ausencia(tmp_path):
+    cliente = _FakeS3()
+    sink = S3Sink('faturas', client=cliente)
+    origem, sha256, md5, tamanho = _arquivo(tmp_path, 'a.pdf', b'%PDF a')
+
+    cliente.erro_head = _ErroS3('AccessDenied', 403)
+    with pytest.raises(_ErroS3):
+        sink.put(origem, 'a.pdf', sha256, md5)
+    with pytest.raises(_ErroS3):
+        sink.find('a.pdf', sha256, tamanho)
+    assert cliente.puts == []
+
+
+def test_local_retomada_encontra_a_copia_com_timestamp(tmp_path):
+    base = tmp_path / 'destino'
+    base.mkdir()
+    (base / 'a.pdf').write_bytes(b'%PDF antigo')
+    sink = LocalSink(str(base))
+
+    origem, sha256, md5, tamanho = _arquivo(tmp_path, 'a.pdf', b'%PDF novo')
+    destino = sink.put(origem, 'a.pdf', sha256, md5)
+    assert os.path.basename(destino) != 'a.pdf'
+
+    assert sink.find('a.pdf', sha256, tamanho) == destino
+    assert sink.find('b.pdf', sha256, tamanho) is None
@@ -0,0 +1,30 @@
+import threading
+
+from text_cache import TextCache
+
+
+def test_sobrescrever_nao_soma_o_tamanho(tmp_path):
+    cache = TextCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    cache.put('ab' * 32, 'x' * 100)
+    for _ in range(20):
+        cache.put('ab' * 32, 'y' * 100)
+
+    assert cache._size == cache._scan_size() == 100
+
+
+def test_contadores_com_threads(tmp_path):
+    cache = TextCache(str(tmp_path), max_bytes=10 * 1024 * 1024)
+    cache.put('cd' * 32, 'texto')
+
+    def consultar():
+        for _ in range(500):
+            cache.get('cd' * 32)
+            cache.get('ef' * 32)
+
+    threads = [threading.Thread(target=consultar) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert cache.hits == cache.misses == 8 * 500
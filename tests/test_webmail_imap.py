@@ -0,0 +1,117 @@
+import re
+import time
+import socketserver
+import threading
+
+import pytest
+
+from webmail import ImapTokenExtractor
+
+REMETENTE = ImapTokenExtractor.SENDER
+
+
+def _mensagem(token: str) -> bytes:
+    return (
+        f"From: {REMETENTE}\r\nTo: cliente@exemplo.com\r\nSubject: Token de acesso\r\n"
+        f"Content-Type: text/plain; charset=utf-8\r\n\r\nSeu código de acesso é {token}\r\n"
+    ).encode('utf-8')
+
+
+class _FakeImap(socketserver.StreamRequestHandler):
+    """IMAP4rev1 mínimo: LOGIN, SELECT, UID SEARCH/FETCH/STORE, NOOP e LOGOUT."""
+
+    def _enviar(self, linha):
+        self.wfile.write(linha if isinstance(linha, bytes) else linha.encode() + b"\r\n")
+
+    def handle(self):
+        caixa = self.server.caixa
+        self._enviar("* OK IMAP4rev1 pronto")
+        for linha in self.rfile:
+            tag, comando, *resto = linha.decode().rstrip("\r\n").split(" ", 2)
+            comando = comando.upper()
+            args = resto[0] if resto else ""
+            if comando == "CAPABILITY":
+                self._enviar("* CAPABILITY IMAP4rev1")
+            elif comando == "SELECT":
+                with caixa.lock:
+                    self._enviar(f"* {len(caixa.mensagens)} EXISTS")
+            elif comando == "LOGOUT":
+                self._enviar("* BYE")
+                self._enviar(f"{tag} OK LOGOUT")
+                return
+            elif comando == "UID":
+                sub, _, criterio = args.partition(" ")
+                sub = sub.upper()
+                with caixa.lock:
+                    mensagens = list(caixa.mensagens)
+                if sub == "SEARCH":
+                    uids = [uid for uid, _, _ in mensagens]
+                    faixa = re.search(r"UID (\d+):\*", criterio)
+                    if faixa:
+                        # Como no RFC 3501: "n:*" inclui o maior UID mesmo abaixo de n
+                        uids = [u for u in uids if u >= int(faixa.group(1))] or uids[-1:]
+                    self._enviar("* SEARCH " + " ".join(map(str, uids)))
+                elif sub == "FETCH":
+                    uid = int(criterio.split(" ")[0])
+                    for seq, (u, data, corpo) in enumerate(mensagens, 1):
+                        if u == uid:
+                            self._enviar(
+                                f'* {seq} FETCH (UID {u} INTERNALDATE "{data}" BODY[] {{{len(corpo)}}}\r\n'.encode()
+                            )
+                            self._enviar(corpo + b")\r\n")
+            self._enviar(f"{tag} OK {comando}")
+
+
+class _Caixa:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.mensagens = []
+
+    def entregar(self, token: str, recebido_em: float = None):
+        data = time.strftime("%d-%b-%Y %H:%M:%S +0000", time.gmtime(recebido_em or time.time()))
+        with self.lock:
+            uid = self.mensagens[-1][0] + 1 if self.mensagens else 1
+            self.mensagens.append((uid, data, _mensagem(token)))
+
+
+@pytest.fixture
+def servidor():
+    srv = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _FakeImap)
+    srv.daemon_threads = True
+    srv.caixa = _Caixa()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _extrator(srv, timeout=2.0):
+    extrator = ImapTokenExtractor("127.0.0.1", "cliente@exemplo.com", "senha", port=srv.server_address[1], use_ssl=False)
+    extrator.timeout = timeout
+    extrator.poll_interval = 0.05
+    return extrator
+
+
+def test_token_novo_apos_a_marca(servidor):
+    servidor.caixa.entregar("111111")
+    extrator = _extrator(servidor)
+    marca = extrator.marca_atual()
+    assert marca == 1
+
+    threading.Timer(0.3, servidor.caixa.entregar, ("222222",)).start()
+    assert extrator.get_authentication_token(time.time(), marca) == "222222"
+
+
+def test_token_usado_na_tentativa_anterior_nao_volta(servidor):
+    # O token da tentativa anterior chegou segundos atrás, dentro do CLOCK_SKEW
+    servidor.caixa.entregar("111111", time.time() - 5)
+    extrator = _extrator(servidor, timeout=0.5)
+    marca = extrator.marca_atual()
+
+    assert extrator.get_authentication_token(time.time(), marca) is None
+
+
+def test_caixa_vazia(servidor):
+    extrator = _extrator(servidor, timeout=0.3)
+    assert extrator.marca_atual() == 0
+    assert extrator.get_authentication_token(time.time(), 0) is None
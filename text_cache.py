@@ -0,0 +1,163 @@
+import os
+import mmap
+import hashlib
+import threading
+from multiprocessing import Pool
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from config import SystemConfig
+import pdf_text
+
+_MMAP_MIN_SIZE = 1024 * 1024
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 do arquivo; acima de 1 MB lê via mmap, sem copiar para buffers Python."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        tamanho = os.fstat(f.fileno()).st_size
+        if tamanho < _MMAP_MIN_SIZE:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                visao = memoryview(mapa)
+                try:
+                    for inicio in range(0, tamanho, chunk_size):
+                        digest.update(visao[inicio:inicio + chunk_size])
+                finally:
+                    visao.release()
+    return digest.hexdigest()
+
+class TextCache:
+    """
+    Cache em disco do texto extraído dos PDFs, indexado pelo SHA-256 do conteúdo.
+
+    Como a chave é o conteúdo e não o caminho, renomear ou mover o PDF não
+    invalida a entrada. Backend, páginas e regiões de pdf_text entram na
+    chave. Quando o total passa de TEXT_CACHE_MAX_MB, as entradas menos
+    usadas (mtime mais antigo) são removidas.
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None):
+        self.cache_dir = cache_dir or SystemConfig.TEXT_CACHE_DIR
+        self.max_bytes = max_bytes or SystemConfig.TEXT_CACHE_MAX_MB * 1024 * 1024
+        self._lock = threading.Lock()
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.txt")
+
+    def get(self, digest: str) -> Optional[str]:
+        path = self._path(digest)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, digest: str, text: str):
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+        with self._lock:
+            # Sobrescrever uma entrada troca o tamanho dela, não soma outro
+            try:
+                anterior = os.path.getsize(path)
+            except OSError:
+                anterior = 0
+            os.replace(tmp_path, path)
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += os.path.getsize(path) - anterior
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.txt'):
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue
+                    yield os.path.join(root, name), st.st_mtime, st.st_size
+
+    def _scan_size(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self):
+        # Remove até ficar em 90% do limite, para não despejar a cada put
+        alvo = self.max_bytes * 0.9
+        entradas = sorted(self._entries(), key=lambda e: e[1])
+        self._size = sum(e[2] for e in entradas)
+        for path, _, size in entradas:
+            if self._size <= alvo:
+                break
+            try:
+                os.remove(path)
+                self._size -= size
+            except OSError:
+                pass
+
+    def extract_text(self, pdf_path: str, digest: str = None) -> str:
+        backend, paginas, regioes = pdf_text.configuracao_padrao()
+        sufixo = pdf_text.variante(backend, paginas, regioes)
+        chave = digest or file_sha256(pdf_path)
+        if sufixo:
+            chave = f"{chave}-{sufixo}"
+        text = self.get(chave)
+        if text is None:
+            text = pdf_text.extract(pdf_path, backend, paginas, regioes)
+            self.put(chave, text)
+        return text
+
+text_cache = TextCache()
+
+def extract_text(pdf_path: str, digest: str = None) -> str:
+    return text_cache.extract_text(pdf_path, digest)
+
+def _extrair_seguro(args):
+    extrator, pdf_path = args
+    try:
+        return pdf_path, extrator(pdf_path), None
+    except Exception as e:
+        return pdf_path, None, f"{e.__class__.__name__}: {e}"
+
+def extract_texts_parallel(pdf_paths: Iterable[str], workers: int = None,
+                           max_tasks_per_child: int = None,
+                           extrator: Callable[[str], str] = extract_text) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Extrai o texto de vários PDFs num pool de processos e entrega
+    (caminho, texto, erro) na ordem em que cada arquivo termina.
+
+    Os processos são reciclados a cada max_tasks_per_child PDFs para conter o
+    crescimento de memória do backend de PDF. O cache em disco é compartilhado.
+    """
+    pdf_paths = list(pdf_paths)
+    workers = workers or SystemConfig.EXTRACT_WORKERS
+    max_tasks_per_child = max_tasks_per_child or SystemConfig.EXTRACT_MAX_TASKS_PER_CHILD
+    tarefas = [(extrator, path) for path in pdf_paths]
+
+    if workers <= 1 or len(pdf_paths) <= 1:
+        for tarefa in tarefas:
+            yield _extrair_seguro(tarefa)
+        return
+
+    with Pool(processes=min(workers, len(pdf_paths)), maxtasksperchild=max_tasks_per_child) as pool:
+        for resultado in pool.imap_unordered(_extrair_seguro, tarefas):
+            yield resultado
@@ -2,13 +2,19 @@
 Utilitários para debug, manutenção e análise do sistema COPASA otimizado
 """
 import os
+import re
 import time
 import logging
+from collections import deque
 from datetime import datetime, timedelta
 from pathlib import Path
 from typing import List, Dict, Optional
 from database_manager import DatabaseManager
 from config import SystemConfig, LoggingConfig
+from bill_index import get_bill_index
+from bill_archive import MonthlyArchive, mes_de, varrer, zstd_disponivel, ZSTD_AUSENTE
+from folder_stats import get_folder_stats
+from log_reader import campos_da_linha, ler_janela, segmentos
 
 class DebugUtils:
     
@@ -101,61 +107,70 @@ class DebugUtils:
 
 class FileUtils:
     @staticmethod
-    def clean_download_folder(days_old: int = 30) -> Dict:
+    def clean_download_folder(days_old: int = 30, arquivar: bool = False) -> Dict:
+        """
+        Remove arquivos com mais de days_old dias. Com arquivar=True, PDFs,
+        textos extraídos e relatórios vão antes para o arquivo mensal (zstd)
+        em ARCHIVE_FOLDER; só são apagados depois de gravados.
+        """
         download_dir = Path(SystemConfig.DOWNLOAD_DIR)
         if not download_dir.exists():
             return {'erro': 'Pasta de download não existe'}
+        # Antes de varrer: sem o pacote, nada é arquivado nem apagado
+        if arquivar and not zstd_disponivel():
+            return {'erro': f"{ZSTD_AUSENTE} - instale ou rode clean sem --archive"}
         
-        cutoff_date = datetime.now() - timedelta(days=days_old)
+        cutoff = (datetime.now() - timedelta(days=days_old)).timestamp()
+        pasta_arquivo = download_dir / SystemConfig.ARCHIVE_FOLDER
         removed_files = []
         total_size_freed = 0
+        por_mes = {}
+        remover = []
         
-        for file_path in download_dir.glob('**/*'):
-            if file_path.is_file():
-                file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if file_time < cutoff_date:
-                    size = file_path.stat().st_size
-                    total_size_freed += size
-                    removed_files.append(str(file_path.name))
-                    try:
-                        file_path.unlink()
-                    except Exception as e:
-                        print(f"Erro ao remover {file_path}: {e}")
+        # Uma passada de os.scandir; o stat de cada arquivo vem da própria entrada
+        for entrada, st in varrer(str(download_dir), ignorar=(SystemConfig.ARCHIVE_FOLDER,)):
+            if st.st_mtime >= cutoff:
+                continue
+            if arquivar and entrada.name.lower().endswith(SystemConfig.ARCHIVE_EXTENSIONS):
+                nome = Path(os.path.relpath(entrada.path, download_dir)).as_posix()
+                por_mes.setdefault(mes_de(st.st_mtime), []).append((entrada.path, nome, st))
+            else:
+                remover.append((entrada.path, entrada.name, st.st_size))
+        
+        arquivados = 0
+        for mes, arquivos in sorted(por_mes.items()):
+            tamanhos = {caminho: st.st_size for caminho, _, st in arquivos}
+            gravados = MonthlyArchive(str(pasta_arquivo), mes).adicionar(arquivos)
+            arquivados += len(gravados)
+            remover.extend((caminho, os.path.basename(caminho), tamanhos[caminho]) for caminho in gravados)
+        
+        for caminho, nome, size in remover:
+            try:
+                os.remove(caminho)
+                total_size_freed += size
+                removed_files.append(nome)
+            except Exception as e:
+                print(f"Erro ao remover {caminho}: {e}")
         
         return {
             'arquivos_removidos': len(removed_files),
+            'arquivos_arquivados': arquivados,
             'espaco_liberado_mb': round(total_size_freed / 1024 / 1024, 2),
             'arquivos': removed_files[:10] + ['...'] if len(removed_files) > 10 else removed_files
         }
     
     @staticmethod
-    def count_files_by_type() -> Dict:
+    def count_files_by_type(rescan: bool = False) -> Dict:
         download_dir = Path(SystemConfig.DOWNLOAD_DIR)
         if not download_dir.exists():
             return {'erro': 'Pasta de download não existe'}
         
-        file_counts = {}
-        total_size = 0
-        
-        for file_path in download_dir.glob('**/*'):
-            if file_path.is_file():
-                ext = file_path.suffix.lower()
-                size = file_path.stat().st_size
-                
-                if ext not in file_counts:
-                    file_counts[ext] = {'count': 0, 'size_mb': 0}
-                
-                file_counts[ext]['count'] += 1
-                file_counts[ext]['size_mb'] += size / 1024 / 1024
-                total_size += size
-        
-        for ext in file_counts:
-            file_counts[ext]['size_mb'] = round(file_counts[ext]['size_mb'], 2)
-        
-        return {
-            'tipos_arquivo': file_counts,
-            'tamanho_total_mb': round(total_size / 1024 / 1024, 2)
-        }
+        # Índice persistente: só as pastas com mtime alterado são relistadas
+        stats = get_folder_stats()
+        atualizacao = stats.atualizar(str(download_dir), rescan=rescan)
+        result = stats.por_extensao(str(download_dir))
+        result['indice'] = atualizacao
+        return result
     
     @staticmethod
     def find_duplicate_pdfs() -> List[str]:
@@ -164,15 +179,20 @@ class FileUtils:
             return []
         
         pdf_files = list(download_dir.glob('*.pdf'))
-        file_sizes = {}
+        indice = get_bill_index()
+        file_hashes = {}
         duplicates = []
         
+        # Compara pelo hash do conteúdo (tamanhos iguais não bastam)
         for pdf_file in pdf_files:
-            size = pdf_file.stat().st_size
-            if size in file_sizes:
-                duplicates.append(f"{pdf_file.name} (mesmo tamanho que {file_sizes[size]})")
-            else:
-                file_sizes[size] = pdf_file.name
+            digest = indice.hash_arquivo(str(pdf_file))
+            if digest in file_hashes:
+                duplicates.append(f"{pdf_file.name} (mesmo conteúdo que {file_hashes[digest]})")
+                continue
+            file_hashes[digest] = pdf_file.name
+            registro = indice.buscar(digest)
+            if registro and registro['caminho'] and registro['caminho'] != os.path.abspath(pdf_file):
+                duplicates.append(f"{pdf_file.name} (já indexado como {registro['nome'] or registro['caminho']})")
         
         return duplicates
 
@@ -180,70 +200,61 @@ class LogAnalyzer:
     @staticmethod
     def analyze_recent_logs(hours: int = 24) -> Dict:
         log_file = Path(LoggingConfig.LOG_FILES['main'])
-        if not log_file.exists():
+        if not segmentos(str(log_file)):
             return {'erro': 'Arquivo de log não encontrado'}
         
         cutoff_time = datetime.now() - timedelta(hours=hours)
         
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
-            recent_lines = []
+            # Só a janela pedida é lida (busca binária + segmentos rotacionados)
+            recent_lines = deque(maxlen=10)
+            total = 0
             error_count = 0
             warning_count = 0
             info_count = 0
             
-            for line in lines:
-                try:
-                    timestamp_str = line.split(' - ')[0]
-                    log_time = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S,%f')
-                    
-                    if log_time >= cutoff_time:
-                        recent_lines.append(line.strip())
-                        
-                        if 'ERROR' in line:
-                            error_count += 1
-                        elif 'WARNING' in line:
-                            warning_count += 1
-                        elif 'INFO' in line:
-                            info_count += 1
-                            
-                except (ValueError, IndexError):
-                    continue
+            for _, line in ler_janela(str(log_file), cutoff_time):
+                total += 1
+                campos = campos_da_linha(line)
+                recent_lines.append(f"{campos.get('ts')} - {campos.get('level')} - {campos.get('msg')}" if campos else line.strip())
+                
+                level = campos.get('level')
+                if level == 'ERROR':
+                    error_count += 1
+                elif level == 'WARNING':
+                    warning_count += 1
+                elif level == 'INFO':
+                    info_count += 1
             
             return {
                 'periodo': f'{hours} horas',
-                'total_logs': len(recent_lines),
+                'total_logs': total,
                 'erros': error_count,
                 'avisos': warning_count,
                 'infos': info_count,
-                'ultimas_linhas': recent_lines[-10:] if recent_lines else []
+                'ultimas_linhas': list(recent_lines)
             }
             
         except Exception as e:
             return {'erro': f'Erro ao analisar logs: {str(e)}'}
     
     @staticmethod
-    def find_error_patterns() -> Dict:
+    def find_error_patterns(hours: Optional[int] = None) -> Dict:
         log_file = Path(LoggingConfig.LOG_FILES['main'])
-        if not log_file.exists():
+        if not segmentos(str(log_file)):
             return {'erro': 'Arquivo de log não encontrado'}
         
+        cutoff_time = datetime.now() - timedelta(hours=hours) if hours else None
+        
         try:
-            with open(log_file, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-            
             error_patterns = {}
             
-            for line in lines:
-                if 'ERROR' in line:
-                    parts = line.split(' - ')
-                    if len(parts) >= 3:
-                        error_msg = parts[2].strip()
-                        import re
-                        generalized = re.sub(r'\d+', 'X', error_msg)
-                        error_patterns[generalized] = error_patterns.get(generalized, 0) + 1
+            for _, line in ler_janela(str(log_file), cutoff_time):
+                campos = campos_da_linha(line)
+                if campos.get('level') == 'ERROR' and campos.get('msg'):
+                    error_msg = campos['msg'].strip().splitlines()[0]
+                    generalized = re.sub(r'\d+', 'X', error_msg)
+                    error_patterns[generalized] = error_patterns.get(generalized, 0) + 1
             
             sorted_patterns = sorted(error_patterns.items(), key=lambda x: x[1], reverse=True)
             
@@ -256,8 +267,9 @@ class LogAnalyzer:
             return {'erro': f'Erro ao analisar padrões: {str(e)}'}
 
 class SystemHealthChecker:
-    def __init__(self):
+    def __init__(self, rescan: bool = False):
         self.debug = DebugUtils()
+        self.rescan = rescan
     
     def full_health_check(self) -> Dict:
         results = {}
@@ -303,16 +315,17 @@ class SystemHealthChecker:
             SystemConfig.DUPLICATES_FOLDER
         ]
         
-        missing_folders = []
-        for folder in required_folders:
-            folder_path = download_dir / folder
-            if not folder_path.exists():
-                missing_folders.append(folder)
+        stats = get_folder_stats()
+        stats.atualizar(str(download_dir), rescan=self.rescan)
+        existentes = set(stats.subpastas(str(download_dir)) or [])
+        missing_folders = [folder for folder in required_folders if folder not in existentes]
         
         if missing_folders:
             return {'status': 'warning', 'message': f'Pastas ausentes: {missing_folders}'}
         else:
-            return {'status': 'ok', 'message': 'Estrutura de pastas OK'}
+            resumo = stats.por_extensao(str(download_dir))
+            total = sum(d['count'] for d in resumo['tipos_arquivo'].values())
+            return {'status': 'ok', 'message': f"Estrutura de pastas OK ({total} arquivos, {resumo['tamanho_total_mb']} MB)"}
     
     def _check_database(self) -> Dict:
         try:
@@ -339,18 +352,18 @@ def main_debug():
     if len(sys.argv) < 2:
         print("Uso: python utils.py <comando>")
         print("Comandos disponíveis:")
-        print("  health - Verificação de saúde completa")
+        print("  health [--rescan] - Verificação de saúde completa")
         print("  pending - Lista matrículas pendentes")
         print("  errors - Análise de erros")
-        print("  files - Análise de arquivos")
+        print("  files [--rescan] - Análise de arquivos (--rescan reconstrói o índice de pastas)")
         print("  logs - Análise de logs")
-        print("  clean - Limpa arquivos antigos")
+        print("  clean [--archive] - Limpa arquivos antigos (--archive guarda PDFs e relatórios em .zst)")
         return
     
     command = sys.argv[1].lower()
     
     if command == 'health':
-        checker = SystemHealthChecker()
+        checker = SystemHealthChecker(rescan='--rescan' in sys.argv)
         result = checker.full_health_check()
         print(f"\n🏥 VERIFICAÇÃO DE SAÚDE DO SISTEMA")
         print(f"={'=' * 50}")
@@ -393,13 +406,16 @@ def main_debug():
                 print(f"  • {erro}: {count}x")
     
     elif command == 'files':
-        result = FileUtils.count_files_by_type()
+        result = FileUtils.count_files_by_type(rescan='--rescan' in sys.argv)
         print(f"\n📁 ANÁLISE DE ARQUIVOS")
         print(f"={'=' * 50}")
         if 'erro' in result:
             print(f"Erro: {result['erro']}")
         else:
             print(f"Tamanho total: {result['tamanho_total_mb']} MB")
+            indice = result['indice']
+            print(f"Índice: {indice['pastas_relidas']} pastas relidas, "
+                  f"{indice['pastas_reaproveitadas']} reaproveitadas em {indice['duracao_s']}s")
             for ext, data in result['tipos_arquivo'].items():
                 ext_name = ext if ext else 'sem extensão'
                 print(f"  {ext_name}: {data['count']} arquivos ({data['size_mb']} MB)")
@@ -420,13 +436,15 @@ def main_debug():
                     print(f"  {line}")
     
     elif command == 'clean':
-        result = FileUtils.clean_download_folder()
+        result = FileUtils.clean_download_folder(arquivar='--archive' in sys.argv)
         print(f"\n🧹 LIMPEZA DE ARQUIVOS")
         print(f"={'=' * 50}")
         if 'erro' in result:
             print(f"Erro: {result['erro']}")
         else:
             print(f"Arquivos removidos: {result['arquivos_removidos']}")
+            if result['arquivos_arquivados']:
+                print(f"Arquivados em {SystemConfig.ARCHIVE_FOLDER}/: {result['arquivos_arquivados']}")
             print(f"Espaço liberado: {result['espaco_liberado_mb']} MB")
     
     else:
@@ -1,4 +1,11 @@
+import re
 import time
+import logging
+import email
+import imaplib
+from email import policy
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
 from typing import Optional
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
@@ -6,6 +13,9 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.common.exceptions import TimeoutException, WebDriverException
+from config import WebmailConfig
+
+logger = logging.getLogger(__name__)
 
 
 class WebmailTokenExtractor:
@@ -143,10 +153,170 @@ class WebmailTokenExtractor:
         return self.extract_token_from_email()
 
 
-def webmail_access(driver: WebDriver, host: str, email_user: str, email_password: str) -> Optional[str]:
+class ImapTokenExtractor:
+    """Extrai o token da COPASA direto da caixa de entrada via IMAP, sem abrir o webmail"""
+    
+    SENDER = "crm.acesso@copasa.com.br"
+    CLOCK_SKEW = 120
+    
+    TOKEN_PATTERNS = [
+        # Mesmo elemento que o webmail exibe como .v1code (Roundcube prefixa as classes com "v1")
+        re.compile(r'class\s*=\s*["\']?(?:[^"\'>]*\s)?code(?:\s[^"\'>]*)?["\']?[^>]*>\s*([A-Za-z0-9]{4,12})\s*<', re.IGNORECASE),
+        re.compile(r'(?:c[oó]digo|token)\D{0,60}?(\d{4,8})\b', re.IGNORECASE),
+    ]
+    
+    def __init__(self, host: str, username: str, password: str, port: int = None, use_ssl: bool = None):
+        """
+        Inicializa o extrator IMAP
+        Args:
+            host: Servidor IMAP (ou URL do webmail, de onde o hostname é extraído)
+            username: Email do usuário
+            password: Senha do email
+        """
+        if not all([host, username, password]):
+            raise ValueError("Parâmetros obrigatórios: host, username e password")
+        
+        if "://" in host:
+            host = urlparse(host).hostname or host
+        self.host = host
+        self.username = username
+        self.password = password
+        self.port = port or WebmailConfig.IMAP_PORT
+        self.use_ssl = WebmailConfig.IMAP_SSL if use_ssl is None else use_ssl
+        self.timeout = WebmailConfig.IMAP_TIMEOUT
+        self.poll_interval = WebmailConfig.IMAP_POLL_INTERVAL
+    
+    def _connect(self) -> imaplib.IMAP4:
+        if self.use_ssl:
+            conn = imaplib.IMAP4_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            conn = imaplib.IMAP4(self.host, self.port, timeout=self.timeout)
+        conn.login(self.username, self.password)
+        conn.select("INBOX")
+        return conn
+    
+    @classmethod
+    def parse_token(cls, raw_message: bytes) -> Optional[str]:
+        message = email.message_from_bytes(raw_message, policy=policy.default)
+        
+        bodies = []
+        for content_type in ('html', 'plain'):
+            part = message.get_body(preferencelist=(content_type,))
+            if part is not None:
+                bodies.append(part.get_content())
+        
+        for body in bodies:
+            for pattern in cls.TOKEN_PATTERNS:
+                match = pattern.search(body)
+                if match:
+                    return match.group(1).strip()
+        return None
+    
+    def _uids(self, conn: imaplib.IMAP4, desde: datetime, apos_uid: int = None):
+        criteria = f'FROM "{self.SENDER}" SINCE {desde.strftime("%d-%b-%Y")}'
+        if apos_uid is not None:
+            criteria += f' UID {apos_uid + 1}:*'
+        typ, data = conn.uid('SEARCH', None, f'({criteria})')
+        if typ != 'OK' or not data or not data[0]:
+            return []
+        # "n:*" sempre devolve o maior UID, mesmo menor que n
+        return [int(u) for u in data[0].split() if apos_uid is None or int(u) > apos_uid]
+    
+    def marca_atual(self) -> int:
+        """Maior UID da COPASA na caixa agora; só mensagens acima dele valem como token novo."""
+        conn = self._connect()
+        try:
+            uids = self._uids(conn, datetime.now() - timedelta(days=1))
+            return max(uids) if uids else 0
+        finally:
+            try:
+                conn.logout()
+            except Exception:
+                pass
+    
+    def _newest_message(self, conn: imaplib.IMAP4, desde: datetime, apos_uid: int = None):
+        uids = self._uids(conn, desde, apos_uid)
+        if not uids:
+            return None, None
+        
+        uid = str(max(uids))
+        typ, data = conn.uid('FETCH', uid, '(INTERNALDATE BODY.PEEK[])')
+        if typ != 'OK':
+            return uid, None
+        
+        for item in data:
+            if isinstance(item, tuple):
+                internal_date = imaplib.Internaldate2tuple(item[0])
+                received_at = time.mktime(internal_date) if internal_date else None
+                return uid, (received_at, item[1])
+        return uid, None
+    
+    def get_authentication_token(self, requested_after: float = None, apos_uid: int = None) -> Optional[str]:
+        """
+        Espera o token pedido em requested_after. Com apos_uid (marca_atual()
+        tirada antes de enviar as credenciais) só aceita mensagens mais novas
+        que a marca, então o token já usado numa tentativa anterior nunca volta;
+        sem a marca, vale a janela de horário com CLOCK_SKEW.
+        """
+        requested_after = requested_after or time.time()
+        deadline = time.time() + self.timeout
+        desde = datetime.fromtimestamp(requested_after) - timedelta(days=1)
+        
+        conn = self._connect()
+        try:
+            ultimo_uid = None
+            while time.time() < deadline:
+                uid, message = self._newest_message(conn, desde, apos_uid)
+                
+                if uid != ultimo_uid and message:
+                    ultimo_uid = uid
+                    received_at, raw = message
+                    recente = received_at is None or received_at >= requested_after - self.CLOCK_SKEW
+                    if apos_uid is not None or recente:
+                        token = self.parse_token(raw)
+                        if token:
+                            conn.uid('STORE', uid, '+FLAGS', '(\\Seen)')
+                            return token
+                
+                time.sleep(self.poll_interval)
+                conn.noop()
+            return None
+        finally:
+            try:
+                conn.logout()
+            except Exception:
+                pass
+
+
+def marca_caixa_token(host: str, email_user: str, email_password: str) -> Optional[int]:
+    """Marca da caixa (maior UID da COPASA) a tirar antes de pedir o token; None fora do modo IMAP ou em falha."""
+    if WebmailConfig.TOKEN_BACKEND != "imap":
+        return None
+    try:
+        return ImapTokenExtractor(WebmailConfig.IMAP_HOST or host, email_user, email_password).marca_atual()
+    except Exception as e:
+        logger.warning(f"⚠️ Não foi possível marcar a caixa IMAP ({e}) - usando janela de horário")
+        return None
+
+
+def webmail_access(driver: WebDriver, host: str, email_user: str, email_password: str,
+                   requested_after: float = None, apos_uid: int = None) -> Optional[str]:
     """
     Função de acesso rápido ao webmail.
+    Com WEBMAIL_TOKEN_BACKEND=imap tenta primeiro o IMAP e usa o navegador como fallback.
     """
+    if WebmailConfig.TOKEN_BACKEND == "imap":
+        try:
+            imap_host = WebmailConfig.IMAP_HOST or host
+            token = ImapTokenExtractor(imap_host, email_user, email_password).get_authentication_token(
+                requested_after, apos_uid
+            )
+            if token:
+                return token
+            logger.warning("⚠️ Token não encontrado via IMAP - usando webmail no navegador")
+        except Exception as e:
+            logger.warning(f"⚠️ Falha no IMAP ({e}) - usando webmail no navegador")
+    
     try:
         extractor = WebmailTokenExtractor(host, email_user, email_password)
         return extractor.get_authentication_token(driver)